@@ -1,19 +1,59 @@
 import streamlit as st # type: ignore
-import pandas as pd
 from components.sidebar import sidebar
-from components.calendar_view import calendar_view
-from components.charts import charts_view
-from components.smart_insights import insights_view
-
-from features.add_expense import add_expense
-from features.export_data import export_data
-from features.budget_alerts import check_budget_alerts
-from features.monthly_comparison import show_monthly_comparison
-from features.recurring_detector import detect_recurring_expenses
-from features.voice_input import voice_to_text_input
-from chatbot.bot import chatbot_tab
 from utils.helpers import load_data
 
+# Feature modules pull in heavy dependencies (speech_recognition, pytesseract
+# and PIL, altair, matplotlib, openai), so each view imports its own on first
+# use and only the selected view is rendered on a rerun.
+
+
+def _calendar(data):
+    from components.calendar_view import calendar_view
+    calendar_view(data)
+
+
+def _charts(data):
+    from components.charts import charts_view
+    charts_view(data)
+
+
+def _insights(data):
+    from components.smart_insights import insights_view
+    from features.budget_alerts import check_budget_alerts
+    from features.recurring_detector import detect_recurring_expenses
+    insights_view(data)
+    detect_recurring_expenses(data)
+    check_budget_alerts(data)
+
+
+def _add_edit(data):
+    from features.add_expense import add_expense
+    from features.voice_input import voice_to_text_input
+    voice_to_text_input()
+    add_expense()
+
+
+def _export(data):
+    from features.export_data import export_data
+    from features.monthly_comparison import show_monthly_comparison
+    export_data(data)
+    show_monthly_comparison(data)
+
+
+def _chatbot(data):
+    from chatbot.bot import chatbot_tab
+    chatbot_tab()
+
+
+VIEWS = {
+    "📅 Calendar View": _calendar,
+    "📊 Charts & Analytics": _charts,
+    "🧠 Smart Insights": _insights,
+    "🛠 Add/Edit Expenses": _add_edit,
+    "📤 Export & Reports": _export,
+    "🤖 AI Chatbot": _chatbot,
+}
+
 # Beautiful page configuration
 st.set_page_config(
     page_title="Smart Expense Visualizer",
@@ -45,6 +85,16 @@ st.markdown("""
         box-shadow: inset 0 -3px 0 #fb7185, 0 6px 18px rgba(99,102,241,0.25);
     }
 
+    /* View selector, styled like the tabs */
+    div[role="radiogroup"] { gap: 8px; }
+    div[role="radiogroup"] > label {
+        background-color: #0f172a; color: #e5e7eb; border-radius: 14px 14px 0 0; font-weight: 700;
+        padding: 12px 22px; border: 1px solid rgba(255,255,255,0.08);
+    }
+    div[role="radiogroup"] > label:has(input:checked) {
+        background: linear-gradient(180deg, #6366f1 0%, #8b5cf6 100%); color: #ffffff;
+    }
+
     /* Tab panel */
     .stTabs [data-baseweb="tab-panel"] {
         background: #0f172a; border-radius: 0 0 12px 12px; padding: 20px; border: 1px solid rgba(255,255,255,0.08); border-top: none;
@@ -126,6 +176,7 @@ if not data.empty:
     
     with col4:
         if 'Date' in data.columns:
+            import pandas as pd
             data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
             active_days = len(data['Date'].dt.date.unique())
             st.metric("📅 Active Days", f"{active_days}")
@@ -135,34 +186,6 @@ if not data.empty:
 # Sidebar
 sidebar()
 
-# Main tabs with beautiful styling
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "📅 Calendar View", 
-    "📊 Charts & Analytics", 
-    "🧠 Smart Insights", 
-    "🛠 Add/Edit Expenses", 
-    "📤 Export & Reports",
-    "🤖 AI Chatbot"
-])
-
-with tab1:
-    calendar_view(data)
-
-with tab2:
-    charts_view(data)
-
-with tab3:
-    insights_view(data)
-    detect_recurring_expenses(data)
-    check_budget_alerts(data)
-
-with tab4:
-    voice_to_text_input()
-    add_expense()
-
-with tab5:
-    export_data(data)
-    show_monthly_comparison(data)
-
-with tab6:
-    chatbot_tab()
+# Main views: only the selected one is imported and rendered
+view = st.radio("View", list(VIEWS), horizontal=True, label_visibility="collapsed", key="active_view")
+VIEWS[view](data)
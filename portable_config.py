@@ -1,13 +1,19 @@
 """
 Portable configuration for Smart Expense Visualizer
 Handles different operating systems and paths
+
+Nothing is probed or created at import time: the configuration is built on
+first access (of get_portable_config(), setup_environment() or one of the
+module-level paths such as DATA_DIR) and cached for the process.
 """
 
 import os
 import sys
 import platform
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=None)
 def get_portable_config():
     """Get configuration based on the current system"""
     
@@ -35,6 +41,7 @@ def get_portable_config():
     
     return config
 
+@lru_cache(maxsize=None)
 def get_tesseract_path():
     """Get Tesseract OCR path based on operating system"""
     system = platform.system().lower()
@@ -81,6 +88,7 @@ def get_tesseract_path():
                 
         return None
 
+@lru_cache(maxsize=None)
 def setup_environment():
     """Setup environment variables for portable operation"""
     config = get_portable_config()
@@ -96,11 +104,17 @@ def setup_environment():
     
     return config
 
-# Auto-setup when imported
-PORTABLE_CONFIG = setup_environment()
+# Commonly used paths, resolved (and the environment set up) on first access
+_EXPORTS = {
+    'DATA_DIR': 'data_dir',
+    'REPORTS_DIR': 'reports_dir',
+    'ASSETS_DIR': 'assets_dir',
+    'BASE_DIR': 'base_dir',
+}
 
-# Export commonly used paths
-DATA_DIR = PORTABLE_CONFIG['data_dir']
-REPORTS_DIR = PORTABLE_CONFIG['reports_dir']
-ASSETS_DIR = PORTABLE_CONFIG['assets_dir']
-BASE_DIR = PORTABLE_CONFIG['base_dir']
+def __getattr__(name):
+    if name == 'PORTABLE_CONFIG':
+        return setup_environment()
+    if name in _EXPORTS:
+        return setup_environment()[_EXPORTS[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,114 @@
 # Main Streamlit app entry
+#
+# Only the selected view is rendered on each rerun, and each view imports its
+# feature module on first use, so one interaction never recomputes the
+# calendar, charts, insights, import/export and assistant together.
 import streamlit as st
+
+import config
+from modules.budget_manager import budget_alerts, start_alerts
+from modules.categorizer import warm_up_async
+from modules.cloud_sync import get_worker
+from modules.data_loader import get_budget_engine, get_rollups
+from modules.profiler import diagnostics_panel, span
+
+
+def charts_page(rollups, summary):
+    from modules.data_loader import ledger_fingerprint
+    from modules.visualizer import spend_series
+    if summary['count']:
+        st.subheader('📊 Spending by Category')
+        st.bar_chart(rollups.category_totals())
+        st.subheader('📈 Monthly Spend')
+        st.line_chart(rollups.monthly_totals())
+        series = spend_series(rollups, ledger_fingerprint())
+        st.subheader(f'📉 {series.name.title()}')  # Daily, Weekly or Monthly, whichever was plotted
+        st.line_chart(series)
+
+
+def calendar_page(rollups, summary):
+    from modules.calendar_view import calendar_view
+    from modules.data_loader import get_calendar_index
+    calendar_view(get_calendar_index())
+
+
+def insights_page(rollups, summary):
+    from modules.budget_manager import budget_view
+    from modules.data_loader import get_analytics, get_budget_engine, get_recurring
+    from modules.expense_analyzer import insights_view
+    from modules.recurring_finder import recurring_view
+    budget_view(get_budget_engine(), config.BUDGETS_PATH)
+    insights_view(get_analytics())
+    recurring_view(get_recurring())
+
+
+def edit_page(rollups, summary):
+    from modules.expense_editor import expense_editor_view
+    categories = [str(c) for c in rollups.category_totals().index] if summary['count'] else []
+    expense_editor_view(categories)
+
+
+def search_page(rollups, summary):
+    from modules.data_loader import get_text_index
+    from modules.search_index import search_view
+    search_view(get_text_index())
+
+
+def import_export_page(rollups, summary):
+    from modules.category_trainer import retrain_view
+    from modules.ocr_scanner import receipt_scanner_view
+    from modules.report_exporter import export_view
+    from modules.speech_input import voice_input_view
+    from modules.statement_importer import statement_import_view
+    receipt_scanner_view()
+    voice_input_view()
+    statement_import_view()
+    retrain_view()
+    export_view()
+
+
+def ask_page(rollups, summary):
+    from modules.data_loader import get_query_aggregates, get_text_index, ledger_fingerprint
+    from modules.llm_assistant import get_api_key, get_assistant, handle_query
+    if get_api_key():
+        st.caption(get_assistant().health())
+    else:
+        st.caption('AI responses: disabled (using rule-based answers)')
+    question = st.text_input('Ask about your expenses', placeholder='e.g. spend in July 2025')
+    if question:
+        st.text(handle_query(question, get_query_aggregates(), ledger_fingerprint(),
+                             index=get_text_index()))
+
+
+PAGES = {
+    '📊 Charts': charts_page,
+    '📅 Calendar': calendar_page,
+    '🧠 Insights': insights_page,
+    '➕ Add / Edit': edit_page,
+    '🔍 Search': search_page,
+    '🧾 Import & Export': import_export_page,
+    '🤖 Ask': ask_page,
+}
+
 st.title('Smart Expense Visualizer')
+warm_up_async()
+get_worker()  # resumes syncing anything queued before a restart
+
+rollups = get_rollups()
+summary = rollups.summary()
+start_alerts(get_budget_engine())  # alert on thresholds crossed from this session's start on
+
+if summary['count']:
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric('💰 Total Expenses', f"₹{summary['total']:,.0f}")
+    col2.metric('📊 Transactions', f"{summary['count']}")
+    col3.metric('📈 Average per Transaction', f"₹{summary['average']:,.0f}")
+    col4.metric('📅 Active Days', f"{summary['active_days']}")
+else:
+    st.info('No expenses recorded yet.')
+
+page = st.radio('View', list(PAGES), horizontal=True, label_visibility='collapsed', key='page')
+with span(f'page: {page}'):
+    PAGES[page](rollups, summary)
+budget_alerts(get_budget_engine())  # on every page, including saves made by this rerun
+diagnostics_panel()  # last, so it includes this rerun's timings
@@ -0,0 +1,215 @@
+# Cloud sync throughput and UI latency against local fakes
+#
+# FakeSheet and FakeFirebase stand in for gspread and pyrebase: each request
+# costs a fixed latency, the sheet enforces a per-second request quota with
+# 429 responses, and either can be told to fail every n-th request. The
+# script compares writing each expense synchronously (one append_row and one
+# push on the UI path) with queueing it in the outbox, then checks that the
+# worker delivers everything exactly once, including after a restart and
+# when several workers drain the same outbox.
+#
+#   python -m benchmarks.cloud_sync_bench --expenses 5000
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.cloud_sync import FirebaseSink, Outbox, SheetsSink, SyncWorker, payload  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f'HTTP {status_code}')
+        self.response = FakeResponse(status_code, retry_after)
+
+
+class _FakeService:
+    def __init__(self, latency, per_second=None, fail_every=0):
+        self.latency = latency
+        self.per_second = per_second
+        self.fail_every = fail_every
+        self.requests = 0
+        self.throttled = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _request(self):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if self.fail_every and self.requests % self.fail_every == 0:
+                raise FakeAPIError(503)
+            if self.per_second:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.per_second:
+                    self.throttled += 1
+                    raise FakeAPIError(429, retry_after=0.2)
+                self._recent.append(now)
+
+
+class FakeSheet(_FakeService):
+    """gspread Worksheet stand-in."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rows = []
+
+    def append_row(self, row, value_input_option=None):
+        self.append_rows([row], value_input_option)
+
+    def append_rows(self, rows, value_input_option=None):
+        self._request()
+        self.rows.extend(rows)
+
+
+class FakeFirebase(_FakeService):
+    """pyrebase Database stand-in (child/push/update on one flat dict)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data = {}
+        self._path = None
+
+    def child(self, path):
+        self._path = path
+        return self
+
+    def push(self, value):
+        self._request()
+        self.data[f'{self._path}/push-{len(self.data)}'] = value
+
+    def update(self, updates):
+        self._request()
+        for path, value in updates.items():
+            if value is None:
+                self.data.pop(path, None)
+            else:
+                self.data[path] = value
+
+
+def _expenses(n):
+    return [(i + 1, payload(f'2025-07-{i % 28 + 1:02d}', 'Food', i % 500 + 1, f'expense {i}')) for i in range(n)]
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench_direct(n, latency):
+    sheet, db = FakeSheet(latency), FakeFirebase(latency)
+    timings = []
+    for _, p in _expenses(n):
+        start = time.perf_counter()
+        sheet.append_row([p['Date'], p['Category'], p['Amount'], p['Note']])
+        db.child('expenses').push(p)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_queued(n, latency, batch_size, fail_every):
+    sheet = FakeSheet(latency, per_second=5, fail_every=fail_every)
+    db = FakeFirebase(latency, fail_every=fail_every)
+    outbox = Outbox(os.path.join(tempfile.mkdtemp(prefix='sync-bench-'), 'outbox.sqlite'))
+    worker = SyncWorker(outbox, [SheetsSink(sheet=sheet), FirebaseSink(db=db)],
+                        batch_size=batch_size, max_backoff=0.5)
+    for sink in worker.sinks.values():
+        sink.min_interval = 0.0  # the fake's quota does the limiting
+    worker.start()
+    timings = []
+    started = time.perf_counter()
+    expenses = _expenses(n)
+    for expense_id, p in expenses:
+        t = time.perf_counter()
+        worker.enqueue([('insert', expense_id, p)])
+        timings.append(time.perf_counter() - t)
+    # Some edits and deletes, which only Firebase mirrors.
+    worker.enqueue([('update', i, dict(p, Amount=0.0)) for i, p in expenses[::10]])
+    worker.enqueue([('delete', i, None) for i, _ in expenses[::25]])
+    while any(outbox.pending().values()):
+        time.sleep(0.01)
+    drained = time.perf_counter() - started
+    worker.stop()
+
+    expected = {f'expenses/{i}': p for i, p in expenses}
+    for i, p in expenses[::10]:
+        expected[f'expenses/{i}'] = dict(p, Amount=0.0)
+    for i, _ in expenses[::25]:
+        expected.pop(f'expenses/{i}')
+    ok = len(sheet.rows) == n and db.data == expected
+    return timings, drained, ok, sheet, db
+
+
+def bench_resume(n, batch_size):
+    path = os.path.join(tempfile.mkdtemp(prefix='sync-bench-'), 'outbox.sqlite')
+    first = Outbox(path)
+    SyncWorker(first, [FirebaseSink(db=FakeFirebase(0))]).enqueue(
+        [('insert', i, p) for i, p in _expenses(n)])
+    first.close()  # "restart" before anything was sent
+    db = FakeFirebase(0)
+    worker = SyncWorker(Outbox(path), [FirebaseSink(db=db)], batch_size=batch_size)
+    while worker.flush_once():
+        pass
+    return len(db.data) == n
+
+
+def bench_shared(n, batch_size, workers=4):
+    """Several workers, each with its own connection, drain one outbox; True if no row was sent twice."""
+    path = os.path.join(tempfile.mkdtemp(prefix='sync-bench-'), 'outbox.sqlite')
+    sheet = FakeSheet(0.002)
+    pool = [SyncWorker(Outbox(path), [SheetsSink(sheet=sheet)], batch_size=batch_size) for _ in range(workers)]
+    for worker in pool:
+        worker.sinks['sheets'].min_interval = 0.0
+    pool[0].enqueue([('insert', i, p) for i, p in _expenses(n)])
+    for worker in pool:
+        worker.start()
+    while any(pool[0].outbox.pending().values()):
+        time.sleep(0.01)
+    for worker in pool:
+        worker.stop()
+    notes = [row[3] for row in sheet.rows]
+    return len(notes) == n and len(set(notes)) == n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cloud sync throughput and UI latency with fakes.')
+    parser.add_argument('--expenses', type=int, default=5000)
+    parser.add_argument('--direct', type=int, default=100, help='expenses for the synchronous baseline')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake request')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--fail-every', type=int, default=7, help='fail every n-th request (0: never)')
+    args = parser.parse_args(argv)
+
+    direct = bench_direct(args.direct, args.latency)
+    print(f'synchronous: {statistics.mean(direct) * 1e3:.1f} ms per expense on the UI path '
+          f'(p99 {_pct(direct, 0.99) * 1e3:.1f} ms), {1 / statistics.mean(direct):,.0f} expenses/s')
+
+    queued, drained, ok, sheet, db = bench_queued(args.expenses, args.latency, args.batch_size,
+                                                  args.fail_every)
+    print(f'queued:      {statistics.mean(queued) * 1e3:.2f} ms per expense on the UI path '
+          f'(p99 {_pct(queued, 0.99) * 1e3:.2f} ms), {args.expenses / drained:,.0f} expenses/s synced, '
+          f'{sheet.requests} Sheets / {db.requests} Firebase requests '
+          f'({sheet.throttled} throttled, failures every {args.fail_every})')
+    resumed = bench_resume(1000, args.batch_size)
+    shared = bench_shared(5000, 100)
+    print(f'delivery exactly once: {ok}; resume after restart: {resumed}; shared outbox: {shared}')
+    return 0 if ok and resumed and shared else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
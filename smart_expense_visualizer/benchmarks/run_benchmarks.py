@@ -0,0 +1,214 @@
+# Benchmark suite for the hot paths, at several ledger sizes
+#
+# For each size a synthetic ledger (modules.synthetic_data) is imported into
+# a scratch store and every hot path is timed in a fresh spawned process, so
+# module-level caches start cold: CSV loading, ledger load, single-row
+# insert/edit/delete, the derived indexes behind each view, every rule-based
+# query intent, category prediction and recurring detection, and a streaming
+# export. With Streamlit installed each page is also rendered headless.
+# Results are written as JSON; --compare prints the ratio against an earlier
+# run, so regressions show up between versions.
+#
+#   python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000 --out bench.json
+#   python -m benchmarks.run_benchmarks --sizes 10000 --compare bench.json
+
+import argparse
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import config  # noqa: E402
+
+QUERIES = {
+    'total': 'total spent',
+    'summarize_last': 'summarize last 20 expenses',
+    'last_n': 'last 10 expenses',
+    'largest': 'largest expense',
+    'smallest': 'smallest expense',
+    'average_daily': 'average daily spend',
+    'compare': 'compare food vs travel',
+    'compare (merchants)': 'compare swiggy vs zomato',
+    'search': 'expenses with uber',
+    'search (fuzzy)': 'expenses with zomatto',
+    'range': 'between 2024-03-01 and 2024-09-30',
+    'month': 'spend in july 2025',
+    'top_category': 'top category',
+    'category': 'food expenses',
+}
+
+
+def _configure(data_dir, backend):
+    """Point every path the app reads or writes into data_dir, so a run never touches real data."""
+    config.STORAGE_BACKEND = backend
+    config.DATA_DIR = data_dir
+    config.EXPENSE_LOG_PATH = os.path.join(data_dir, 'expenses.log')
+    config.EXPENSE_SNAPSHOT_PATH = os.path.join(data_dir, 'expenses.snapshot')
+    config.SQLITE_PATH = os.path.join(data_dir, 'expenses.sqlite')
+    config.LEGACY_CSV_PATH = os.path.join(data_dir, 'none.csv')
+    config.VOICE_DB_PATH = None
+    config.BUDGETS_PATH = os.path.join(data_dir, 'budgets.json')
+    config.IMPORT_INDEX_PATH = os.path.join(data_dir, 'imported.hashes')
+    config.REPORTS_DIR = os.path.join(data_dir, 'reports')
+    config.LLM_CACHE_PATH = os.path.join(data_dir, 'llm_cache.json')
+    config.OCR_CACHE_DIR = os.path.join(data_dir, 'ocr_cache')
+    config.SYNC_OUTBOX_PATH = os.path.join(data_dir, 'sync_outbox.sqlite')
+    config.PROFILE_LOG_PATH = None
+    # Predictions still use the shipped model, from a copy training cannot overwrite.
+    models_dir = os.path.join(data_dir, 'models')
+    os.makedirs(models_dir, exist_ok=True)
+    model_path = os.path.join(models_dir, os.path.basename(config.CATEGORY_MODEL_PATH))
+    if os.path.exists(config.CATEGORY_MODEL_PATH) and not os.path.exists(model_path):
+        shutil.copyfile(config.CATEGORY_MODEL_PATH, model_path)
+    config.MODELS_DIR, config.CATEGORY_MODEL_PATH = models_dir, model_path
+    config.COMPACT_AFTER = 10 ** 9  # no background compaction mid-measurement
+    config.GOOGLE_SHEETS_KEY_PATH = config.FIREBASE_CONFIG_PATH = None
+
+
+class _Timer:
+    def __init__(self, size):
+        self.size = size
+        self.results = []
+
+    def __call__(self, name, fn, ops=1):
+        started = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - started
+        self.results.append({'size': self.size, 'name': name, 'seconds': seconds, 'ops': ops,
+                             'per_op_ms': seconds * 1e3 / ops})
+        return value
+
+
+def _run_size(size, args, data_dir, results):
+    _configure(data_dir, args.backend)
+    import pandas  # noqa: F401  (so library import time is not charged to 'generate')
+    from modules import categorizer, data_loader, report_exporter
+    from modules.query_engine import answer
+    from modules.recurring_finder import detect_recurring
+    from modules.synthetic_data import generate_expenses
+
+    timer = _Timer(size)
+    df = timer('generate', lambda: generate_expenses(size, seed=args.seed))
+    csv_path = os.path.join(data_dir, 'synthetic.csv')
+    df.to_csv(csv_path, index=False)
+    timer('load_data (cold)', lambda: data_loader.load_data(csv_path))
+    timer('load_data (cached)', lambda: data_loader.load_data(csv_path))
+    timer('import', lambda: data_loader.get_store().import_frame(df))
+    timer('load_expenses (cold)', data_loader.load_expenses)
+    timer('load_expenses (cached)', data_loader.load_expenses)
+
+    # Derived state behind each view.
+    timer('rollups', data_loader.get_rollups)
+    timer('budget engine', data_loader.get_budget_engine)
+    timer('calendar index', data_loader.get_calendar_index)
+    agg = timer('query aggregates', data_loader.get_query_aggregates)
+    timer('recurring (view)', data_loader.get_recurring)
+    timer('analytics', data_loader.get_analytics)
+    index = timer('text index', data_loader.get_text_index)
+
+    ops = args.writes
+    ids = timer('save_expense', lambda: [data_loader.save_expense('2025-07-01', 'Food', 120.0, f'bench {i}')
+                                         for i in range(ops)], ops)
+    timer('update_expense', lambda: [data_loader.update_expense(i, '2025-07-02', 'Bills', 240.0, 'edited')
+                                     for i in ids], ops)
+    timer('delete_expense', lambda: [data_loader.delete_expense(i) for i in ids], ops)
+    timer('rollups (after writes)', data_loader.get_rollups)
+    timer('analytics (after writes)', data_loader.get_analytics)
+    timer('text index (after writes)', data_loader.get_text_index)
+
+    for intent, query in QUERIES.items():
+        timer(f'answer: {intent}', lambda: [answer(query, agg, index) for _ in range(args.repeat)],
+              args.repeat)
+
+    notes = df['Note'].tolist()
+    categorizer.clear_cache()
+    timer('predict_categories (cold)', lambda: categorizer.predict_categories(notes), len(notes))
+    timer('predict_categories (cached)', lambda: categorizer.predict_categories(notes), len(notes))
+    timer('detect_recurring', lambda: detect_recurring(df))
+    timer('export csv', lambda: report_exporter.export('csv', os.path.join(data_dir, 'report.csv')))
+
+    if args.pages:
+        if importlib.util.find_spec('streamlit') is not None:
+            from benchmarks.startup_bench import first_paint
+            for label, seconds in first_paint():
+                timer.results.append({'size': size, 'name': f'page: {label}', 'seconds': seconds,
+                                      'ops': 1, 'per_op_ms': seconds * 1e3})
+    results.put(timer.results)
+
+
+def _meta(args):
+    import numpy
+    import pandas
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                             capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'git': rev,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'pandas': pandas.__version__, 'numpy': numpy.__version__,
+            'backend': args.backend, 'sizes': args.sizes}
+
+
+def compare(current, baseline):
+    """Lines of new/old time ratios for benchmarks present in both runs."""
+    old = {(r['size'], r['name']): r['seconds'] for r in baseline['results']}
+    lines = [f"{'size':>10}  {'benchmark':<30} {'old ms':>10} {'new ms':>10} {'ratio':>7}"]
+    for r in current['results']:
+        before = old.get((r['size'], r['name']))
+        if before is None:
+            continue
+        ratio = r['seconds'] / before if before else float('inf')
+        flag = '  <-- slower' if ratio > 1.2 else ''
+        lines.append(f"{r['size']:>10,}  {r['name']:<30} {before * 1e3:>10.2f} {r['seconds'] * 1e3:>10.2f} "
+                     f'{ratio:>6.2f}x{flag}')
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the hot paths at several ledger sizes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--backend', choices=['log', 'sqlite'], default='log')
+    parser.add_argument('--writes', type=int, default=50, help='inserts/edits/deletes timed per size')
+    parser.add_argument('--repeat', type=int, default=20, help='calls per query intent')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-pages', dest='pages', action='store_false',
+                        help='skip the headless page renders')
+    parser.add_argument('--out', help='write JSON here (default: stdout)')
+    parser.add_argument('--compare', help='earlier JSON output to compare against')
+    args = parser.parse_args(argv)
+
+    ctx = mp.get_context('spawn')
+    report = {'meta': _meta(args), 'results': []}
+    for size in args.sizes:
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run_size,
+                           args=(size, args, tempfile.mkdtemp(prefix=f'bench-{size}-'), results))
+        proc.start()
+        report['results'].extend(results.get())
+        proc.join()
+        print(f'{size:,} rows done', file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            print('\n'.join(compare(report, json.load(fh))), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# Import-time and first-paint benchmark for the Streamlit app
+#
+# Cold start: each run is a fresh interpreter that imports app.py in
+# Streamlit's bare mode (which executes the whole script, i.e. one full
+# render of the default view) and reports which heavy libraries ended up
+# loaded. First paint and view switches: Streamlit's AppTest runs the script
+# headless, then selects each view in turn and times the rerun.
+#
+#   python -m benchmarks.startup_bench --runs 5
+
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(APP_DIR)
+
+HEAVY = ['pandas', 'numpy', 'pyarrow', 'sklearn', 'joblib', 'matplotlib', 'altair', 'plotly',
+         'PIL', 'pytesseract', 'speech_recognition', 'openai', 'gspread', 'pyrebase']
+
+_PROBE = '''
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ','.join(heavy))
+'''
+
+
+def cold_import(module, cwd, runs):
+    """Median seconds to import module in a fresh interpreter, and the heavy libraries it loaded."""
+    timings, heavy = [], ''
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY)],
+                             cwd=cwd, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f'importing {module} failed:\n{out.stderr.strip()}')
+        line = out.stdout.strip().splitlines()[-1]
+        elapsed, heavy = line.split(' ', 1) if ' ' in line else (line, '')
+        timings.append(float(elapsed))
+    return statistics.median(timings), heavy
+
+
+def first_paint(timeout=120):
+    """Seconds for the first headless run and for switching to each view."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(APP_DIR, 'app.py'), default_timeout=timeout)
+    started = time.perf_counter()
+    at.run()
+    results = [('first paint', time.perf_counter() - started)]
+    for page in at.radio(key='page').options:
+        started = time.perf_counter()
+        at.radio(key='page').set_value(page).run()
+        results.append((page, time.perf_counter() - started))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure app import time and first paint.')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    elapsed, heavy = cold_import('portable_config', ROOT_DIR, args.runs)
+    print(f'import portable_config: {elapsed * 1e3:7.1f} ms')
+    if importlib.util.find_spec('streamlit') is None:
+        print('streamlit is not installed; skipping the app benchmarks')
+        return 0
+    elapsed, heavy = cold_import('app', APP_DIR, args.runs)
+    print(f'cold start (import + default view): {elapsed * 1e3:7.1f} ms; heavy modules loaded: {heavy or "none"}')
+    for label, seconds in first_paint():
+        print(f'{label:>28}: {seconds * 1e3:7.1f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
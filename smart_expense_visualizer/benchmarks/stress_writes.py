@@ -0,0 +1,128 @@
+# Concurrency stress test for the expense write helpers
+#
+# Spawns several processes, each running several threads that insert, edit
+# and delete through modules.data_loader against a scratch ledger (with a
+# small compaction threshold so compactions race the writers). Afterwards it
+# checks that every acknowledged write is on disk exactly once and that each
+# process's rollups agree with the ledger. Exits non-zero on any lost,
+# duplicated or stale row.
+#
+#   python -m benchmarks.stress_writes --processes 4 --threads 8 --writes 200
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from benchmarks import run_benchmarks  # noqa: E402
+
+
+def _configure(data_dir, backend, compact_after):
+    run_benchmarks._configure(data_dir, backend)
+    config.COMPACT_AFTER = compact_after
+
+
+def _thread(proc, thread, writes, expected, errors):
+    from modules.data_loader import delete_expense, save_expense, update_expense
+    try:
+        for i in range(writes):
+            note = f'p{proc}-t{thread}-{i}'
+            amount = (i % 50) + 1
+            expense_id = save_expense(f'2025-07-{i % 28 + 1:02d}', 'Food', amount, note)
+            expected[expense_id] = (note, amount)
+            if i % 5 == 0:
+                assert update_expense(expense_id, '2025-07-01', 'Bills', amount * 2, note + '-edited')
+                expected[expense_id] = (note + '-edited', amount * 2)
+            if i % 7 == 0:
+                assert delete_expense(expense_id)
+                del expected[expense_id]
+    except Exception as exc:  # reported by the parent
+        errors.append(repr(exc))
+
+
+def _process(proc, args, data_dir, barrier, results):
+    _configure(data_dir, args.backend, args.compact_after)
+    from modules import data_loader
+    data_loader.get_rollups()  # exercise the delta path, not just rebuilds
+    expected, errors = {}, []
+    threads = [threading.Thread(target=_thread, args=(proc, t, args.writes, expected, errors))
+               for t in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store = data_loader.get_store()
+    barrier.wait()  # every process has finished writing
+    summary = data_loader.get_rollups().summary()
+    results.put({'proc': proc, 'expected': expected, 'errors': errors, 'summary': summary,
+                 'batches': store._group.batches, 'ops': store._group.ops})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hammer the expense write helpers and verify no rows are lost.')
+    parser.add_argument('--backend', choices=['log', 'sqlite'], default='log')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200, help='inserts per thread')
+    parser.add_argument('--compact-after', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    data_dir = tempfile.mkdtemp(prefix='expense-stress-')
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(args.processes)
+    results = ctx.Queue()
+    started = time.perf_counter()
+    procs = [ctx.Process(target=_process, args=(p, args, data_dir, barrier, results))
+             for p in range(args.processes)]
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    _configure(data_dir, args.backend, args.compact_after)
+    from modules.data_loader import get_store
+    ledger = get_store().load()
+    expected = {}
+    failures = []
+    for report in reports:
+        expected.update(report['expected'])
+        failures.extend(f"process {report['proc']}: {e}" for e in report['errors'])
+    ids = [int(i) for i in ledger['id']]
+    if len(ids) != len(set(ids)):
+        failures.append(f'{len(ids) - len(set(ids))} duplicate ids')
+    actual = {int(i): (n, float(a)) for i, n, a in zip(ledger['id'], ledger['Note'], ledger['Amount'])}
+    lost = set(expected) - set(actual)
+    extra = set(actual) - set(expected)
+    stale = [i for i in set(expected) & set(actual) if actual[i] != (expected[i][0], float(expected[i][1]))]
+    for label, bad in (('lost', lost), ('unexpected', extra), ('stale', stale)):
+        if bad:
+            failures.append(f'{len(bad)} {label} rows, e.g. {sorted(bad)[:5]}')
+    total = sum(a for _, a in expected.values())
+    for report in reports:
+        s = report['summary']
+        if s['count'] != len(expected) or abs(s['total'] - total) > 1e-6:
+            failures.append(f"process {report['proc']} rollups: {s['count']} rows / {s['total']:.2f}, "
+                            f'expected {len(expected)} / {total:.2f}')
+
+    ops = sum(r['ops'] for r in reports)
+    batches = sum(r['batches'] for r in reports)
+    print(f'{args.backend}: {ops:,} writes from {args.processes}x{args.threads} writers in {elapsed:.2f}s '
+          f'({ops / elapsed:,.0f}/s), {batches:,} commits ({ops / max(batches, 1):.1f} writes per fsync), '
+          f'{len(expected):,} rows expected, {len(actual):,} on disk')
+    if failures:
+        print('FAILED', *failures, sep='\n  ')
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# Incremental category training against the full-refit baseline
+#
+# A synthetic ledger (modules.synthetic_data) arrives in batches. After the
+# first batch both strategies train once from scratch; for every later batch
+# the baseline refits on everything seen so far (train_full) while the
+# incremental trainer folds in only the rows above its checkpoint
+# (train_incremental). Each step reports wall time, training throughput and
+# accuracy on a held-out sample drawn from the whole ledger, so any drift
+# between the two models shows up next to the speedup. To make accuracy
+# informative, a share of notes is relabelled at random (ledgers are noisy).
+#
+#   python -m benchmarks.trainer_bench --rows 500000 --batches 5
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import category_trainer  # noqa: E402
+
+
+def _ledger(rows, noise, seed):
+    import numpy as np
+    from modules.synthetic_data import generate_expenses
+    df = generate_expenses(rows, seed=seed).reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    flip = rng.random(len(df)) < noise
+    categories = df['Category'].astype(str).to_numpy().copy()
+    categories[flip] = rng.choice(np.unique(categories), int(flip.sum()))
+    df['Category'] = categories
+    df.insert(0, 'id', np.arange(1, len(df) + 1))
+    return df
+
+
+def accuracy(models_dir, holdout):
+    artifact = category_trainer.load_artifact(models_dir)
+    predicted = artifact['model'].predict(artifact['vectorizer'].transform(holdout['Note'].astype(str)))
+    return float((predicted == holdout['Category'].to_numpy()).mean())
+
+
+def run(rows, batches, holdout_rows, noise, seed):
+    """[(step, rows seen, strategy, seconds, rows trained, accuracy)] per batch and strategy."""
+    import numpy as np
+    from sklearn.naive_bayes import MultinomialNB  # noqa: F401  (import time is not training time)
+    df = _ledger(rows, noise, seed)
+    category_trainer.make_vectorizer()
+    rng = np.random.default_rng(seed + 1)
+    held = np.zeros(len(df), dtype=bool)
+    held[rng.choice(len(df), min(holdout_rows, len(df) // 5), replace=False)] = True
+    holdout, train = df[held], df[~held]
+    bounds = np.linspace(0, len(train), batches + 1).astype(int)
+    dirs = {name: tempfile.mkdtemp(prefix=f'trainer-bench-{name}-') for name in ('full', 'incremental')}
+    results = []
+    for step in range(1, batches + 1):
+        seen = train.iloc[:bounds[step]]
+        for name, fit in (('full', category_trainer.train_full),
+                          ('incremental', category_trainer.train_incremental)):
+            started = time.perf_counter()
+            manifest = fit(seen, models_dir=dirs[name])
+            seconds = time.perf_counter() - started
+            trained = len(seen) if name == 'full' or step == 1 else bounds[step] - bounds[step - 1]
+            results.append((step, len(seen), name, seconds, trained if manifest else 0,
+                            accuracy(dirs[name], holdout)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare incremental category training with full refits.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batches', type=int, default=5, help='batches the ledger arrives in')
+    parser.add_argument('--holdout', type=int, default=20_000, help='rows held out for accuracy')
+    parser.add_argument('--noise', type=float, default=0.1, help='share of rows relabelled at random')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.batches, args.holdout, args.noise, args.seed)
+    print(f"{'step':>4}  {'rows seen':>10}  {'strategy':<12} {'seconds':>8} {'rows/s':>10} {'accuracy':>9}")
+    totals = {}
+    for step, seen, name, seconds, trained, acc in results:
+        totals[name] = totals.get(name, 0.0) + seconds
+        print(f'{step:>4}  {seen:>10,}  {name:<12} {seconds:>8.2f} {trained / seconds:>10,.0f} {acc:>9.3f}')
+    final = {name: acc for _, _, name, _, _, acc in results[-2:]}
+    print(f"total training time: full {totals['full']:.2f} s, incremental {totals['incremental']:.2f} s "
+          f"({totals['full'] / totals['incremental']:.1f}x); final accuracy: full {final['full']:.3f}, "
+          f"incremental {final['incremental']:.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
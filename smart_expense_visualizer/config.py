@@ -1,2 +1,63 @@
 # Global configuration
-BUDGET_LIMIT = 5000
+import os
+
+BUDGET_LIMIT = 5000  # default monthly limit for all spending
+
+# Expense storage
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+EXPENSE_LOG_PATH = os.path.join(DATA_DIR, 'expenses.log')
+EXPENSE_SNAPSHOT_PATH = os.path.join(DATA_DIR, 'expenses.snapshot')
+LEGACY_CSV_PATH = os.path.join(DATA_DIR, 'expenses.csv')
+COMPACT_AFTER = 5000  # log records folded into the snapshot in the background
+GROUP_COMMIT_WINDOW = 0.005  # seconds concurrent writes wait to share one fsync
+DELTA_WRITE_ROWS = 1000  # batched saves up to this size update derived state in place
+
+# Storage backend: 'log' (append-only log + snapshot) or 'sqlite'
+STORAGE_BACKEND = os.getenv('EXPENSE_STORAGE_BACKEND', 'log')
+SQLITE_PATH = os.path.join(DATA_DIR, 'expenses.sqlite')
+# The legacy voice input feature writes expenses.db in the directory the app
+# is started from, which is the repository root.
+VOICE_DB_PATH = os.getenv('EXPENSE_VOICE_DB_PATH',
+                          os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'expenses.db'))
+BUDGETS_PATH = os.path.join(DATA_DIR, 'budgets.json')
+IMPORT_INDEX_PATH = os.path.join(DATA_DIR, 'imported.hashes')  # rows already imported
+
+# Reports
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports')
+EXPORT_CHUNK_ROWS = 50_000  # rows per chunk when streaming exports
+
+# In-memory frame cache
+FRAME_CACHE_BYTES = 256 * 1024 * 1024
+
+# Chatbot
+LLM_MODEL = 'gpt-4o-mini'
+LLM_CACHE_SIZE = 256
+LLM_CACHE_PATH = os.path.join(DATA_DIR, 'llm_cache.json')  # None keeps the cache in memory
+LLM_HEALTH_TTL = 300  # seconds between connectivity probes
+
+# Receipt OCR
+OCR_WORKERS = None  # process pool size; None uses os.cpu_count()
+OCR_MAX_SIDE = 1600  # longest image side in pixels before OCR
+OCR_CACHE_DIR = os.path.join(DATA_DIR, 'ocr_cache')
+
+# Category prediction
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+CATEGORY_MODEL_PATH = os.path.join(MODELS_DIR, 'category_classifier.pkl')
+CATEGORY_CACHE_SIZE = 50000  # note -> category memo entries
+TRAIN_HASH_FEATURES = 2 ** 18  # hashed feature space for the incremental trainer
+MODEL_KEEP_VERSIONS = 3
+
+# Cloud sync (disabled unless credentials are configured)
+GOOGLE_SHEETS_KEY_PATH = os.getenv('GOOGLE_SHEETS_KEY_PATH')  # service-account JSON
+GOOGLE_SHEET_NAME = os.getenv('GOOGLE_SHEET_NAME', 'Expenses')
+FIREBASE_CONFIG_PATH = os.getenv('FIREBASE_CONFIG_PATH')  # pyrebase config JSON
+SYNC_OUTBOX_PATH = os.path.join(DATA_DIR, 'sync_outbox.sqlite')
+SYNC_BATCH_SIZE = 500
+
+# Profiling (off unless enabled here or from the diagnostics panel)
+PROFILING = os.getenv('EXPENSE_PROFILING', '') == '1'
+PROFILE_LOG_PATH = os.getenv('EXPENSE_PROFILE_LOG')  # JSONL trace of every profiled call
+
+# Charts
+CHART_POINT_BUDGET = 500  # most points any time series sends to the browser
+CHART_CACHE_SIZE = 64  # cached chart series and figures
@@ -1,5 +1,253 @@
 # Budget setting and alerting
+#
+# Budgets are per-category (or '*' for all spending) limits over a weekly or
+# monthly period, stored in a JSON file. BudgetEngine keeps period-to-date
+# totals for every budgeted category and period, seeded from the daily
+# rollups and then updated by the same deltas as the rollups on each save,
+# edit or delete. Crossing a configured percentage of a limit emits a
+# threshold event, once per budget period; alert evaluation only reads the
+# running totals. Categories match budgets case-insensitively, and events
+# are kept in a short numbered history that each session reads from its own
+# cursor.
+
+import json
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+
+from modules.profiler import profiled
+
+PERIODS = ('weekly', 'monthly')
+ALL = '*'
+
 
 def check_budget(df, limit):
     total = df['Amount'].sum()
     return total > limit
+
+
+def period_key(day, period):
+    """'2025-07' for monthly, ISO week '2025-W27' for weekly."""
+    if isinstance(day, str):
+        day = datetime.strptime(day[:10], '%Y-%m-%d').date()
+    elif isinstance(day, datetime):
+        day = day.date()
+    if period == 'monthly':
+        return f'{day.year:04d}-{day.month:02d}'
+    year, week, _ = day.isocalendar()
+    return f'{year:04d}-W{week:02d}'
+
+
+def load_budgets(path):
+    """Read {'limits': [...], 'thresholds': [...]} from path, or an empty config."""
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault('limits', [])
+    data.setdefault('thresholds', [0.5, 0.8, 1.0])
+    return data
+
+
+def save_budgets(path, budgets):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(budgets, fh, indent=2)
+    os.replace(tmp, path)
+
+
+def _norm(category):
+    """Budgets match categories case-insensitively ('food' counts toward 'Food')."""
+    return str(category).strip().casefold()
+
+
+class BudgetEngine:
+    """Running period-to-date totals and threshold events for configured budgets."""
+
+    def __init__(self, budgets, max_events=100):
+        self._lock = threading.RLock()
+        self.events = deque(maxlen=max_events)  # (sequence number, event)
+        self._seq = 0
+        self.listeners = []
+        self.configure(budgets)
+
+    def configure(self, budgets):
+        with self._lock:
+            limits = [b for b in budgets.get('limits', []) if b.get('period') in PERIODS]
+            self.limits = {(_norm(b['category']), b['period']): float(b['limit']) for b in limits}
+            self._labels = {_norm(b['category']): str(b['category']).strip() for b in limits}
+            self.thresholds = sorted(float(t) for t in budgets.get('thresholds', [1.0]))
+            self._totals = {}  # (category, period, key) -> spent
+            self._crossed = {}  # (category, period, key) -> highest threshold already announced
+            self._periods = {p for _, p in self.limits}
+            self._categories = {c for c, _ in self.limits}
+
+    def rebuild(self, daily, previous=None, today=None):
+        """Seed totals from a Date/Category/Amount daily rollup frame.
+
+        previous: the engine this one replaces. Its event history carries
+        over, and if the budgets are unchanged, thresholds that the rebuilt
+        totals cross in the current period for the first time (a bulk import)
+        are announced as events.
+        """
+        with self._lock:
+            self._totals = {}
+            if daily is not None and not daily.empty and self.limits:
+                self._seed(daily)
+            self._crossed = {key: self._level(spent, self.limits[key[:2]])
+                             for key, spent in self._totals.items()}
+            if previous is None:
+                return self
+            with previous._lock:
+                self.events.extend(previous.events)
+                self._seq = previous._seq
+                if (previous.limits, previous.thresholds) != (self.limits, self.thresholds):
+                    return self
+                current = {period: period_key(today or date.today(), period) for period in PERIODS}
+                for key, level in self._crossed.items():
+                    announced = previous._crossed.get(key, 0.0)
+                    if key[2] == current[key[1]] and level > announced:
+                        self._announce(key, announced, level)
+                    self._crossed[key] = max(level, announced)
+            return self
+
+    def _seed(self, daily):
+        days = daily['Date']
+        keys = {'monthly': days.dt.strftime('%Y-%m')}
+        if 'weekly' in self._periods:
+            iso = days.dt.isocalendar()
+            keys['weekly'] = (iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2))
+        categories = daily['Category'].astype(str).str.strip().str.casefold()
+        for period in self._periods:
+            frame = daily.assign(key=keys[period].to_numpy(), Category=categories.to_numpy())
+            if ALL in self._categories:
+                for key, spent in frame.groupby('key')['Amount'].sum().items():
+                    self._totals[(ALL, period, key)] = float(spent)
+            budgeted = frame[frame['Category'].isin(self._categories)]
+            for (cat, key), spent in budgeted.groupby(['Category', 'key'])['Amount'].sum().items():
+                if (cat, period) in self.limits:
+                    self._totals[(cat, period, key)] = float(spent)
+
+    def apply(self, day, category, amount):
+        """Fold a signed expense delta into the running totals."""
+        if day is None or not self.limits:
+            return
+        with self._lock:
+            for cat in (_norm(category), ALL):
+                for period in PERIODS:
+                    limit = self.limits.get((cat, period))
+                    if limit is None:
+                        continue
+                    key = (cat, period, period_key(day, period))
+                    self._totals[key] = self._totals.get(key, 0.0) + amount
+                    self._emit(key)
+
+    def _level(self, spent, limit):
+        crossed = [t for t in self.thresholds if limit > 0 and spent >= t * limit]
+        return crossed[-1] if crossed else 0.0
+
+    def _emit(self, key):
+        # Each threshold is announced once per budget period: an edit (a
+        # delete then an insert) or a delete followed by new spending that
+        # crosses it again stays quiet.
+        level = self._level(self._totals[key], self.limits[key[:2]])
+        announced = self._crossed.get(key, 0.0)
+        if level > announced:
+            self._crossed[key] = level
+            self._announce(key, announced, level)
+
+    def _announce(self, key, above, upto):
+        category, period, when = key
+        limit = self.limits[(category, period)]
+        for threshold in self.thresholds:
+            if above < threshold <= upto:
+                event = {'category': self._labels.get(category, category), 'period': period,
+                         'period_key': when, 'threshold': threshold,
+                         'spent': self._totals[key], 'limit': limit}
+                self._seq += 1
+                self.events.append((self._seq, event))
+                for listener in self.listeners:
+                    listener(event)
+
+    def spent(self, category, period, key):
+        return self._totals.get((_norm(category), period, key), 0.0)
+
+    def status(self, today=None):
+        """Current-period spend for every budget, most used first."""
+        today = today or date.today()
+        rows = []
+        with self._lock:
+            for (cat, period), limit in self.limits.items():
+                key = period_key(today, period)
+                spent = self.spent(cat, period, key)
+                used = spent / limit if limit > 0 else 0.0
+                crossed = [t for t in self.thresholds if used >= t]
+                rows.append({'category': self._labels.get(cat, cat), 'period': period, 'period_key': key,
+                             'spent': spent, 'limit': limit, 'used': used,
+                             'threshold': crossed[-1] if crossed else None})
+        return sorted(rows, key=lambda r: r['used'], reverse=True)
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def events_since(self, cursor):
+        """(events after sequence number cursor, oldest first; the new cursor).
+
+        Events are kept for every reader rather than consumed, so each
+        session keeps its own cursor and sees every alert once.
+        """
+        with self._lock:
+            return [e for seq, e in self.events if seq > cursor], self._seq
+
+
+@profiled('view: budgets')
+def start_alerts(engine):
+    """Start this session's event cursor at engine's latest event, once per session."""
+    import streamlit as st
+    st.session_state.setdefault('budget_events_seen', engine.last_seq)
+
+
+def budget_alerts(engine):
+    """Toast the threshold events emitted since this session last looked, on whatever page is open."""
+    import streamlit as st
+    cursor = st.session_state.get('budget_events_seen', engine.last_seq)
+    events, st.session_state['budget_events_seen'] = engine.events_since(cursor)
+    for event in events:
+        label = 'All spending' if event['category'] == ALL else event['category']
+        st.toast(f"{label} reached {event['threshold']:.0%} of its {event['period']} budget "
+                 f"(₹{event['spent']:,.0f} of ₹{event['limit']:,.0f})")
+
+
+def budget_view(engine, budgets_path):
+    import streamlit as st
+
+    st.subheader('🚨 Budgets')
+    status = engine.status()
+    if not status:
+        st.info('No budgets set yet.')
+    for row in status:
+        label = 'All spending' if row['category'] == ALL else row['category']
+        st.write(f"**{label}** ({row['period']}, {row['period_key']}): "
+                 f"₹{row['spent']:,.0f} of ₹{row['limit']:,.0f}")
+        st.progress(min(row['used'], 1.0))
+        if row['used'] >= 1.0:
+            st.warning(f'⚠️ {label} is over budget.')
+
+    with st.expander('Set a budget'):
+        with st.form('budget_form'):
+            category = st.text_input('Category (* for all spending)', value=ALL)
+            period = st.selectbox('Period', PERIODS, index=1)
+            limit = st.number_input('Limit (₹)', min_value=0.0, step=100.0)
+            if st.form_submit_button('Save budget'):
+                budgets = load_budgets(budgets_path)
+                budgets['limits'] = [b for b in budgets['limits']
+                                     if (_norm(b['category']), b['period']) != (_norm(category), period)]
+                if limit > 0:
+                    budgets['limits'].append({'category': category.strip(), 'period': period,
+                                              'limit': limit})
+                save_budgets(budgets_path, budgets)
+                st.rerun()
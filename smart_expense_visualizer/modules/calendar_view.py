@@ -0,0 +1,114 @@
+# Calendar view of expenses, one month at a time
+#
+# CalendarIndex sorts the ledger by day once and records where each day's
+# rows start and end, so per-day totals come from one reduceat and a day's
+# transactions are a positional slice instead of a boolean filter.
+
+from modules.profiler import profiled
+from utils.data_cleaner import as_datetime
+
+
+class CalendarIndex:
+    """Day-partitioned view of an expense frame."""
+
+    def __init__(self, df):
+        import numpy as np
+        dates = as_datetime(df['Date'])
+        valid = dates.notna().to_numpy()
+        days = dates[valid].dt.normalize().to_numpy()
+        order = np.argsort(days, kind='stable')
+        self._frame = df[valid].iloc[order].reset_index(drop=True)
+        sorted_days = days[order]
+        self.days, self._starts, counts = np.unique(sorted_days, return_index=True, return_counts=True)
+        self._ends = self._starts + counts
+        self.counts = counts
+        amounts = self._frame['Amount'].to_numpy(dtype=float)
+        if len(amounts):
+            self.day_totals = np.add.reduceat(amounts, self._starts)
+        else:
+            self.day_totals = np.zeros(0)
+        self.months = np.unique(self.days.astype('datetime64[M]'))
+
+    def __len__(self):
+        return len(self._frame)
+
+    def _month_bounds(self, month):
+        import numpy as np
+        start = np.datetime64(month, 'M')
+        lo = np.searchsorted(self.days, start.astype('datetime64[ns]'))
+        hi = np.searchsorted(self.days, (start + 1).astype('datetime64[ns]'))
+        return lo, hi
+
+    def month_days(self, month):
+        """Date, Total, Count for every active day in month ('YYYY-MM')."""
+        import pandas as pd
+        lo, hi = self._month_bounds(month)
+        return pd.DataFrame({
+            'Date': self.days[lo:hi],
+            'Total': self.day_totals[lo:hi],
+            'Count': self.counts[lo:hi],
+        })
+
+    def summary(self, month=None):
+        lo, hi = self._month_bounds(month) if month is not None else (0, len(self.days))
+        totals = self.day_totals[lo:hi]
+        if not len(totals):
+            return {'total': 0.0, 'active_days': 0, 'avg_per_day': 0.0,
+                    'busiest_day': None, 'busiest_amount': 0.0}
+        peak = int(totals.argmax())
+        return {
+            'total': float(totals.sum()),
+            'active_days': len(totals),
+            'avg_per_day': float(totals.mean()),
+            'busiest_day': self.days[lo + peak],
+            'busiest_amount': float(totals[peak]),
+        }
+
+    def day_rows(self, day):
+        """Transactions on day, as a slice of the day-sorted frame."""
+        import numpy as np
+        i = np.searchsorted(self.days, np.datetime64(day, 'D').astype('datetime64[ns]'))
+        if i >= len(self.days) or self.days[i] != np.datetime64(day, 'D'):
+            return self._frame.iloc[0:0]
+        return self._frame.iloc[self._starts[i]:self._ends[i]]
+
+
+@profiled('view: calendar')
+def calendar_view(index):
+    import pandas as pd
+    import streamlit as st
+
+    st.subheader('📅 Calendar View')
+    if not len(index):
+        st.info('No expenses to show yet.')
+        return
+
+    labels = [str(m) for m in index.months]
+    if 'calendar_month' not in st.session_state or st.session_state.calendar_month not in labels:
+        st.session_state.calendar_month = labels[-1]
+    pos = labels.index(st.session_state.calendar_month)
+
+    prev_col, pick_col, next_col = st.columns([1, 4, 1])
+    if prev_col.button('◀', disabled=pos == 0, key='calendar_prev'):
+        pos -= 1
+    if next_col.button('▶', disabled=pos == len(labels) - 1, key='calendar_next'):
+        pos += 1
+    month = pick_col.selectbox('Month', labels, index=pos, label_visibility='collapsed')
+    st.session_state.calendar_month = month
+
+    stats = index.summary(month)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric('Month Total', f"₹{stats['total']:,.0f}")
+    col2.metric('Active Days', stats['active_days'])
+    col3.metric('Avg per Day', f"₹{stats['avg_per_day']:,.0f}")
+    if stats['busiest_day'] is not None:
+        col4.metric('Busiest Day', pd.Timestamp(stats['busiest_day']).strftime('%d %b'),
+                    f"₹{stats['busiest_amount']:,.0f}", delta_color='off')
+
+    for row in index.month_days(month).itertuples(index=False):
+        day = pd.Timestamp(row.Date)
+        with st.expander(f"{day:%a, %d %b %Y} — ₹{row.Total:,.2f} ({row.Count} expenses)"):
+            # Only slice and render the day's rows once the user asks for them.
+            if st.checkbox('Show transactions', key=f'calendar_day_{day:%Y%m%d}'):
+                rows = index.day_rows(day)
+                st.dataframe(rows[['Category', 'Amount', 'Note']], hide_index=True)
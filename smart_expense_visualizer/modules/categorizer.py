@@ -1,5 +1,199 @@
 # ML or rule-based classification
+#
+# predict_categories() classifies a whole Series of notes at once: notes are
+# normalized and deduplicated, previously seen notes come from an LRU cache,
+# and the rest go through a single vectorizer transform and model predict.
+# Without a trained model, keyword rules are applied per unique note with one
+# compiled regex per category.
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import config
+from modules.profiler import cache_event, profiled
+
+KEYWORDS = {
+    'Food': ['swiggy', 'zomato', 'restaurant', 'food', 'meal', 'dinner', 'lunch', 'grocer', 'cafe'],
+    'Travel': ['uber', 'ola', 'taxi', 'flight', 'bus', 'train', 'fuel', 'petrol', 'gas'],
+    'Bills': ['electric', 'water', 'internet', 'rent', 'bill', 'utility', 'recharge'],
+    'Shopping': ['amazon', 'flipkart', 'mall', 'shopping', 'clothes', 'shoes'],
+}
+_KEYWORD_RES = [(cat, re.compile(r'\b(?:' + '|'.join(words) + r')'))
+                for cat, words in KEYWORDS.items()]
+DEFAULT_CATEGORY = 'Other'
+
+_MODEL = None  # (vectorizer, classifier) or False when unavailable
+_MODEL_LOCK = threading.Lock()
+_MODEL_STAMP = None  # manifest (mtime, size) the model was loaded from
+_CACHE = OrderedDict()  # normalized note -> (category, confidence)
+_CACHE_LOCK = threading.Lock()
+
+
+def _manifest_stamp():
+    from modules.category_trainer import manifest_path
+    try:
+        st = os.stat(manifest_path())
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_model(path=None):
+    """Load a (vectorizer, classifier) pair, or None.
+
+    Without an explicit path, the newest trained version from the model
+    manifest wins over the legacy CATEGORY_MODEL_PATH file.
+    """
+    if path is None and _manifest_stamp() is not None:
+        from modules.category_trainer import load_artifact
+        artifact = load_artifact()
+        if artifact:
+            return artifact['vectorizer'], artifact['model']
+    path = path or config.CATEGORY_MODEL_PATH
+    if not path or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    try:
+        import joblib
+        obj = joblib.load(path)
+    except Exception:
+        return None
+    if isinstance(obj, dict):
+        return obj.get('vectorizer'), obj.get('model')
+    if isinstance(obj, (tuple, list)) and len(obj) == 2:
+        return tuple(obj)
+    return None
+
+
+def set_model(model):
+    """Install a (vectorizer, classifier) pair, or None for keyword rules."""
+    global _MODEL
+    with _MODEL_LOCK:
+        _MODEL = model if model else False
+    clear_cache()
+
+
+@profiled('ml: warm_up')
+def warm_up():
+    """Load the model now rather than on the first prediction.
+
+    Also swaps in a newer trained version if the manifest changed since the
+    last load, so retraining takes effect without a restart.
+    """
+    global _MODEL, _MODEL_STAMP
+    stamp = _manifest_stamp()
+    if _MODEL is not None and stamp == _MODEL_STAMP:
+        return _MODEL is not False
+    with _MODEL_LOCK:
+        if _MODEL is None or stamp != _MODEL_STAMP:
+            _MODEL = load_model() or False
+            _MODEL_STAMP = stamp
+            clear_cache()
+    return _MODEL is not False
+
+
+_WARMING = None
+
+
+def warm_up_async():
+    """Run warm_up() on a background thread, so startup does not wait on joblib/sklearn."""
+    global _WARMING
+    if _MODEL is not None and _manifest_stamp() == _MODEL_STAMP:
+        return None
+    with _MODEL_LOCK:
+        if _WARMING is None or not _WARMING.is_alive():
+            _WARMING = threading.Thread(target=warm_up, name='category-model-warm-up', daemon=True)
+            _WARMING.start()
+    return _WARMING
+
+
+def clear_cache():
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def _normalize(notes):
+    import pandas as pd
+    return pd.Series(notes, dtype='object').fillna('').astype(str).str.strip().str.lower()
+
+
+def _keyword_predict(texts):
+    cats, confs = [], []
+    for text in texts:
+        for cat, pattern in _KEYWORD_RES:
+            if pattern.search(text):
+                cats.append(cat)
+                confs.append(0.5)
+                break
+        else:
+            cats.append(DEFAULT_CATEGORY)
+            confs.append(0.0)
+    return cats, confs
+
+
+def _model_predict(model, texts):
+    import numpy as np
+    vectorizer, classifier = model
+    X = vectorizer.transform(texts)
+    if hasattr(classifier, 'predict_proba'):
+        proba = classifier.predict_proba(X)
+        best = proba.argmax(axis=1)
+        return [str(c) for c in classifier.classes_[best]], proba[np.arange(len(best)), best].tolist()
+    return [str(c) for c in classifier.predict(X)], [1.0] * len(texts)
+
+
+@profiled('ml: predict_categories', rows=True)
+def predict_categories_with_confidence(notes):
+    """Return a DataFrame with Category and Confidence for each note."""
+    import pandas as pd
+    warm_up()
+    normalized = _normalize(notes)
+    codes, uniques = pd.factorize(normalized)
+    uniques = list(uniques)
+    categories = [None] * len(uniques)
+    confidences = [0.0] * len(uniques)
+
+    missing = []
+    with _CACHE_LOCK:
+        for i, text in enumerate(uniques):
+            hit = _CACHE.get(text)
+            if hit is None:
+                missing.append(i)
+            else:
+                _CACHE.move_to_end(text)
+                categories[i], confidences[i] = hit
+    cache_event('ml: category memo', hits=len(uniques) - len(missing), misses=len(missing))
+
+    if missing:
+        texts = [uniques[i] for i in missing]
+        model = _MODEL
+        if model:
+            try:
+                cats, confs = _model_predict(model, texts)
+            except Exception:
+                cats, confs = _keyword_predict(texts)
+        else:
+            cats, confs = _keyword_predict(texts)
+        limit = config.CATEGORY_CACHE_SIZE
+        with _CACHE_LOCK:
+            for i, text, cat, conf in zip(missing, texts, cats, confs):
+                categories[i], confidences[i] = cat, conf
+                _CACHE[text] = (cat, conf)
+            while len(_CACHE) > limit:
+                _CACHE.popitem(last=False)
+
+    index = notes.index if isinstance(notes, pd.Series) else pd.RangeIndex(len(codes))
+    return pd.DataFrame({
+        'Category': pd.Series(categories, dtype='object').take(codes).to_numpy(),
+        'Confidence': pd.Series(confidences, dtype='float64').take(codes).to_numpy(),
+    }, index=index)
+
+
+def predict_categories(notes):
+    """Vectorized category prediction for a sequence or Series of notes."""
+    return predict_categories_with_confidence(notes)['Category']
+
 
 def categorize(description):
-    if 'swiggy' in description.lower(): return 'Food'
-    return 'Other'
+    return predict_categories([description]).iloc[0]
@@ -0,0 +1,203 @@
+# Streaming, incremental trainer for the category model
+#
+# Notes are hashed into a fixed-size feature space (HashingVectorizer), so
+# there is no vocabulary to fit or hold in memory, and MultinomialNB is
+# trained with partial_fit over chunks. Each run publishes a new versioned
+# artifact plus a manifest recording the last ledger id it has seen; the next
+# incremental run only folds in rows with a higher id. The categorizer
+# watches the manifest and hot-swaps to the newest version. Training runs
+# from the Import & Export page or the command line:
+#
+#   python -m modules.category_trainer [--full]
+
+import json
+import os
+import sys
+
+import config
+from modules.profiler import profiled
+
+MANIFEST_NAME = 'category_model.json'
+UNLABELLED = 'Uncategorized'  # placeholder from statement imports; never a training target
+
+
+def make_vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=config.TRAIN_HASH_FEATURES, alternate_sign=False,
+                             ngram_range=(1, 2), norm=None, lowercase=True)
+
+
+def manifest_path(models_dir=None):
+    return os.path.join(models_dir or config.MODELS_DIR, MANIFEST_NAME)
+
+
+def read_manifest(models_dir=None):
+    try:
+        with open(manifest_path(models_dir), 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def load_artifact(models_dir=None):
+    """Load the artifact the manifest points at, or None."""
+    import joblib
+    manifest = read_manifest(models_dir)
+    if not manifest:
+        return None
+    path = os.path.join(models_dir or config.MODELS_DIR, manifest['file'])
+    try:
+        return joblib.load(path)
+    except Exception:
+        return None
+
+
+def _labelled(df):
+    notes = df['Note'].fillna('').astype(str).str.strip()
+    keep = notes.ne('') & df['Category'].notna() & df['Category'].ne(UNLABELLED)
+    return notes[keep], df.loc[keep, 'Category'].astype(str)
+
+
+def _chunks(df, chunksize):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def fit_chunks(chunks, classes, model=None):
+    """partial_fit model (a new MultinomialNB if None) over chunks of Note/Category."""
+    from sklearn.naive_bayes import MultinomialNB
+    vectorizer = make_vectorizer()
+    model = model if model is not None else MultinomialNB(alpha=0.1)
+    rows = 0
+    for chunk in chunks:
+        notes, labels = _labelled(chunk)
+        if not len(notes):
+            continue
+        model.partial_fit(vectorizer.transform(notes), labels, classes=classes)
+        rows += len(notes)
+    return vectorizer, model, rows
+
+
+def publish(vectorizer, model, last_id, rows, models_dir=None, incremental=False):
+    """Write a new versioned artifact and point the manifest at it."""
+    import joblib
+    models_dir = models_dir or config.MODELS_DIR
+    os.makedirs(models_dir, exist_ok=True)
+    previous = read_manifest(models_dir) or {}
+    version = previous.get('version', 0) + 1
+    name = f'category_model-v{version}.joblib'
+    artifact = {'vectorizer': vectorizer, 'model': model, 'version': version, 'last_id': last_id}
+    joblib.dump(artifact, os.path.join(models_dir, name + '.tmp'))
+    os.replace(os.path.join(models_dir, name + '.tmp'), os.path.join(models_dir, name))
+
+    manifest = {
+        'version': version,
+        'file': name,
+        'last_id': last_id,
+        'classes': [str(c) for c in model.classes_],
+        'rows': previous.get('rows', 0) + rows if incremental else rows,
+        'history': ([previous['file']] if previous.get('file') else []) + previous.get('history', []),
+    }
+    keep = config.MODEL_KEEP_VERSIONS
+    for old in manifest['history'][keep - 1:]:
+        try:
+            os.remove(os.path.join(models_dir, old))
+        except OSError:
+            pass
+    manifest['history'] = manifest['history'][:keep - 1]
+    tmp = manifest_path(models_dir) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, manifest_path(models_dir))
+    return manifest
+
+
+def train_full(df, chunksize=50_000, models_dir=None):
+    """Train from scratch over a ledger frame (with id, Note, Category)."""
+    import numpy as np
+    classes = np.unique(df['Category'].dropna().astype(str))
+    classes = classes[classes != UNLABELLED]
+    if not len(classes):
+        return None
+    vectorizer, model, rows = fit_chunks(_chunks(df, chunksize), classes)
+    if not rows:
+        return None
+    last_id = int(df['id'].max()) if 'id' in df.columns and len(df) else 0
+    return publish(vectorizer, model, last_id, rows, models_dir)
+
+
+def train_csv(path, chunksize=50_000, models_dir=None):
+    """Train from scratch over a CSV file, reading it in chunks."""
+    import numpy as np
+    import pandas as pd
+    classes = set()
+    for chunk in pd.read_csv(path, usecols=['Category'], chunksize=chunksize):
+        classes.update(chunk['Category'].dropna().astype(str))
+    classes.discard(UNLABELLED)
+    if not classes:
+        return None
+    chunks = pd.read_csv(path, usecols=['Category', 'Note'], chunksize=chunksize)
+    vectorizer, model, rows = fit_chunks(chunks, np.array(sorted(classes)))
+    return publish(vectorizer, model, 0, rows, models_dir) if rows else None
+
+
+def train_incremental(df, chunksize=50_000, models_dir=None):
+    """Fold rows with id above the last checkpoint into the current model.
+
+    Falls back to a full retrain when there is no model yet or the new rows
+    introduce a category the model has never seen. Returns the new manifest,
+    or None when there was nothing to learn.
+    """
+    manifest = read_manifest(models_dir)
+    artifact = load_artifact(models_dir) if manifest else None
+    if artifact is None:
+        return train_full(df, chunksize, models_dir)
+    new = df[df['id'] > manifest['last_id']]
+    if new.empty:
+        return None
+    if not set(new['Category'].dropna().astype(str)) - {UNLABELLED} <= set(manifest['classes']):
+        return train_full(df, chunksize, models_dir)
+    model = artifact['model']
+    vectorizer, model, rows = fit_chunks(_chunks(new, chunksize), model.classes_, model)
+    return publish(vectorizer, model, int(new['id'].max()), rows, models_dir, incremental=True)
+
+
+@profiled('view: category model')
+def retrain_view():
+    """Model status, and buttons to fold in new expenses or retrain from scratch."""
+    import streamlit as st
+    from modules.data_loader import retrain_categories
+
+    st.subheader('🏷️ Category Model')
+    manifest = read_manifest()
+    if manifest:
+        st.caption(f"Version {manifest['version']}: trained on {manifest['rows']:,} labelled notes, "
+                   f"up to expense #{manifest['last_id']}.")
+    else:
+        st.caption('No trained model yet; new notes are categorized by keyword rules.')
+    col1, col2 = st.columns(2)
+    full = col2.button('Retrain from scratch')
+    if col1.button('Learn from new expenses') or full:
+        with st.spinner('Training…'):
+            result = retrain_categories(full=full)
+        if result is None:
+            st.info('Nothing new to learn from.')
+        else:
+            st.success(f"Published version {result['version']} ({result['rows']:,} labelled notes).")
+
+
+def main(argv=None):
+    import argparse
+    from modules.data_loader import retrain_categories
+
+    parser = argparse.ArgumentParser(description='Train the category model on the expense ledger.')
+    parser.add_argument('--full', action='store_true', help='retrain from scratch instead of incrementally')
+    args = parser.parse_args(argv)
+    manifest = retrain_categories(full=args.full)
+    print('Nothing new to learn from.' if manifest is None else
+          f"Published version {manifest['version']} ({manifest['rows']:,} labelled notes, "
+          f"last id {manifest['last_id']}).")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
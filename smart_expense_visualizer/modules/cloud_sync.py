@@ -0,0 +1,324 @@
+# Background sync of ledger changes to Google Sheets and Firebase
+#
+# Writes never talk to the network. Each change is recorded in a durable
+# SQLite outbox (one row per target) and a background worker drains it in
+# batches: one multi-row append per batch for Sheets, one multi-path update
+# per batch for Firebase. Failed batches back off exponentially with jitter,
+# rate-limit responses pause the target for the time the service asks for,
+# and whatever is left in the outbox is picked up again after a restart.
+# Workers claim a target's batch under a lease before sending it, so two
+# processes sharing the outbox never send the same records; a batch is only
+# resent if its worker dies mid-send and the lease runs out. Firebase writes
+# are keyed by expense id, so such a replay is idempotent there. Clients are
+# created on first send.
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    op TEXT NOT NULL,
+    expense_id INTEGER NOT NULL,
+    payload TEXT,
+    owner TEXT,
+    leased_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_target ON outbox(target, seq);
+'''
+
+_LEASE_COLUMNS = {'owner': 'TEXT', 'leased_until': 'REAL'}
+
+
+class RateLimited(Exception):
+    """Raised by a sink when the service asks us to slow down."""
+
+    def __init__(self, retry_after=None):
+        super().__init__(f'rate limited, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class Outbox:
+    """Durable queue of (target, op, expense id, payload) records."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=10000')
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')}
+        for name, kind in _LEASE_COLUMNS.items():
+            if name not in columns:  # outbox written before leases existed
+                self._conn.execute(f'ALTER TABLE outbox ADD COLUMN {name} {kind}')
+        self._lock = threading.Lock()
+
+    def put(self, targets, records):
+        """Queue (op, expense_id, payload) records for every target."""
+        rows = [(target, op, int(expense_id), json.dumps(payload) if payload is not None else None)
+                for target in targets for op, expense_id, payload in records]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO outbox (target, op, expense_id, payload) VALUES (?, ?, ?, ?)', rows)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return len(rows)
+
+    def claim(self, target, limit, owner, lease, now=None):
+        """Lease the oldest pending records for target to owner; [] if another owner holds it.
+
+        Records come back as (seq, op, expense_id, payload). A target is
+        leased to one owner at a time so its records are sent in order; an
+        owner's own unexpired lease is extended, and an expired one can be
+        taken over by anyone.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                busy = self._conn.execute(
+                    'SELECT 1 FROM outbox WHERE target = ? AND owner IS NOT NULL AND owner != ? '
+                    'AND leased_until > ? LIMIT 1', (target, owner, now)).fetchone()
+                rows = [] if busy else self._conn.execute(
+                    'SELECT seq, op, expense_id, payload FROM outbox WHERE target = ? ORDER BY seq LIMIT ?',
+                    (target, limit)).fetchall()
+                if rows:
+                    self._conn.execute(
+                        'UPDATE outbox SET owner = ?, leased_until = ? WHERE target = ? AND seq <= ?',
+                        (owner, now + lease, target, rows[-1][0]))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [(seq, op, eid, json.loads(p) if p is not None else None) for seq, op, eid, p in rows]
+
+    def ack(self, target, last_seq, owner):
+        """Delete owner's delivered records up to last_seq; returns how many it still held."""
+        with self._lock:
+            return self._conn.execute('DELETE FROM outbox WHERE target = ? AND seq <= ? AND owner = ?',
+                                      (target, last_seq, owner)).rowcount
+
+    def release(self, target, owner):
+        """Give up owner's lease on target so the records can be retried by any worker."""
+        with self._lock:
+            self._conn.execute('UPDATE outbox SET owner = NULL, leased_until = NULL WHERE target = ? AND owner = ?',
+                               (target, owner))
+
+    def pending(self):
+        """Pending record count per target."""
+        with self._lock:
+            return dict(self._conn.execute('SELECT target, COUNT(*) FROM outbox GROUP BY target').fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SheetsSink:
+    """Appends inserted expenses to a worksheet, one append_rows call per batch.
+
+    Sheets rows are not keyed, so edits and deletes are not mirrored.
+    """
+
+    name = 'sheets'
+    min_interval = 1.0  # Sheets allows ~60 write requests per minute per user
+
+    def __init__(self, key_path=None, sheet_name=None, sheet=None):
+        self.key_path = key_path
+        self.sheet_name = sheet_name
+        self._sheet = sheet
+
+    def _worksheet(self):
+        if self._sheet is None:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+            scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+            creds = ServiceAccountCredentials.from_json_keyfile_name(self.key_path, scope)
+            self._sheet = gspread.authorize(creds).open(self.sheet_name).sheet1
+        return self._sheet
+
+    def send(self, records):
+        rows = [[p['Date'], p['Category'], p['Amount'], p['Note']]
+                for op, _, p in records if op == 'insert']
+        if not rows:
+            return
+        try:
+            self._worksheet().append_rows(rows, value_input_option='USER_ENTERED')
+        except Exception as exc:
+            _raise_if_rate_limited(exc)
+            raise
+
+
+class FirebaseSink:
+    """Mirrors inserts, edits and deletes to expenses/<id> with one multi-path update per batch."""
+
+    name = 'firebase'
+    min_interval = 0.0
+
+    def __init__(self, firebase_config=None, db=None):
+        self.firebase_config = firebase_config
+        self._db = db
+
+    def _database(self):
+        if self._db is None:
+            import pyrebase
+            self._db = pyrebase.initialize_app(self.firebase_config).database()
+        return self._db
+
+    def send(self, records):
+        updates = {}
+        for op, expense_id, payload in records:
+            updates[f'expenses/{expense_id}'] = None if op == 'delete' else payload
+        try:
+            self._database().update(updates)
+        except Exception as exc:
+            _raise_if_rate_limited(exc)
+            raise
+
+
+def _raise_if_rate_limited(exc):
+    response = getattr(exc, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        retry_after = (getattr(response, 'headers', None) or {}).get('Retry-After')
+        raise RateLimited(float(retry_after) if retry_after else None) from exc
+
+
+class SyncWorker:
+    """Drains an Outbox into sinks on a background thread."""
+
+    def __init__(self, outbox, sinks, batch_size=500, max_backoff=300.0, lease=120.0, clock=time.monotonic):
+        self.outbox = outbox
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.lease = lease  # seconds a claimed batch is ours; must outlast one send
+        self.owner = uuid.uuid4().hex
+        self.clock = clock
+        self.sent = {name: 0 for name in self.sinks}
+        self.errors = {}
+        self._failures = {name: 0 for name in self.sinks}
+        self._not_before = {name: 0.0 for name in self.sinks}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, records):
+        """Record (op, expense_id, payload) changes for every sink and wake the worker."""
+        queued = self.outbox.put(self.sinks, records)
+        self._wake.set()
+        return queued
+
+    def flush_once(self):
+        """Send at most one batch per ready target; returns records sent."""
+        sent = 0
+        for name, sink in self.sinks.items():
+            if self.clock() < self._not_before[name]:
+                continue
+            batch = self.outbox.claim(name, self.batch_size, self.owner, self.lease)
+            if not batch:
+                continue
+            try:
+                sink.send([(op, eid, payload) for _, op, eid, payload in batch])
+            except RateLimited as exc:
+                self.outbox.release(name, self.owner)
+                self._failures[name] += 1
+                wait = exc.retry_after if exc.retry_after is not None else self._backoff(name)
+                self._not_before[name] = self.clock() + wait
+                self.errors[name] = str(exc)
+                continue
+            except Exception as exc:
+                self.outbox.release(name, self.owner)
+                self._failures[name] += 1
+                self._not_before[name] = self.clock() + self._backoff(name)
+                self.errors[name] = repr(exc)
+                continue
+            self.outbox.ack(name, batch[-1][0], self.owner)
+            self._failures[name] = 0
+            self.errors.pop(name, None)
+            self._not_before[name] = self.clock() + getattr(sink, 'min_interval', 0.0)
+            self.sent[name] += len(batch)
+            sent += len(batch)
+        return sent
+
+    def _backoff(self, name):
+        base = min(self.max_backoff, 2 ** min(self._failures[name], 16))
+        return base * random.uniform(0.5, 1.0)
+
+    def _delay(self):
+        """Seconds until the next target may send, or None to wait for new work."""
+        pending = self.outbox.pending()
+        ready = [self._not_before[n] for n in self.sinks if pending.get(n)]
+        return max(0.0, min(ready) - self.clock()) if ready else None
+
+    def run(self):
+        while not self._stop.is_set():
+            if self.flush_once():
+                continue
+            self._wake.clear()
+            delay = self._delay()
+            self._wake.wait(delay if delay is None else max(delay, 0.01))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='cloud-sync', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        return {'pending': self.outbox.pending(), 'sent': dict(self.sent), 'errors': dict(self.errors)}
+
+
+def configured_sinks():
+    """Sinks enabled in config; none unless credentials are set."""
+    sinks = []
+    if config.GOOGLE_SHEETS_KEY_PATH:
+        sinks.append(SheetsSink(config.GOOGLE_SHEETS_KEY_PATH, config.GOOGLE_SHEET_NAME))
+    if config.FIREBASE_CONFIG_PATH:
+        with open(config.FIREBASE_CONFIG_PATH, 'r', encoding='utf-8') as fh:
+            sinks.append(FirebaseSink(json.load(fh)))
+    return sinks
+
+
+_WORKER = None
+_WORKER_LOCK = threading.Lock()
+
+
+def get_worker():
+    """The process-wide sync worker, started on first use, or None if no sink is configured."""
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            sinks = configured_sinks()
+            if not sinks:
+                _WORKER = False
+            else:
+                _WORKER = SyncWorker(Outbox(config.SYNC_OUTBOX_PATH), sinks,
+                                     batch_size=config.SYNC_BATCH_SIZE).start()
+        return _WORKER or None
+
+
+def payload(date, category, amount, note):
+    return {'Date': str(date), 'Category': category, 'Amount': float(amount), 'Note': note or ''}
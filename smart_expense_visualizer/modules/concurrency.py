@@ -0,0 +1,153 @@
+# Cross-process locking and group commit for the expense stores
+#
+# FileLock serializes writers across threads (a reentrant lock) and across
+# processes (an OS lock on a sidecar file), so several Streamlit servers or
+# CLI imports can share one ledger. GroupCommit batches writes that arrive
+# within a short window: the first writer becomes the leader, waits for the
+# window, then hands every pending operation to one flush call (one append,
+# one fsync) and wakes the others with their results. Operations are checked
+# by the caller before they join a batch, so one caller's bad input cannot
+# fail the writes it would have been batched with.
+
+import os
+import threading
+import time
+
+
+class FileLock:
+    """Exclusive, reentrant lock shared by threads and processes via a lock file."""
+
+    def __init__(self, path, poll=0.01):
+        self.path = path
+        self.poll = poll
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def _lock_file(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fh = open(self.path, 'a+b')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                fh.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(self.poll)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            fh.close()
+            raise
+        self._fh = fh
+
+    def _unlock_file(self):
+        fh, self._fh = self._fh, None
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            fh.close()
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                self._lock_file()
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                self._unlock_file()
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class GroupCommit:
+    """Coalesce concurrent submit() calls into batched flush(ops) calls.
+
+    flush receives a list of operations and must return one result per
+    operation, in order. prepare, if given, validates and normalizes each
+    operation in the submitting thread before it is queued; whatever it
+    raises goes to that caller alone. If flush itself raises (an I/O error,
+    say), every operation in the batch raises.
+    """
+
+    def __init__(self, flush, window=0.005, prepare=None):
+        self.flush = flush
+        self.window = window
+        self.prepare = prepare
+        self.batches = 0
+        self.ops = 0
+        self._cond = threading.Condition()
+        self._pending = []
+        self._leader = False
+
+    def submit(self, op):
+        if self.prepare is not None:
+            op = self.prepare(op)
+        entry = {'op': op, 'done': False}
+        with self._cond:
+            self._pending.append(entry)
+            while self._leader and not entry['done']:
+                self._cond.wait()
+            if entry['done']:
+                return self._result(entry)
+            self._leader = True
+        try:
+            if self.window:
+                time.sleep(self.window)  # let concurrent writers join this batch
+            self._drain()
+        except BaseException:
+            with self._cond:
+                self._leader = False
+                self._cond.notify_all()
+            raise
+        return self._result(entry)
+
+    def _drain(self):
+        while True:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    # Step down under the same lock that followers enqueue
+                    # under, so nobody is left waiting on a departed leader.
+                    self._leader = False
+                    return
+            try:
+                results, error = self.flush([e['op'] for e in batch]), None
+            except Exception as exc:
+                results, error = [None] * len(batch), exc
+            with self._cond:
+                self.batches += 1
+                self.ops += len(batch)
+                for entry, result in zip(batch, results):
+                    entry.update(result=result, error=error, done=True)
+                self._cond.notify_all()
+
+    @staticmethod
+    def _result(entry):
+        if entry['error'] is not None:
+            raise entry['error']
+        return entry['result']
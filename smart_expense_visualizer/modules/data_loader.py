@@ -1,5 +1,393 @@
 # Handles data loading and preprocessing
+import os
+import threading
 
+import config
+from modules import frame_cache
+from modules.expense_store import ExpenseStore
+from modules.rollups import Rollups
+from modules.profiler import cache_event, profiled, span
+
+_STORE = None
+_ROLLUPS = None
+_ROLLUPS_FINGERPRINT = None
+_ROLLUPS_FOREIGN = None  # store.foreign_writes when the rollups were last in sync
+# Guards the globals above. Writes run their store call outside it (so
+# concurrent sessions share a group commit) but are counted in flight;
+# a rollup rebuild waits for them to land so no delta is double-applied.
+_STATE = threading.Condition(threading.RLock())
+_IN_FLIGHT = 0
+_REBUILDING = False
+_BUDGETS = None  # (rollups, budgets file fingerprint, BudgetEngine)
+_ANALYTICS = None  # (rollups, SpendAnalytics)
+_SEARCH = None  # (rollups, TextIndex)
+_DERIVED = {}  # name -> (fingerprint, object built from the ledger)
+_MATCHES = None  # (fingerprint, filters, positions) of the last page_expenses filter
+
+
+@profiled('load: load_data', rows=True)
 def load_data(file_path):
     import pandas as pd
-    return pd.read_csv(file_path)
+    return frame_cache.cached_frame(('csv', file_path), [file_path], lambda: pd.read_csv(file_path))
+
+
+def get_store():
+    """Return the process-wide expense store for config.STORAGE_BACKEND.
+
+    The first time a backend is opened it is seeded from the legacy CSV (and,
+    for SQLite, the voice-input table).
+    """
+    global _STORE
+    with _STATE:
+        if _STORE is None:
+            if config.STORAGE_BACKEND == 'sqlite':
+                from modules.sqlite_store import SqliteExpenseStore, migrate
+                store = SqliteExpenseStore(config.SQLITE_PATH, group_window=config.GROUP_COMMIT_WINDOW)
+                migrate(store, [config.LEGACY_CSV_PATH], config.VOICE_DB_PATH)
+            elif config.STORAGE_BACKEND == 'log':
+                store = ExpenseStore(config.EXPENSE_LOG_PATH, config.EXPENSE_SNAPSHOT_PATH,
+                                     compact_after=config.COMPACT_AFTER,
+                                     group_window=config.GROUP_COMMIT_WINDOW)
+                if (len(store) == 0 and not os.path.exists(config.EXPENSE_SNAPSHOT_PATH)
+                        and os.path.exists(config.LEGACY_CSV_PATH)):
+                    store.import_frame(load_data(config.LEGACY_CSV_PATH))
+            else:
+                raise ValueError(f'Unknown storage backend: {config.STORAGE_BACKEND!r}')
+            _STORE = store
+        return _STORE
+
+
+def _ledger_paths():
+    if config.STORAGE_BACKEND == 'sqlite':
+        return [config.SQLITE_PATH, config.SQLITE_PATH + '-wal']
+    return [config.EXPENSE_SNAPSHOT_PATH, config.EXPENSE_LOG_PATH]
+
+
+def ledger_fingerprint():
+    """Fingerprint of the ledger files; changes whenever the data does."""
+    get_store()
+    return frame_cache.fingerprint(_ledger_paths())
+
+
+def _invalidate_ledger():
+    for path in _ledger_paths():
+        frame_cache.invalidate(path)
+
+
+@profiled('load: load_expenses', rows=True)
+def load_expenses():
+    """Load the ledger (snapshot plus log tail) sorted by date.
+
+    Columns are parsed once into the compact schema of
+    utils.data_cleaner.typed_frame. The result is cached process-wide and
+    shared between callers; it is a copy-on-write view, so callers may modify
+    it without affecting others.
+    """
+    return frame_cache.cached_frame('expenses', _ledger_paths(), _load_expenses_uncached)
+
+
+def _load_expenses_uncached():
+    from utils.data_cleaner import typed_frame
+    df = typed_frame(get_store().load())
+    return df.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def iter_expenses(start=None, end=None, categories=None, chunksize=None):
+    """Yield ledger rows in date order as frames of at most chunksize rows.
+
+    Date range (inclusive ISO dates) and categories are applied before any
+    rows are materialized: in SQL for the SQLite backend, otherwise as a
+    mask over the Date and Category columns of the cached ledger.
+    """
+    import numpy as np
+    import pandas as pd
+    chunksize = chunksize or config.EXPORT_CHUNK_ROWS
+    store = get_store()
+    if hasattr(store, 'iter_range'):
+        yield from store.iter_range(start, end, categories, chunksize)
+        return
+    df = load_expenses()
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df['Date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df['Date'] < pd.Timestamp(end) + pd.Timedelta(days=1)).to_numpy()
+    if categories:
+        mask &= df['Category'].isin(categories).to_numpy()
+    rows = np.flatnonzero(mask)
+    for offset in range(0, len(rows), chunksize):
+        chunk = df.iloc[rows[offset:offset + chunksize]]
+        yield chunk.assign(Date=chunk['Date'].dt.strftime('%Y-%m-%d'))
+
+
+@profiled('load: page_expenses', rows=lambda result: len(result[0]))
+def page_expenses(start=None, end=None, categories=None, min_amount=None, max_amount=None,
+                  text=None, offset=0, limit=50):
+    """One page of ledger rows matching the filters, newest first, and the total match count.
+
+    Filters (inclusive ISO dates, categories, amount bounds, case-insensitive
+    note text) are applied before rows are materialized: in SQL for the
+    SQLite backend, otherwise as a mask over the cached ledger whose matching
+    positions are kept until the filters or the ledger change, so paging
+    only slices. Rows carry their stable id for edits and deletes.
+    """
+    global _MATCHES
+    import numpy as np
+    import pandas as pd
+    store = get_store()
+    if hasattr(store, 'page'):
+        return store.page(start, end, categories, min_amount, max_amount, text, offset, limit)
+    df = load_expenses()
+    filters = (start, end, tuple(categories or ()), min_amount, max_amount, text or None)
+    current = frame_cache.fingerprint(_ledger_paths())
+    if _MATCHES is not None and _MATCHES[:2] == (current, filters):
+        positions = _MATCHES[2]
+    else:
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (df['Date'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (df['Date'] < pd.Timestamp(end) + pd.Timedelta(days=1)).to_numpy()
+        if categories:
+            mask &= df['Category'].isin(categories).to_numpy()
+        if min_amount is not None:
+            mask &= (df['Amount'] >= min_amount).to_numpy()
+        if max_amount is not None:
+            mask &= (df['Amount'] <= max_amount).to_numpy()
+        positions = np.flatnonzero(mask)
+        if text:
+            # Only scan the notes of rows that survived the cheaper filters.
+            notes = df['Note'].iloc[positions]
+            positions = positions[notes.str.contains(text, case=False, regex=False, na=False).to_numpy()]
+        positions = positions[::-1]  # the ledger is sorted by date; newest first
+        _MATCHES = (current, filters, positions)
+    page = df.iloc[positions[offset:offset + limit]]
+    return page.assign(Date=page['Date'].dt.strftime('%Y-%m-%d')).reset_index(drop=True), len(positions)
+
+
+@profiled('load: get_rollups')
+def get_rollups():
+    """Return day/month/category rollups for the ledger.
+
+    Built from load_expenses() on first use and kept current by the write
+    helpers below; rebuilt if the ledger files change behind our back.
+    """
+    global _ROLLUPS, _ROLLUPS_FINGERPRINT, _ROLLUPS_FOREIGN, _REBUILDING
+    with _STATE:
+        store = get_store()
+        if _ROLLUPS is not None and frame_cache.fingerprint(_ledger_paths()) == _ROLLUPS_FINGERPRINT:
+            return _ROLLUPS
+        _REBUILDING = True
+        try:
+            _STATE.wait_for(lambda: _IN_FLIGHT == 0)
+            current = frame_cache.fingerprint(_ledger_paths())
+            _ROLLUPS = Rollups().rebuild(load_expenses())
+            _ROLLUPS_FINGERPRINT = current
+            _ROLLUPS_FOREIGN = store.foreign_writes
+        finally:
+            _REBUILDING = False
+            _STATE.notify_all()
+        return _ROLLUPS
+
+
+def load_budget_config():
+    from modules.budget_manager import ALL, load_budgets
+    if not os.path.exists(config.BUDGETS_PATH):
+        return {'limits': [{'category': ALL, 'period': 'monthly', 'limit': config.BUDGET_LIMIT}],
+                'thresholds': [0.5, 0.8, 1.0]}
+    return load_budgets(config.BUDGETS_PATH)
+
+
+@profiled('load: get_budget_engine')
+def get_budget_engine():
+    """Return the BudgetEngine, kept current by the rollup deltas of every write."""
+    global _BUDGETS
+    from modules.budget_manager import BudgetEngine
+    rollups = get_rollups()
+    stamp = frame_cache.fingerprint([config.BUDGETS_PATH])
+    if _BUDGETS is None or _BUDGETS[0] is not rollups or _BUDGETS[1] != stamp:
+        if _BUDGETS is not None and _BUDGETS[2].apply in _BUDGETS[0].listeners:
+            _BUDGETS[0].listeners.remove(_BUDGETS[2].apply)
+        previous = _BUDGETS[2] if _BUDGETS is not None else None
+        engine = BudgetEngine(load_budget_config()).rebuild(rollups.daily(), previous)
+        rollups.listeners.append(engine.apply)
+        _BUDGETS = (rollups, stamp, engine)
+    return _BUDGETS[2]
+
+
+@profiled('load: get_analytics')
+def get_analytics():
+    """Return SpendAnalytics for the ledger, kept current by the rollup deltas of every write."""
+    global _ANALYTICS
+    from modules.expense_analyzer import analyze_expenses
+    rollups = get_rollups()
+    if _ANALYTICS is None or _ANALYTICS[0] is not rollups or _ANALYTICS[1].stale:
+        if _ANALYTICS is not None and _ANALYTICS[1].apply in _ANALYTICS[0].listeners:
+            _ANALYTICS[0].listeners.remove(_ANALYTICS[1].apply)
+        analytics = analyze_expenses(load_expenses(), rollups.daily())
+        rollups.listeners.append(analytics.apply)
+        _ANALYTICS = (rollups, analytics)
+    return _ANALYTICS[1]
+
+
+@profiled('load: get_text_index')
+def get_text_index():
+    """Return the note/category TextIndex, kept current by every single-row write."""
+    global _SEARCH
+    from modules.search_index import TextIndex
+    rollups = get_rollups()
+    with _STATE:
+        # Built under the lock so no write's delta lands between load and publish.
+        if _SEARCH is None or _SEARCH[0] is not rollups:
+            _SEARCH = (rollups, TextIndex().rebuild(load_expenses()))
+        return _SEARCH[1]
+
+
+def _derived(name, builder):
+    """Return builder(load_expenses()), rebuilt only when the ledger changes."""
+    get_store()
+    current = frame_cache.fingerprint(_ledger_paths())
+    entry = _DERIVED.get(name)
+    stale = entry is None or entry[0] != current
+    cache_event(f'load: {name}', hits=not stale, misses=stale)
+    if stale:
+        with span(f'load: {name}'):
+            entry = (current, builder(load_expenses()))
+        _DERIVED[name] = entry
+    return entry[1]
+
+
+def get_calendar_index():
+    from modules.calendar_view import CalendarIndex
+    return _derived('calendar', CalendarIndex)
+
+
+def get_query_aggregates():
+    from modules.query_engine import QueryAggregates
+    return _derived('query', QueryAggregates)
+
+
+def get_recurring():
+    from modules.recurring_finder import detect_recurring
+    return _derived('recurring', detect_recurring)
+
+
+def _write(op, apply):
+    """Run a store write, then fold it into the rollups if they were current.
+
+    The rollups only take the delta while every change to the ledger came
+    from this process; once another process has written, they are rebuilt
+    on next use instead.
+    """
+    global _ROLLUPS_FINGERPRINT, _IN_FLIGHT
+    store = get_store()
+    with _STATE:
+        _STATE.wait_for(lambda: not _REBUILDING)
+        _IN_FLIGHT += 1
+    try:
+        result = op()
+        _invalidate_ledger()
+        with _STATE:
+            if _ROLLUPS is not None and result:
+                if _ROLLUPS_FINGERPRINT is not None and store.foreign_writes == _ROLLUPS_FOREIGN:
+                    apply(_ROLLUPS, result)
+                    _ROLLUPS_FINGERPRINT = store.stamp
+                else:
+                    _ROLLUPS_FINGERPRINT = None
+    finally:
+        with _STATE:
+            _IN_FLIGHT -= 1
+            _STATE.notify_all()
+    return result
+
+
+def _apply(rollups, op, expense_id, *row):
+    """Fold one write into the rollups and the text index built alongside them."""
+    getattr(rollups, op)(expense_id, *row[:3])
+    if _SEARCH is not None and _SEARCH[0] is rollups:
+        getattr(_SEARCH[1], op)(expense_id, *row)
+
+
+def _sync(records):
+    """Queue (op, expense_id, payload) changes for cloud sync, if any target is configured."""
+    from modules.cloud_sync import get_worker
+    worker = get_worker()
+    if worker is not None and records:
+        worker.enqueue(records)
+
+
+@profiled('write: save_expense')
+def save_expense(date, category, amount, note=''):
+    from modules.cloud_sync import payload
+    expense_id = _write(lambda: get_store().insert(date, category, amount, note),
+                        lambda r, expense_id: _apply(r, 'insert', expense_id, date, category, amount, note))
+    _sync([('insert', expense_id, payload(date, category, amount, note))])
+    return expense_id
+
+
+@profiled('write: update_expense')
+def update_expense(expense_id, date, category, amount, note=''):
+    from modules.cloud_sync import payload
+    updated = _write(lambda: get_store().update(expense_id, date, category, amount, note),
+                     lambda r, _: _apply(r, 'update', expense_id, date, category, amount, note))
+    if updated:
+        _sync([('update', expense_id, payload(date, category, amount, note))])
+    return updated
+
+
+@profiled('write: delete_expense')
+def delete_expense(expense_id):
+    deleted = _write(lambda: get_store().delete(expense_id),
+                     lambda r, _: _apply(r, 'delete', expense_id))
+    if deleted:
+        _sync([('delete', expense_id, None)])
+    return deleted
+
+
+@profiled('write: save_expenses', rows=True)
+def save_expenses(rows):
+    """Append many (date, category, amount, note) rows in one batched write.
+
+    Batches up to config.DELTA_WRITE_ROWS (voice input, receipts) are folded
+    into the rollups and everything kept current from them, like single
+    writes; larger ones (statement imports) make them rebuild on next use.
+    """
+    global _ROLLUPS_FINGERPRINT
+    from modules.cloud_sync import payload
+    rows = list(rows)
+    if len(rows) <= config.DELTA_WRITE_ROWS:
+        ids = _write(lambda: get_store().insert_many(rows),
+                     lambda r, ids: [_apply(r, 'insert', i, *row) for i, row in zip(ids, rows)])
+    else:
+        ids = get_store().insert_many(rows)
+        _invalidate_ledger()
+        # Cheaper to rebuild the rollups once on next use than apply a bulk delta.
+        with _STATE:
+            _ROLLUPS_FINGERPRINT = None
+    _sync([('insert', i, payload(*row)) for i, row in zip(ids, rows)])
+    return ids
+
+
+@profiled('write: import_statement_file')
+def import_statement_file(source, chunksize=100_000, column_map=None, dayfirst=False, progress=None):
+    """Import a bank statement CSV, skipping transactions imported before."""
+    from modules.categorizer import predict_categories
+    from modules.statement_importer import HashIndex, import_statement
+    index = HashIndex(config.IMPORT_INDEX_PATH)
+    return import_statement(source, save_expenses, index, chunksize=chunksize,
+                            column_map=column_map, dayfirst=dayfirst, progress=progress,
+                            categorize=predict_categories)
+
+
+@profiled('ml: retrain_categories')
+def retrain_categories(full=False):
+    """Train the category model on the ledger; incremental unless full."""
+    from modules import category_trainer
+    df = load_expenses()
+    if full:
+        return category_trainer.train_full(df)
+    return category_trainer.train_incremental(df)
+
+
+def compact_expenses():
+    return get_store().compact()
@@ -1,4 +1,291 @@
-# Generates insights using ML or analytics
+# Spend analytics: rolling baselines, anomalies and month-end forecasts
+#
+# SpendAnalytics is built once per ledger version, with vectorized
+# pandas/NumPy passes and no per-row Python:
+# - transaction baselines: per category, the median and interquartile range
+#   of the previous WINDOW transactions (one groupby-rolling pass over the
+#   ledger in category/date order; the current row is not in its own window);
+# - anomalies: robust z = (amount - median) / (IQR / 1.349), flagged above
+#   Z_THRESHOLD, both for single transactions and for total daily spend
+#   against the trailing DAY_WINDOW calendar days (quiet days count as zero);
+# - forecasts: month-to-date spend per category plus the rest of the month at
+#   a daily rate that moves from the trailing 90-day average toward this
+#   month's pace as the month goes on.
+# After the build, apply(day, category, amount) is subscribed to the rollup
+# deltas like the budget engine: it moves the month-to-date totals and
+# scores new expenses and days against the stored baselines, so a save never
+# triggers a rebuild. A delta for a later month marks the analytics stale.
 
-def analyze_expenses(df):
-    return df.describe()
+import calendar
+import threading
+from datetime import date
+
+from modules.profiler import profiled
+from utils.data_cleaner import as_datetime
+
+WINDOW = 50  # transactions in a category's baseline
+MIN_HISTORY = 10  # transactions needed before a category's rows are scored
+DAY_WINDOW = 28  # calendar days in the daily-spend baseline
+TRAILING_DAYS = 90  # days behind the forecast rate
+Z_THRESHOLD = 3.5
+IQR_TO_SIGMA = 1.349
+
+
+def _robust_z(values, median, iqr, floor=1.0):
+    """(values - median) / robust sigma; sigma is floored so flat histories don't explode."""
+    import numpy as np
+    sigma = np.maximum(iqr / IQR_TO_SIGMA, np.maximum(0.05 * np.abs(median), floor))
+    return (values - median) / sigma
+
+
+def _trailing_stats(series, window, min_periods):
+    """Rolling median and IQR of the previous `window` values (the current one excluded)."""
+    rolling = series.rolling(window, min_periods=min_periods)
+    median = rolling.median()
+    iqr = rolling.quantile(0.75) - rolling.quantile(0.25)
+    return median, iqr
+
+
+class SpendAnalytics:
+    """Anomalies and month-end forecasts, kept current by rollup deltas."""
+
+    def __init__(self, z_threshold=Z_THRESHOLD):
+        self._lock = threading.RLock()
+        self.z_threshold = z_threshold
+        self.stale = False
+        self.as_of = None
+        self.month = None  # 'YYYY-MM' being forecast
+        self.transactions = None  # flagged transactions from the last build
+        self.days = None  # flagged days from the last build
+        self._baseline = {}  # category -> (median, iqr) of its latest WINDOW amounts
+        self._day_baseline = None  # (median, iqr) of the latest DAY_WINDOW daily totals
+        self._new = []  # expenses flagged by apply() since the build
+        self._recent_days = {}  # day -> total for days on or after the last built day
+        self._mtd = {}  # category -> month-to-date spend
+        self._trailing = {}  # category -> average daily spend over TRAILING_DAYS
+        self._trailing_start = None
+
+    # -- build -----------------------------------------------------------
+
+    def rebuild(self, df, daily, today=None):
+        """Recompute from the typed ledger and a Date/Category/Amount daily rollup frame."""
+        with self._lock:
+            self.__init__(self.z_threshold)
+            if df is None or df.empty or daily is None or daily.empty:
+                return self
+            self._build_transactions(df)
+            self._build_days(daily)
+            self._build_forecast(daily, today or date.today())
+            return self
+
+    def _build_transactions(self, df):
+        import numpy as np
+        import pandas as pd
+        category = df['Category']
+        if not isinstance(category.dtype, pd.CategoricalDtype):
+            category = category.astype(str).astype('category')
+        frame = pd.DataFrame({
+            'Date': as_datetime(df['Date']),
+            'Category': category,
+            'Amount': pd.to_numeric(df['Amount'], errors='coerce'),
+            'Note': df['Note'] if 'Note' in df.columns else '',
+        })
+        if 'id' in df.columns:
+            frame.insert(0, 'id', df['id'])
+        frame = frame.dropna(subset=['Date', 'Amount'])
+        # Group on the integer category codes; rows stay in category/date order throughout.
+        codes = frame['Category'].cat.codes.to_numpy()
+        order = np.lexsort((frame['Date'].to_numpy(), codes))
+        frame = frame.iloc[order].reset_index(drop=True)
+        codes = codes[order]
+        amounts = frame['Amount']
+        # Shift within each category so a row's baseline is built from earlier rows only.
+        previous = amounts.groupby(codes, sort=False).shift(1)
+        median, iqr = _trailing_stats(previous.groupby(codes, sort=False), WINDOW, MIN_HISTORY)
+        median = median.reset_index(level=0, drop=True).sort_index().to_numpy()
+        iqr = iqr.reset_index(level=0, drop=True).sort_index().to_numpy()
+        z = _robust_z(amounts.to_numpy(), median, iqr)
+        flagged = np.flatnonzero(np.nan_to_num(z, nan=0.0) > self.z_threshold)
+        self.transactions = frame.iloc[flagged].assign(
+            Category=frame['Category'].iloc[flagged].astype(str),
+            Typical=np.round(median[flagged], 2), Score=np.round(z[flagged], 1))
+
+        names = frame['Category'].cat.categories
+        sizes = np.bincount(codes, minlength=len(names))
+        tail = frame.assign(code=codes).groupby('code', sort=False).tail(WINDOW)
+        stats = tail.groupby('code', sort=False)['Amount'].quantile([0.25, 0.5, 0.75]).unstack()
+        self._baseline = {str(names[c]): (float(r[0.5]), float(r[0.75] - r[0.25]))
+                          for c, r in stats.iterrows() if sizes[c] >= MIN_HISTORY}
+
+    def _build_days(self, daily):
+        import numpy as np
+        import pandas as pd
+        totals = daily.groupby('Date')['Amount'].sum()
+        totals = totals.reindex(pd.date_range(totals.index.min(), totals.index.max(), freq='D'),
+                                fill_value=0.0)
+        median, iqr = _trailing_stats(totals.shift(1), DAY_WINDOW, DAY_WINDOW // 2)
+        z = _robust_z(totals.to_numpy(), median.to_numpy(), iqr.to_numpy())
+        flagged = np.flatnonzero(np.nan_to_num(z, nan=0.0) > self.z_threshold)
+        self.days = pd.DataFrame({
+            'Date': totals.index[flagged], 'Amount': totals.to_numpy()[flagged],
+            'Typical': np.round(median.to_numpy()[flagged], 2), 'Score': np.round(z[flagged], 1)})
+        # Like the history above, the baseline leaves out the day it will score.
+        window = totals.iloc[-DAY_WINDOW - 1:-1]
+        self._day_baseline = (float(window.median()),
+                              float(window.quantile(0.75) - window.quantile(0.25)))
+        last = totals.index[-1].strftime('%Y-%m-%d')
+        self._recent_days = {last: float(totals.iloc[-1])}
+
+    def _build_forecast(self, daily, today):
+        import pandas as pd
+        dates = daily['Date']
+        # Forecast the month of the latest expense, ignoring future-dated rows.
+        as_of = min(dates.max(), pd.Timestamp(today))
+        month_start = as_of.replace(day=1)
+        trailing_start = month_start - pd.Timedelta(days=TRAILING_DAYS)
+        in_month = (dates >= month_start) & (dates <= as_of)
+        trailing = (dates >= trailing_start) & (dates < month_start)
+        self._mtd = daily[in_month].groupby('Category')['Amount'].sum().to_dict()
+        self._trailing = (daily[trailing].groupby('Category')['Amount'].sum() / TRAILING_DAYS).to_dict()
+        self._trailing_start = trailing_start.strftime('%Y-%m-%d')
+        self.as_of = as_of.strftime('%Y-%m-%d')
+        self.month = self.as_of[:7]
+
+    # -- deltas ----------------------------------------------------------
+
+    def apply(self, day, category, amount):
+        """Fold a signed expense delta (from the rollups) into forecasts and anomaly scores."""
+        if day is None or self.month is None:
+            return
+        with self._lock:
+            month = day[:7]
+            if month > self.month:
+                self.stale = True  # a new month needs fresh trailing rates
+                return
+            if month == self.month:
+                self._mtd[category] = self._mtd.get(category, 0.0) + amount
+                if day > self.as_of:
+                    self.as_of = day
+            elif self._trailing_start <= day < self.month + '-01':
+                self._trailing[category] = self._trailing.get(category, 0.0) + amount / TRAILING_DAYS
+            if day >= min(self._recent_days):
+                self._recent_days[day] = self._recent_days.get(day, 0.0) + amount
+            self._score(day, category, amount)
+
+    def _score(self, day, category, amount):
+        if amount < 0:
+            # An edit or delete: forget a matching expense flagged since the build.
+            for i, row in enumerate(self._new):
+                if row[:3] == (day, category, -amount):
+                    del self._new[i]
+                    break
+            return
+        baseline = self._baseline.get(category)
+        if baseline is None:
+            return
+        z = float(_robust_z(amount, *baseline))
+        if z > self.z_threshold:
+            self._new.append((day, category, amount, round(baseline[0], 2), round(z, 1)))
+
+    # -- views -----------------------------------------------------------
+
+    def anomalies(self, limit=20):
+        """Most recent flagged transactions, newest first, the highest score first within a day."""
+        import pandas as pd
+        columns = ['Date', 'Category', 'Amount', 'Typical', 'Score', 'Note']
+        with self._lock:
+            new = pd.DataFrame(self._new, columns=['Date', 'Category', 'Amount', 'Typical', 'Score'])
+            built = self.transactions
+        if built is None:
+            return new.assign(Note='').reindex(columns=columns)
+        built = built.assign(Date=built['Date'].dt.strftime('%Y-%m-%d'))[columns]
+        new = new.assign(Note='(new)')[columns]
+        out = pd.concat([new, built], ignore_index=True) if len(new) else built
+        out = out.sort_values(['Date', 'Score'], ascending=False, kind='stable')
+        return (out if limit is None else out.head(limit)).reset_index(drop=True)
+
+    def top_anomaly(self, days=DAY_WINDOW):
+        """The highest-scoring transaction flagged in the last `days` days (to as_of), or None."""
+        import pandas as pd
+        out = self.anomalies(limit=None)
+        if out.empty or self.as_of is None:
+            return None
+        since = (pd.Timestamp(self.as_of) - pd.Timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        recent = out[out['Date'] >= since]
+        return None if recent.empty else recent.loc[recent['Score'].idxmax()]
+
+    def anomalous_days(self, limit=10):
+        """Most recent days whose total spend was unusually high, newest first."""
+        import pandas as pd
+        columns = ['Date', 'Amount', 'Typical', 'Score']
+        with self._lock:
+            if self.days is None:
+                return pd.DataFrame(columns=columns)
+            median, iqr = self._day_baseline
+            recent = [(d, t, round(median, 2), round(float(_robust_z(t, median, iqr)), 1))
+                      for d, t in self._recent_days.items()]
+            built = self.days.assign(Date=self.days['Date'].dt.strftime('%Y-%m-%d'))
+        recent = pd.DataFrame([r for r in recent if r[3] > self.z_threshold], columns=columns)
+        built = built[~built['Date'].isin(self._recent_days)]
+        out = pd.concat([recent, built], ignore_index=True) if len(recent) else built
+        return out.sort_values(['Date', 'Score'], ascending=False).head(limit).reset_index(drop=True)
+
+    def forecast(self):
+        """Month-end forecast per category for self.month, largest first."""
+        import pandas as pd
+        columns = ['Category', 'Spent', 'Forecast', 'Typical', 'Change']
+        with self._lock:
+            if self.month is None:
+                return pd.DataFrame(columns=columns)
+            year, month = int(self.month[:4]), int(self.month[5:7])
+            days_in_month = calendar.monthrange(year, month)[1]
+            elapsed = int(self.as_of[8:10])
+            weight = elapsed / days_in_month
+            rows = []
+            for category in sorted(set(self._mtd) | set(self._trailing)):
+                spent = self._mtd.get(category, 0.0)
+                trailing = self._trailing.get(category, 0.0)
+                rate = weight * spent / elapsed + (1 - weight) * trailing
+                forecast = spent + rate * (days_in_month - elapsed)
+                typical = trailing * days_in_month
+                rows.append((category, round(spent, 2), round(forecast, 2), round(typical, 2),
+                             forecast / typical - 1 if typical else None))
+        out = pd.DataFrame(rows, columns=columns)
+        return out.sort_values('Forecast', ascending=False).reset_index(drop=True)
+
+
+@profiled('ml: analyze_expenses')
+def analyze_expenses(df, daily=None, today=None):
+    """Build SpendAnalytics for a ledger frame (daily: its day x category rollup, if at hand)."""
+    if daily is None:
+        from modules.rollups import Rollups
+        daily = Rollups().rebuild(df).daily()
+    return SpendAnalytics().rebuild(df, daily, today)
+
+
+@profiled('view: insights')
+def insights_view(analytics):
+    import streamlit as st
+    from modules.suggestion_engine import suggest
+
+    st.subheader('🔮 Month-end Forecast')
+    forecast = analytics.forecast()
+    if forecast.empty:
+        st.info('Not enough data to forecast yet.')
+        return
+    st.caption(f'{analytics.month}, as of {analytics.as_of}')
+    st.dataframe(forecast.assign(Change=forecast['Change'].map(
+        lambda c: '' if c is None or c != c else f'{c:+.0%}')), hide_index=True)
+    for tip in suggest(analytics):
+        st.write(f'💡 {tip}')
+
+    st.subheader('🚩 Unusual Expenses')
+    anomalies = analytics.anomalies()
+    if anomalies.empty:
+        st.success('Nothing out of the ordinary.')
+    else:
+        st.dataframe(anomalies, hide_index=True)
+    days = analytics.anomalous_days()
+    if not days.empty:
+        with st.expander('Unusually expensive days'):
+            st.dataframe(days, hide_index=True)
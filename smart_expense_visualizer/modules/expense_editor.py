@@ -0,0 +1,122 @@
+# Add, browse and edit expenses one page at a time
+#
+# The grid never holds the ledger: filters go to data_loader.page_expenses,
+# which applies them before materializing rows and returns only the visible
+# page plus the match count. Only that page is sent to the browser. Edits
+# and deletes are matched back to the ledger by each row's stable id, never
+# by position, so re-sorting or concurrent writes cannot hit the wrong row.
+
+import hashlib
+import json
+from datetime import date
+
+from modules.profiler import profiled
+
+PAGE_SIZES = [25, 50, 100, 250]
+_EDITABLE = ['Date', 'Category', 'Amount', 'Note']
+
+
+def changed_rows(original, edited):
+    """Split an edited page into (updates, deletes) keyed by id.
+
+    updates: [(id, date, category, amount, note)] for rows whose values
+    changed, with dates as ISO strings; deletes: ids whose Delete box is
+    ticked. Raises ValueError naming the ids whose date is missing or not a
+    date, so nothing is saved from a half-valid page.
+    """
+    import pandas as pd
+    deletes = [int(i) for i in edited.loc[edited['Delete'], 'id']]
+    before = original.set_index('id')[_EDITABLE]
+    after = edited.loc[~edited['Delete']].set_index('id')[_EDITABLE]
+    days = pd.to_datetime(after['Date'].astype(object), errors='coerce')
+    if days.isna().any():
+        raise ValueError(f'Invalid date for expense(s) {[int(i) for i in after.index[days.isna()]]}')
+    after = after.assign(Date=days.dt.strftime('%Y-%m-%d'), Note=after['Note'].fillna(''))
+    before = before.loc[after.index]
+    before = before.assign(Date=pd.to_datetime(before['Date'].astype(object)).dt.strftime('%Y-%m-%d'))
+    differs = (before.astype(str) != after.astype(str)).any(axis=1)
+    updates = [(int(i), r.Date, r.Category, float(r.Amount), r.Note)
+               for i, r in after[differs].iterrows()]
+    return updates, deletes
+
+
+def _add_form(categories):
+    import streamlit as st
+    from modules.data_loader import save_expense
+    with st.form('add_expense', clear_on_submit=True):
+        col1, col2, col3 = st.columns(3)
+        day = col1.date_input('Date', value=date.today())
+        category = col2.text_input('Category', placeholder=', '.join(categories[:3])).strip()
+        amount = col3.number_input('Amount (₹)', min_value=0.0, step=10.0)
+        note = st.text_input('Note')
+        if st.form_submit_button('Add expense'):
+            if amount <= 0 or not category:
+                st.warning('Enter a category and an amount above zero.')
+            else:
+                expense_id = save_expense(day.isoformat(), category, amount, note)
+                st.success(f'Saved expense #{expense_id}.')
+
+
+@profiled('view: add/edit')
+def expense_editor_view(categories):
+    """Add form, filters, one page of the ledger in an editable grid, and pagination."""
+    import pandas as pd
+    import streamlit as st
+    from modules.data_loader import delete_expense, page_expenses, update_expense
+
+    st.subheader('➕ Add Expense')
+    _add_form(categories)
+
+    st.subheader('✏️ Edit Expenses')
+    with st.expander('Filters', expanded=False):
+        col1, col2 = st.columns(2)
+        span = col1.date_input('Date range', value=(), key='edit_dates')
+        chosen = col2.multiselect('Categories', categories, key='edit_categories')
+        col1, col2, col3 = st.columns(3)
+        low = col1.number_input('Min amount', min_value=0.0, value=None, key='edit_min')
+        high = col2.number_input('Max amount', min_value=0.0, value=None, key='edit_max')
+        text = col3.text_input('Note contains', key='edit_text').strip()
+    start = span[0].isoformat() if len(span) > 0 else None
+    end = span[1].isoformat() if len(span) > 1 else start
+
+    page_size = st.session_state.get('edit_page_size', PAGE_SIZES[1])
+    page_no = st.session_state.get('edit_page', 1)
+    filters = dict(start=start, end=end, categories=chosen, min_amount=low, max_amount=high, text=text)
+    if st.session_state.get('edit_filters') != filters:
+        st.session_state['edit_filters'] = filters
+        page_no = st.session_state['edit_page'] = 1
+    rows, total = page_expenses(**filters, offset=(page_no - 1) * page_size, limit=page_size)
+    pages = max(1, -(-total // page_size))
+    if page_no > pages:  # the last page shrank under us
+        page_no = st.session_state['edit_page'] = pages
+        rows, total = page_expenses(**filters, offset=(page_no - 1) * page_size, limit=page_size)
+
+    if not total:
+        st.info('No expenses match these filters.')
+        return
+    grid = rows.assign(Date=pd.to_datetime(rows['Date']).dt.date, Delete=False)[['id'] + _EDITABLE + ['Delete']]
+    # Edits are keyed to the page they were made on, filters included.
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    edited = st.data_editor(grid, key=f'edit_grid_{digest}_{page_no}_{page_size}', hide_index=True,
+                            disabled=['id'], num_rows='fixed',
+                            column_config={'id': st.column_config.NumberColumn('ID', format='%d'),
+                                           'Date': st.column_config.DateColumn('Date', format='YYYY-MM-DD',
+                                                                               required=True)})
+    if st.button('Save changes'):
+        try:
+            updates, deletes = changed_rows(grid, edited)
+        except ValueError as exc:
+            st.error(str(exc))
+            return
+        missing = [i for i, *values in updates if not update_expense(i, *values)]
+        missing += [i for i in deletes if not delete_expense(i)]
+        done = len(updates) + len(deletes) - len(missing)
+        if missing:
+            st.warning(f'{len(missing)} expense(s) were changed elsewhere and no longer exist: {missing}')
+        st.success(f'Saved {done} change(s).')
+        st.rerun()
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    col1.number_input('Page', min_value=1, max_value=pages, key='edit_page')
+    col2.selectbox('Rows per page', PAGE_SIZES, key='edit_page_size')
+    col3.caption(f'{total:,} matching expense(s), page {page_no} of {pages}')
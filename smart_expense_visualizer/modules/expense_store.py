@@ -0,0 +1,315 @@
+# Append-only expense log with compacted snapshots
+#
+# Every insert, edit and delete appends one JSON record to the log, so a
+# write costs O(1) I/O no matter how long the history is. compact() folds
+# the log into a columnar snapshot (Parquet when pyarrow is installed,
+# pickle otherwise) and truncates the log; load() reads the snapshot plus
+# whatever log tail has accumulated since.
+#
+# Writers in any thread or process serialize on a lock file next to the log.
+# Concurrent writes are group-committed: those arriving within a few
+# milliseconds share one append and one fsync. A store notices when another
+# process changed the files since its own last write (foreign_writes) and
+# re-reads its id index before allocating ids. Ids are never reused: the
+# highest id ever allocated is kept in a small sidecar next to the snapshot,
+# so deleting the newest rows and compacting them away does not free theirs.
+
+import json
+import os
+import threading
+
+from modules.concurrency import FileLock, GroupCommit
+from modules.frame_cache import fingerprint
+from utils.data_cleaner import iso_date, iso_dates
+
+COLUMNS = ['id', 'Date', 'Category', 'Amount', 'Note']
+FIELDS = COLUMNS[1:]
+
+
+def _empty_frame():
+    import pandas as pd
+    return pd.DataFrame({
+        'id': pd.Series(dtype='int64'),
+        'Date': pd.Series(dtype='object'),
+        'Category': pd.Series(dtype='object'),
+        'Amount': pd.Series(dtype='float64'),
+        'Note': pd.Series(dtype='object'),
+    })
+
+
+def read_snapshot(path):
+    import pandas as pd
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return _empty_frame()
+    with open(path, 'rb') as fh:
+        magic = fh.read(4)
+    if magic == b'PAR1':
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def write_snapshot(df, path):
+    """Write df to path atomically, preferring Parquet."""
+    tmp = path + '.tmp'
+    try:
+        df.to_parquet(tmp, index=False)
+    except ImportError:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def read_next_id(path):
+    """The id high-water mark stored beside a snapshot (0 if none)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return int(json.load(fh).get('next_id', 0))
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def write_next_id(next_id, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump({'next_id': int(next_id)}, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _record(expense_id, date, category, amount, note):
+    return {
+        'id': int(expense_id),
+        'Date': iso_date(date),
+        'Category': category,
+        'Amount': float(amount),
+        'Note': note if note is not None else '',
+    }
+
+
+def prepare_op(op):
+    """Normalize an ('insert'|'update'|'delete', args) op, raising on values that cannot be stored."""
+    kind, args = op
+    if kind == 'insert':
+        return kind, [(iso_date(d), str(c), float(a), n if n is not None else '') for d, c, a, n in args]
+    if kind == 'update':
+        expense_id, date, category, amount, note = args
+        return kind, (int(expense_id), iso_date(date), str(category), float(amount),
+                      note if note is not None else '')
+    return kind, (int(args[0]),)
+
+
+class ExpenseStore:
+    """Expense ledger backed by a write-ahead log and a compacted snapshot."""
+
+    def __init__(self, log_path, snapshot_path, compact_after=5000, group_window=0.005):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.meta_path = snapshot_path + '.meta'
+        self.compact_after = compact_after
+        self._lock = FileLock(log_path + '.lock')
+        self._group = GroupCommit(self._commit, group_window, prepare=prepare_op)
+        self.stamp = None  # file fingerprint as of our last read or write
+        self.foreign_writes = 0  # times another process changed the ledger under us
+        self._ids = None
+        self._next_id = None
+        self._log_records = 0
+        self._compacting = None
+
+    # -- reading ---------------------------------------------------------
+
+    def _read_log(self):
+        records = []
+        if not os.path.exists(self.log_path):
+            return records
+        with open(self.log_path, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append; drop it.
+                    continue
+        return records
+
+    def _fold(self, snapshot, records):
+        import pandas as pd
+        puts = {}
+        deleted = set()
+        for rec in records:
+            if rec.get('op') == 'del':
+                deleted.add(rec['id'])
+                puts.pop(rec['id'], None)
+            else:
+                puts[rec['id']] = rec
+        touched = deleted.union(puts)
+        if touched:
+            snapshot = snapshot[~snapshot['id'].isin(touched)]
+        if puts:
+            tail = pd.DataFrame([{c: r.get(c) for c in COLUMNS} for r in puts.values()])
+            snapshot = pd.concat([snapshot, tail], ignore_index=True) if len(snapshot) else tail
+        return snapshot.sort_values('id', kind='stable').reset_index(drop=True)
+
+    def load(self):
+        """Return the current ledger as a DataFrame ordered by id."""
+        with self._lock:
+            snapshot = read_snapshot(self.snapshot_path)
+            records = self._read_log()
+            self._log_records = len(records)
+            return self._fold(snapshot, records)
+
+    def _sync(self):
+        """Forget the id index if the files changed since we last touched them."""
+        current = fingerprint([self.snapshot_path, self.log_path])
+        if current != self.stamp:
+            if self.stamp is not None:
+                self.foreign_writes += 1
+            self.stamp = current
+            self._ids = None
+
+    def _ensure_index(self):
+        self._sync()
+        if self._ids is not None:
+            return
+        snapshot = read_snapshot(self.snapshot_path)
+        records = self._read_log()
+        self._log_records = len(records)
+        df = self._fold(snapshot, records)
+        self._ids = set(int(i) for i in df['id'])
+        self._next_id = self._high_water(snapshot, records)
+
+    def _high_water(self, snapshot, records):
+        """Lowest id never handed out, given the snapshot and log before any compaction."""
+        seen = [int(i) for i in snapshot['id']] + [r['id'] for r in records]
+        return max(max(seen, default=0) + 1, read_next_id(self.meta_path))
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_index()
+            return len(self._ids)
+
+    def __contains__(self, expense_id):
+        with self._lock:
+            self._ensure_index()
+            return int(expense_id) in self._ids
+
+    # -- writing ---------------------------------------------------------
+
+    def _append(self, records):
+        os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+        payload = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        with open(self.log_path, 'ab+') as fh:
+            # Never glue a record onto a line torn by a crash mid-append.
+            if fh.seek(0, os.SEEK_END):
+                fh.seek(-1, os.SEEK_END)
+                if fh.read(1) != b'\n':
+                    payload = b'\n' + payload
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.stamp = fingerprint([self.snapshot_path, self.log_path])
+        self._log_records += len(records)
+        if self.compact_after and self._log_records >= self.compact_after:
+            self.compact_async()
+
+    def _commit(self, ops):
+        """Apply a batch of ('insert'|'update'|'delete', args) ops with one append."""
+        with self._lock:
+            self._ensure_index()
+            records, results = [], []
+            try:
+                for kind, args in ops:
+                    if kind == 'insert':
+                        ids = []
+                        for date, category, amount, note in args:
+                            rec = _record(self._next_id, date, category, amount, note)
+                            rec['op'] = 'put'
+                            records.append(rec)
+                            ids.append(self._next_id)
+                            self._ids.add(self._next_id)
+                            self._next_id += 1
+                        results.append(ids)
+                    elif int(args[0]) not in self._ids:
+                        results.append(False)
+                    elif kind == 'update':
+                        rec = _record(*args)
+                        rec['op'] = 'put'
+                        records.append(rec)
+                        results.append(True)
+                    else:
+                        records.append({'op': 'del', 'id': int(args[0])})
+                        self._ids.discard(int(args[0]))
+                        results.append(True)
+                if records:
+                    self._append(records)
+            except BaseException:
+                self._ids = None  # rebuilt from disk on next use
+                raise
+            return results
+
+    def insert(self, date, category, amount, note=''):
+        """Append a new expense and return its id."""
+        return self._group.submit(('insert', [(date, category, amount, note)]))[0]
+
+    def insert_many(self, rows):
+        """Append (date, category, amount, note) tuples; return their ids."""
+        rows = list(rows)
+        return self._group.submit(('insert', rows)) if rows else []
+
+    def update(self, expense_id, date, category, amount, note=''):
+        """Replace an expense. Returns False if the id does not exist."""
+        return self._group.submit(('update', (expense_id, date, category, amount, note)))
+
+    def delete(self, expense_id):
+        """Delete an expense. Returns False if the id does not exist."""
+        return self._group.submit(('delete', (expense_id,)))
+
+    def import_frame(self, df):
+        """Bulk-load a Date/Category/Amount/Note frame straight into the snapshot."""
+        import pandas as pd
+        with self._lock:
+            current = self.load()
+            self._ensure_index()
+            df = df.reindex(columns=FIELDS).copy()
+            df['Note'] = df['Note'].fillna('')
+            df['Date'] = iso_dates(df['Date'])
+            df['Amount'] = df['Amount'].astype(float)
+            df.insert(0, 'id', range(self._next_id, self._next_id + len(df)))
+            self._next_id += len(df)
+            merged = pd.concat([current, df], ignore_index=True) if len(current) else df
+            self._write_compacted(merged, self._next_id)
+            self._ids.update(int(i) for i in df['id'])
+            return len(df)
+
+    # -- compaction ------------------------------------------------------
+
+    def _write_compacted(self, df, next_id):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        # The mark goes first: a crash before the snapshot lands only skips ids.
+        write_next_id(next_id, self.meta_path)
+        write_snapshot(df.reset_index(drop=True), self.snapshot_path)
+        with open(self.log_path, 'w', encoding='utf-8'):
+            pass
+        self.stamp = fingerprint([self.snapshot_path, self.log_path])
+        self._log_records = 0
+
+    def compact(self):
+        """Fold the log into the snapshot and truncate the log."""
+        with self._lock:
+            self._sync()
+            records = self._read_log()
+            if not records:
+                return False
+            snapshot = read_snapshot(self.snapshot_path)
+            next_id = self._high_water(snapshot, records)
+            self._write_compacted(self._fold(snapshot, records), next_id)
+            return True
+
+    def compact_async(self):
+        """Run compact() on a background thread unless one is already running."""
+        if self._compacting is not None and self._compacting.is_alive():
+            return self._compacting
+        self._compacting = threading.Thread(target=self.compact, name='expense-compactor', daemon=True)
+        self._compacting.start()
+        return self._compacting
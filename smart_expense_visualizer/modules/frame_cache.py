@@ -0,0 +1,127 @@
+# Fingerprint-keyed cache for loaded frames
+#
+# Entries are keyed by name and validated against the (path, mtime, size)
+# fingerprint of every source file they were built from, so a stale frame is
+# never served even if a writer forgets to invalidate. The cache is shared by
+# every caller in the process and bounded by an approximate byte budget.
+
+import os
+import threading
+from collections import OrderedDict
+
+import config
+from modules.profiler import cache_event
+
+
+def fingerprint(paths):
+    """Return a hashable (path, mtime_ns, size) tuple for each path."""
+    prints = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            prints.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            prints.append((path, None, None))
+    return tuple(prints)
+
+
+def _enable_copy_on_write():
+    import pandas as pd
+    # Default from pandas 3.0; earlier versions need the option.
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+
+def _frame_bytes(frame):
+    try:
+        return int(frame.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+class FrameCache:
+    """LRU of DataFrames handed out as copy-on-write views."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (paths, fingerprint, frame, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        _enable_copy_on_write()
+
+    def get(self, key, paths, loader):
+        """Return the cached frame for key, calling loader() if any source changed."""
+        paths = tuple(paths)
+        current = fingerprint(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[1] == current
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        cache_event('frame cache', hits=hit, misses=not hit)
+        if hit:
+            return entry[2].copy(deep=False)
+        frame = loader()
+        self.put(key, paths, frame, current)
+        return frame.copy(deep=False)
+
+    def put(self, key, paths, frame, fp=None):
+        nbytes = _frame_bytes(frame)
+        with self._lock:
+            self._drop(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (tuple(paths), fp or fingerprint(paths), frame, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def invalidate(self, path=None):
+        """Drop entries built from path, or everything when path is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [k for k, e in self._entries.items() if path in e[0]]:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+_CACHE = None
+
+
+def get_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = FrameCache(config.FRAME_CACHE_BYTES)
+    return _CACHE
+
+
+def cached_frame(key, paths, loader):
+    return get_cache().get(key, paths, loader)
+
+
+def invalidate(path=None):
+    if _CACHE is not None:
+        _CACHE.invalidate(path)
@@ -0,0 +1,249 @@
+# LLM-backed answers with response caching
+#
+# Completions are cached by (normalized query, data fingerprint, model) in an
+# LRU that can persist to disk, identical in-flight requests are coalesced
+# into one call, and the connectivity probe is cached for a TTL instead of
+# running on every rerun. The completion function is injectable, so the whole
+# path runs offline with a fake.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from modules.profiler import cache_event, profiled
+
+SYSTEM_PROMPT = (
+    "You are a helpful expense assistant embedded in a Streamlit app. "
+    "Use the provided JSON context of the user's expenses for computations. "
+    "Be concise and numeric when appropriate. Currency is INR (₹)."
+)
+
+
+def normalize_query(query):
+    return ' '.join((query or '').lower().split()).rstrip('?.! ')
+
+
+def get_api_key():
+    """Resolve the OpenAI key from OPENAI_API_KEY or Streamlit secrets."""
+    key = os.getenv('OPENAI_API_KEY')
+    if key:
+        return key
+    try:
+        import streamlit as st
+        return st.secrets.get('OPENAI_API_KEY')
+    except Exception:
+        return None
+
+
+def openai_completion(messages, model, max_tokens=300, temperature=0.2):
+    """Default completion function using the openai client."""
+    from openai import OpenAI
+    client = OpenAI(api_key=get_api_key())
+    resp = client.chat.completions.create(model=model, messages=messages,
+                                          temperature=temperature, max_tokens=max_tokens)
+    return resp.choices[0].message.content.strip()
+
+
+class ResponseCache:
+    """LRU of completion texts, optionally mirrored to a JSON file."""
+
+    def __init__(self, max_entries=256, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                for key, value in json.load(fh):
+                    self._entries[tuple(key)] = value
+        except (OSError, ValueError, TypeError):
+            self._entries.clear()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump([[list(k), v] for k, v in self._entries.items()], fh, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run fn once per key at a time; concurrent callers share the result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class LLMAssistant:
+    """Cached, coalesced access to a chat-completion model."""
+
+    def __init__(self, completion=None, model='gpt-4o-mini', cache=None,
+                 health_ttl=300, clock=time.monotonic):
+        self.completion = completion or openai_completion
+        self.model = model
+        self.cache = cache if cache is not None else ResponseCache()
+        self.health_ttl = health_ttl
+        self.calls = 0
+        self._clock = clock
+        self._flight = SingleFlight()
+        self._health = None  # (checked_at, status)
+
+    def ask(self, query, context, data_fingerprint):
+        """Answer query grounded in context, reusing cached answers for unchanged data."""
+        key = (normalize_query(query), str(data_fingerprint), self.model)
+        cached = self.cache.get(key)
+        cache_event('chat: response cache', hits=cached is not None, misses=cached is None)
+        if cached is not None:
+            return cached
+
+        def call():
+            again = self.cache.get(key)
+            if again is not None:
+                return again
+            self.calls += 1
+            messages = [
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': f'Context: {json.dumps(context, ensure_ascii=False, default=str)}'
+                                            f'\n\nQuestion: {query}'},
+            ]
+            text = self.completion(messages, self.model)
+            self.cache.put(key, text)
+            return text
+
+        return self._flight.do(key, call)
+
+    def health(self, force=False):
+        """Return a status line, probing the model at most once per TTL."""
+        now = self._clock()
+        if not force and self._health is not None and now - self._health[0] < self.health_ttl:
+            return self._health[1]
+
+        def probe():
+            self.calls += 1
+            messages = [
+                {'role': 'system', 'content': 'You are a health-check bot.'},
+                {'role': 'user', 'content': "Reply with 'pong'."},
+            ]
+            try:
+                reply = self.completion(messages, self.model, max_tokens=5, temperature=0.0).lower()
+            except ImportError:
+                return "AI error: 'openai' package not installed."
+            except Exception as exc:
+                return f'AI error: {exc}'
+            if 'pong' in reply:
+                return 'AI OK: connectivity verified.'
+            return f'AI reachable but unexpected reply: {reply}'
+
+        status = self._flight.do(('health', self.model), probe)
+        self._health = (self._clock(), status)
+        return status
+
+
+def build_context(agg, preview_rows=10):
+    """Small JSON-able summary of the ledger to ground the model."""
+    if agg is None or not len(agg.frame):
+        return {'total_spent': 0.0, 'top_categories': {}, 'rows_preview': []}
+    top = agg.category_totals.head(5)
+    return {
+        'total_spent': agg.total,
+        'top_categories': {agg.category_names.get(k, k): float(v) for k, v in top.items()},
+        'rows_preview': agg.frame.tail(preview_rows).to_dict(orient='records'),
+    }
+
+
+_ASSISTANT = None
+
+
+def get_assistant():
+    global _ASSISTANT
+    if _ASSISTANT is None:
+        import config
+        _ASSISTANT = LLMAssistant(model=config.LLM_MODEL,
+                                  cache=ResponseCache(config.LLM_CACHE_SIZE, config.LLM_CACHE_PATH),
+                                  health_ttl=config.LLM_HEALTH_TTL)
+    return _ASSISTANT
+
+
+@profiled('chat: handle_query')
+def handle_query(query, agg, data_fingerprint, assistant=None, index=None):
+    """Answer with the LLM when a key is configured, else with the rule engine.
+
+    index: optional TextIndex for note searches in the rule engine.
+    """
+    from modules.query_engine import answer
+    query = (query or '').strip()
+    if not query:
+        return 'Please enter a question.'
+    if assistant is None:
+        if not get_api_key():
+            return answer(query, agg, index)
+        assistant = get_assistant()
+    try:
+        return assistant.ask(query, build_context(agg), data_fingerprint)
+    except Exception:
+        return answer(query, agg, index)
@@ -1,5 +1,184 @@
 # OCR extraction using pytesseract
+#
+# scan_batch() takes many receipts (paths, uploads, raw bytes or zip archives),
+# serves repeats from a cache keyed by the SHA-256 of the image bytes, and
+# fans the rest out across a process pool. Each worker downscales, grayscales
+# and binarizes the image before running Tesseract. Results are yielded as
+# each file finishes rather than after the whole batch.
 
-def scan_bill(image_path):
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+from modules.profiler import cache_event, profiled
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.webp')
+
+
+def _configure_tesseract_cmd():
+    import pytesseract
+    tcmd = os.getenv('TESSERACT_CMD')
+    if tcmd:
+        pytesseract.pytesseract.tesseract_cmd = tcmd
+
+
+def preprocess(img, max_side=1600, threshold=160):
+    """Downscale to max_side, convert to grayscale and binarize."""
+    img = img.convert('L')
+    longest = max(img.size)
+    if max_side and longest > max_side:
+        scale = max_side / float(longest)
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    return img.point(lambda p: 255 if p > threshold else 0, mode='1')
+
+
+@profiled('ocr: scan_bill')
+def scan_bill(image_path, max_side=1600):
     import pytesseract
-    return pytesseract.image_to_string(image_path)
+    from PIL import Image
+    _configure_tesseract_cmd()
+    with Image.open(image_path) as img:
+        return pytesseract.image_to_string(preprocess(img, max_side))
+
+
+def _ocr_bytes(data, max_side=1600):
+    """Process-pool worker: OCR one image given as bytes."""
+    return scan_bill(io.BytesIO(data), max_side)
+
+
+def image_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class OCRCache:
+    """OCR text keyed by image content hash, kept in memory and optionally on disk."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._memory = {}
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + '.json')
+
+    def get(self, digest):
+        if digest in self._memory:
+            return self._memory[digest]
+        if self.directory:
+            try:
+                with open(self._path(digest), 'r', encoding='utf-8') as fh:
+                    text = json.load(fh)['text']
+            except (OSError, ValueError, KeyError):
+                return None
+            self._memory[digest] = text
+            return text
+        return None
+
+    def put(self, digest, text):
+        self._memory[digest] = text
+        if self.directory:
+            path = self._path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as fh:
+                json.dump({'text': text}, fh, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+
+
+def _read_input(item):
+    """Normalize a path, (name, bytes) pair or file-like upload to (name, bytes)."""
+    if isinstance(item, tuple):
+        return item
+    if isinstance(item, (str, os.PathLike)):
+        with open(item, 'rb') as fh:
+            return os.path.basename(item), fh.read()
+    name = getattr(item, 'name', 'upload')
+    data = item.getvalue() if hasattr(item, 'getvalue') else item.read()
+    return name, data
+
+
+def expand_inputs(items):
+    """Yield (name, bytes) for every image in items, unpacking zip archives."""
+    for item in items:
+        name, data = _read_input(item)
+        if name.lower().endswith('.zip'):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for member in archive.infolist():
+                    if not member.is_dir() and member.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        yield f'{name}/{member.filename}', archive.read(member)
+        else:
+            yield name, data
+
+
+def scan_batch(items, workers=None, cache=None, max_side=1600):
+    """OCR many receipts, yielding {'name', 'hash', 'text', 'cached', 'error'} as each finishes.
+
+    Duplicate images in the batch are scanned once.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    cache = cache if cache is not None else OCRCache()
+    pending = {}  # hash -> [names]
+    payloads = {}
+    for name, data in expand_inputs(items):
+        digest = image_hash(data)
+        text = cache.get(digest)
+        cache_event('ocr: cache', hits=text is not None, misses=text is None)
+        if text is not None:
+            yield {'name': name, 'hash': digest, 'text': text, 'cached': True, 'error': None}
+        elif digest in pending:
+            pending[digest].append(name)
+        else:
+            pending[digest] = [name]
+            payloads[digest] = data
+    if not pending:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_ocr_bytes, data, max_side): digest for digest, data in payloads.items()}
+        payloads.clear()
+        for future in as_completed(futures):
+            digest = futures[future]
+            try:
+                text, error = future.result(), None
+                cache.put(digest, text)
+            except Exception as exc:
+                text, error = '', str(exc)
+            for name in pending[digest]:
+                yield {'name': name, 'hash': digest, 'text': text, 'cached': False, 'error': error}
+
+
+_CACHE = None
+
+
+def get_cache():
+    global _CACHE
+    if _CACHE is None:
+        import config
+        _CACHE = OCRCache(config.OCR_CACHE_DIR)
+    return _CACHE
+
+
+@profiled('view: receipt scanner')
+def receipt_scanner_view():
+    import streamlit as st
+    import config
+
+    st.subheader('🧾 Scan Receipts (OCR)')
+    uploads = st.file_uploader('Upload receipt images or a zip of them',
+                               type=[e.lstrip('.') for e in IMAGE_EXTENSIONS] + ['zip'],
+                               accept_multiple_files=True)
+    if not uploads or not st.button('Scan & Extract'):
+        return
+    progress = st.empty()
+    done = 0
+    for result in scan_batch(uploads, workers=config.OCR_WORKERS, cache=get_cache(),
+                             max_side=config.OCR_MAX_SIDE):
+        done += 1
+        progress.caption(f'Scanned {done} receipt(s)…')
+        label = result['name'] + (' (cached)' if result['cached'] else '')
+        with st.expander(label, expanded=False):
+            if result['error']:
+                st.error(f"OCR failed: {result['error']}")
+            else:
+                st.text(result['text'])
+    progress.caption(f'Scanned {done} receipt(s).')
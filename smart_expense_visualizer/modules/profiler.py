@@ -0,0 +1,190 @@
+# Opt-in wall-time profiling of the hot paths
+#
+# Functions are wrapped with @profiled(name) and ad-hoc sections with
+# span(name); both record call count, errors, total and max wall time and
+# (optionally) rows processed. Caches report hits and misses with
+# cache_event(). Times are inclusive, so a page span also contains the loads
+# it triggered. While profiling is off a wrapped call costs one flag check.
+#
+# Turn it on with EXPENSE_PROFILING=1 or from the diagnostics sidebar panel.
+# The switch and the aggregates are process-wide, like the caches they
+# measure: the panel flips them for every session, and only when clicked.
+# Set EXPENSE_PROFILE_LOG to also append every call to a JSONL trace, and
+# use write_report() for a JSON (or JSONL) dump of the aggregates.
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+_ENABLED = config.PROFILING
+_LOCK = threading.Lock()
+_STATS = {}  # name -> [calls, errors, total_s, max_s, rows, hits, misses]
+_TRACE = None  # open JSONL trace file, if config.PROFILE_LOG_PATH is set
+
+
+def enable(on=True):
+    global _ENABLED
+    _ENABLED = bool(on)
+
+
+def is_enabled():
+    return _ENABLED
+
+
+def reset():
+    with _LOCK:
+        _STATS.clear()
+
+
+def _entry(name):
+    entry = _STATS.get(name)
+    if entry is None:
+        entry = _STATS[name] = [0, 0, 0.0, 0.0, 0, 0, 0]
+    return entry
+
+
+def _record(name, seconds, rows=None, error=False):
+    global _TRACE
+    with _LOCK:
+        entry = _entry(name)
+        entry[0] += 1
+        entry[1] += bool(error)
+        entry[2] += seconds
+        entry[3] = max(entry[3], seconds)
+        if rows:
+            entry[4] += rows
+        if config.PROFILE_LOG_PATH:
+            if _TRACE is None:
+                _TRACE = open(config.PROFILE_LOG_PATH, 'a', encoding='utf-8', buffering=1)
+            _TRACE.write(json.dumps({'t': time.time(), 'name': name, 'ms': round(seconds * 1e3, 3),
+                                     'rows': rows, 'error': bool(error)}) + '\n')
+
+
+def _count_rows(result):
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def profiled(name=None, rows=False):
+    """Decorator recording each call of fn under name (default: module.qualname).
+
+    rows: True to count len(result) as rows processed, or a callable taking
+    the result and returning the row count.
+    """
+    def decorate(fn):
+        label = name or f'{fn.__module__}.{fn.__qualname__}'
+        counter = _count_rows if rows is True else rows or None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                _record(label, time.perf_counter() - started, error=True)
+                raise
+            _record(label, time.perf_counter() - started, counter(result) if counter else None)
+            return result
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def span(name, rows=None):
+    """Record the enclosed block under name."""
+    if not _ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        _record(name, time.perf_counter() - started, rows, error=True)
+        raise
+    _record(name, time.perf_counter() - started, rows)
+
+
+def cache_event(name, hits=0, misses=0):
+    """Count cache hits and misses under name."""
+    if not _ENABLED:
+        return
+    with _LOCK:
+        entry = _entry(name)
+        entry[5] += hits
+        entry[6] += misses
+
+
+def snapshot():
+    """Aggregates per name, slowest total first."""
+    with _LOCK:
+        items = [(name, list(entry)) for name, entry in _STATS.items()]
+    rows = []
+    for name, (calls, errors, total, peak, n_rows, hits, misses) in items:
+        lookups = hits + misses
+        rows.append({
+            'name': name,
+            'calls': calls,
+            'errors': errors,
+            'total_ms': round(total * 1e3, 3),
+            'mean_ms': round(total * 1e3 / calls, 3) if calls else None,
+            'max_ms': round(peak * 1e3, 3),
+            'rows': n_rows,
+            'cache_hits': hits,
+            'cache_misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+        })
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows
+
+
+def report():
+    from modules import frame_cache
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'pid': os.getpid(),
+            'enabled': _ENABLED, 'frame_cache': frame_cache.get_cache().stats(),
+            'stats': snapshot()}
+
+
+def write_report(path):
+    """Dump the aggregates to path: one JSON document, or one line per name for .jsonl."""
+    data = report()
+    with open(path, 'w', encoding='utf-8') as fh:
+        if path.endswith('.jsonl'):
+            for row in data['stats']:
+                fh.write(json.dumps(row) + '\n')
+        else:
+            json.dump(data, fh, indent=2)
+    return path
+
+
+def diagnostics_panel():
+    """Sidebar toggle for profiling plus the collected timings and cache hit rates."""
+    import streamlit as st
+
+    with st.sidebar.expander('🩺 Diagnostics', expanded=False):
+        if st.button('Stop profiling' if _ENABLED else 'Start profiling', key='profiling_toggle',
+                     help='Applies to every session of this app process.'):
+            enable(not _ENABLED)
+            st.rerun()
+        if not _ENABLED and not _STATS:
+            st.caption('Off. Turn on to time loads, views, queries, OCR and predictions.')
+            return
+        data = report()
+        cache = data['frame_cache']
+        st.caption(f"Frame cache: {cache['entries']} entries, {cache['bytes'] / 2 ** 20:.1f} MiB, "
+                   f"hit rate {cache['hit_rate']:.0%}")
+        if data['stats']:
+            st.dataframe(data['stats'], hide_index=True)
+        col1, col2 = st.columns(2)
+        col1.download_button('JSON', json.dumps(data, indent=2), file_name='profile.json',
+                             mime='application/json')
+        if col2.button('Reset'):
+            reset()
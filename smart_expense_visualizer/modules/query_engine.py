@@ -0,0 +1,228 @@
+# Rule-based answers to expense questions
+#
+# Queries are matched against intent patterns compiled once at import, slots
+# (month, year, date range, N, categories) are parsed out of the text, and
+# answers come from QueryAggregates: date-sorted prefix sums for range totals
+# via binary search, plus cached category and daily totals. Free-text terms
+# ("expenses with swiggy", "compare uber vs ola") are looked up in the
+# note/category TextIndex (modules.search_index) when one is passed. Nothing
+# here copies or re-parses the ledger per question.
+
+import calendar
+import re
+from datetime import MAXYEAR, MINYEAR, date
+
+from modules.profiler import profiled
+from utils.data_cleaner import as_datetime
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTH_RE = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+_ISO_DATE = r'(\d{4}-\d{2}-\d{2})'
+
+# (intent, pattern) in priority order; the first match wins.
+INTENTS = [
+    ('search', re.compile(r'\b(?:expenses?|spen[dt]|transactions?|payments?)\s+'
+                          r'(?:with|at|mentioning|containing|matching)\s+([a-z0-9][a-z0-9\s]*)')),
+    ('total', re.compile(r'\b(?:total spen[dt]|how much did i spend)\b')),
+    ('summarize_last', re.compile(r'\bsummari[sz]e\s+last(?:\s+(\d+))?\s+expenses\b')),
+    ('last_n', re.compile(r'\blast\s+(\d+)\s+expenses\b')),
+    ('largest', re.compile(r'\b(?:largest|biggest)\s+expense\b')),
+    ('smallest', re.compile(r'\bsmallest\s+expense\b')),
+    ('average_daily', re.compile(r'\baverage\s+daily\s+spen[dt]\b')),
+    ('compare', re.compile(r'\bcompare\s+([a-z][a-z\s]*?)\s+(?:vs\.?|versus|and)\s+([a-z][a-z\s]*)')),
+    ('range', re.compile(r'\b(?:between|from)\s+' + _ISO_DATE + r'\s+(?:and|to)\s+' + _ISO_DATE)),
+    ('month', re.compile(r'\b(?:monthly\s+total\s+for|spen[dt]\s+in|total\s+(?:for|in))\s+'
+                         r'(' + _MONTH_RE + r')\b\.?(?:\s+(\d{4}))?')),
+    ('top_category', re.compile(r'\b(?:top|highest|biggest)\b(?:\s+(\d+))?.*\bcategor')),
+]
+
+_PREVIEW_COLUMNS = ['Date', 'Category', 'Amount', 'Note']
+MAX_ROWS = 50
+
+BAD_DATE = "Sorry, I couldn't read that date. Use real dates like 2024-01-31 or 'spend in July 2025'."
+
+HELP = ("Sorry, I didn’t understand that. Try asking things like 'total spent', "
+        "'food expenses', 'expenses with uber', 'spend in July 2025' or 'top category'.")
+
+
+class QueryAggregates:
+    """Precomputed arrays and totals the intents are answered from."""
+
+    def __init__(self, df):
+        import numpy as np
+        import pandas as pd
+        dates = as_datetime(df['Date'])
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        self.frame = df.iloc[order].reset_index(drop=True)
+        self.dates = dates.to_numpy()[order].astype('datetime64[D]')
+        amounts = self.frame['Amount'].fillna(0).to_numpy(dtype=float)
+        self.amounts = amounts
+        self.prefix = np.concatenate([[0.0], np.cumsum(amounts)])
+        self.total = float(self.prefix[-1])
+        # NaT sorts last, so valid dates are a prefix of the arrays.
+        self.n_dated = int((~np.isnat(self.dates)).sum())
+
+        # Work on the category dictionary, not per row.
+        categories = self.frame['Category']
+        if not isinstance(categories.dtype, pd.CategoricalDtype):
+            categories = categories.astype(str).astype('category')
+        names = pd.Series(categories.cat.categories.astype(str))
+        lowered = names.str.lower().to_numpy()
+        codes = categories.cat.codes.to_numpy()
+        self.category_totals = (pd.Series(amounts[codes >= 0]).groupby(lowered[codes[codes >= 0]]).sum()
+                                .sort_values(ascending=False))
+        self.category_names = dict(zip(lowered, names))
+        names = sorted(self.category_totals.index, key=len, reverse=True)
+        self.category_re = (re.compile(r'\b(' + '|'.join(re.escape(n) for n in names) + r')\b')
+                            if names else None)
+        if self.n_dated:
+            days, starts = np.unique(self.dates[:self.n_dated], return_index=True)
+            self.daily_totals = np.add.reduceat(amounts[:self.n_dated], starts)
+            self.days = days
+        else:
+            self.daily_totals = np.zeros(0)
+            self.days = self.dates[:0]
+
+    def range_sum(self, start, end):
+        """Total spend for start <= date <= end, in O(log n)."""
+        import numpy as np
+        dated = self.dates[:self.n_dated]
+        lo = np.searchsorted(dated, np.datetime64(start, 'D'), side='left')
+        hi = np.searchsorted(dated, np.datetime64(end, 'D'), side='right')
+        return float(self.prefix[hi] - self.prefix[lo]), int(hi - lo)
+
+    def category_total(self, name):
+        return float(self.category_totals.get(name.lower(), 0.0))
+
+    def categories_in(self, text):
+        if self.category_re is None:
+            return []
+        return self.category_re.findall(text)
+
+    def latest_year_for(self, month):
+        if not self.n_dated:
+            return None
+        months = self.days.astype('datetime64[M]').astype(int) % 12 + 1
+        years = self.days.astype('datetime64[Y]').astype(int) + 1970
+        hits = years[months == month]
+        return int(hits.max()) if len(hits) else int(years.max())
+
+
+def parse_slots(query):
+    """Extract the intent and its slots from a normalized (lowercase) query."""
+    for intent, pattern in INTENTS:
+        match = pattern.search(query)
+        if match:
+            return intent, match.groups()
+    return None, ()
+
+
+def _preview(agg, n):
+    cols = [c for c in _PREVIEW_COLUMNS if c in agg.frame.columns]
+    return agg.frame.tail(n)[cols]
+
+
+def _describe_row(agg, label, i):
+    import numpy as np
+    row = agg.frame.iloc[i]
+    note = str(row.get('Note', '') or '').strip()
+    note_part = f' Note: {note}.' if note else ''
+    day = agg.dates[i]
+    when = str(row.get('Date', '')) if np.isnat(day) else str(day)
+    return f"{label}: ₹{agg.amounts[i]:.2f} on {when} ({row.get('Category', '')}).{note_part}"
+
+
+def _term_total(agg, index, term):
+    """Spend on a category, or failing that on expenses whose notes match term."""
+    if term.lower() in agg.category_totals.index or index is None:
+        return agg.category_total(term)
+    return index.term_total(term)[0]
+
+
+@profiled('chat: answer')
+def answer(query, agg, index=None):
+    """Answer query from agg (and index, for free-text terms), or return the help text."""
+    if agg is None or not len(agg.frame):
+        return 'No expense data available yet. Add some expenses first.'
+    low = ' '.join((query or '').lower().split())
+    intent, slots = parse_slots(low)
+
+    if intent == 'total':
+        return f"You've spent a total of ₹{agg.total:.2f}."
+
+    if intent in ('last_n', 'summarize_last'):
+        n = max(1, min(int(slots[0]) if slots[0] else 10, MAX_ROWS))
+        out = _preview(agg, n)
+        if intent == 'last_n':
+            return out.to_string(index=False)
+        total = float(agg.prefix[-1] - agg.prefix[max(len(agg.amounts) - n, 0)])
+        return f'Last {n} expenses (total ₹{total:.2f}):\n' + out.to_string(index=False)
+
+    if intent == 'largest':
+        return _describe_row(agg, 'Largest expense', int(agg.amounts.argmax()))
+
+    if intent == 'smallest':
+        return _describe_row(agg, 'Smallest expense', int(agg.amounts.argmin()))
+
+    if intent == 'average_daily':
+        if not len(agg.daily_totals):
+            return 'Dates are not parseable to compute daily average.'
+        return f'Average daily spend: ₹{float(agg.daily_totals.mean()):.2f}.'
+
+    if intent == 'compare':
+        a, b = slots[0].strip(), slots[1].strip()
+        a = (agg.categories_in(a) or [a])[0]
+        b = (agg.categories_in(b) or [b])[0]
+        av, bv = _term_total(agg, index, a), _term_total(agg, index, b)
+        winner = a if av >= bv else b
+        return f'{a.title()}: ₹{av:.2f} vs {b.title()}: ₹{bv:.2f} → Higher: {winner.title()}.'
+
+    if intent == 'search':
+        term = slots[0].strip()
+        if index is None:
+            return 'Search is not available right now.'
+        rows, total, count = index.matches(term, limit=5)
+        if not count:
+            return f'No expenses match “{term}”.'
+        latest = rows[[c for c in _PREVIEW_COLUMNS if c in rows.columns]].to_string(index=False)
+        return f'{count} expenses match “{term}”, totalling ₹{total:.2f}. Latest:\n{latest}'
+
+    if intent == 'range':
+        try:
+            start, end = sorted(date.fromisoformat(slot).isoformat() for slot in slots)
+        except ValueError:
+            return BAD_DATE
+        total, count = agg.range_sum(start, end)
+        return f'Total between {start} and {end}: ₹{total:.2f} across {count} expenses.'
+
+    if intent == 'month':
+        month = MONTHS[slots[0]]
+        year = int(slots[1]) if slots[1] else agg.latest_year_for(month)
+        if year is None:
+            return 'Dates are not parseable to compute monthly totals.'
+        if not MINYEAR <= year <= MAXYEAR:
+            return BAD_DATE
+        last = calendar.monthrange(year, month)[1]
+        total, _ = agg.range_sum(f'{year}-{month:02d}-01', f'{year}-{month:02d}-{last:02d}')
+        return f'Spend in {calendar.month_name[month]} {year}: ₹{total:.2f}.'
+
+    if intent == 'top_category':
+        if agg.category_totals.empty:
+            return 'No categorized expenses found.'
+        if not slots[0]:
+            top = agg.category_totals.index[0]
+            return (f'Top category: {agg.category_names.get(top, top).title()} '
+                    f'with ₹{agg.category_totals.iloc[0]:.2f}.')
+        n = max(1, min(int(slots[0]), MAX_ROWS))
+        lines = [f'{i}. {agg.category_names.get(name, name).title()}: ₹{total:.2f}'
+                 for i, (name, total) in enumerate(agg.category_totals.head(n).items(), 1)]
+        return f'Top {len(lines)} categories:\n' + '\n'.join(lines)
+
+    matched = agg.categories_in(low)
+    if matched:
+        name = matched[0]
+        return f'You spent ₹{agg.category_total(name):.2f} on {name}.'
+
+    return HELP
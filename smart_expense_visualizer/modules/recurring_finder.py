@@ -1,5 +1,130 @@
 # Detects recurring monthly expenses
+#
+# Transactions are grouped by normalized note and clustered by amount (a
+# cluster continues while each amount is within the tolerance of the last),
+# then every cluster's inter-arrival intervals are analysed with NumPy in one
+# sorted pass: the median gap picks the cadence (weekly, monthly, annual) and
+# the spread of the gaps decides whether the pattern is regular. Runs in
+# O(n log n) with no per-group Python callbacks.
 
-def detect_recurring(df):
-    # Dummy function
-    return []
+import re
+
+from modules.profiler import profiled
+from utils.data_cleaner import as_datetime
+
+CADENCES = [
+    # name, accepted median gap in days
+    ('weekly', (5, 9)),
+    ('biweekly', (12, 16)),
+    ('monthly', (26, 35)),
+    ('quarterly', (84, 98)),
+    ('annual', (350, 380)),
+]
+
+_NOISE = re.compile(r'[^a-z\s]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_note(note):
+    """Lowercase, drop digits and punctuation (dates, reference numbers), squeeze spaces."""
+    return _SPACES.sub(' ', _NOISE.sub(' ', str(note or '').lower())).strip()
+
+
+@profiled('ml: detect_recurring')
+def detect_recurring(df, amount_tolerance=0.1, min_occurrences=3, max_jitter=0.25):
+    """Return one row per recurring series.
+
+    Columns: Note, Category, Cadence, Occurrences, Amount (mean), LastDate,
+    NextDate, NextAmount, Regularity (1.0 = perfectly regular gaps).
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = ['Note', 'Category', 'Cadence', 'Occurrences', 'Amount', 'LastDate',
+               'NextDate', 'NextAmount', 'Regularity']
+    if df is None or df.empty:
+        return pd.DataFrame(columns=columns)
+
+    note_col = 'Note' if 'Note' in df.columns else 'Description'
+    notes = df[note_col] if note_col in df.columns else df['Category']
+    # Normalize each distinct note once rather than once per row.
+    codes, uniques = pd.factorize(notes.fillna('').astype(str))
+    keys = np.array([normalize_note(u) for u in uniques], dtype=object)
+    frame = pd.DataFrame({
+        'key': keys[codes] if len(uniques) else np.array([], dtype=object),
+        'Category': df['Category'].astype(str),
+        'Date': as_datetime(df['Date']),
+        'Amount': pd.to_numeric(df['Amount'], errors='coerce'),
+    }).dropna(subset=['Date', 'Amount'])
+    # Fall back to the category when a note is blank.
+    blank = frame['key'] == ''
+    frame.loc[blank, 'key'] = frame.loc[blank, 'Category'].str.lower()
+
+    # Cluster amounts per note: sorted by amount, a new cluster starts where
+    # an amount exceeds its predecessor by more than the tolerance.
+    frame = frame.sort_values(['key', 'Amount'], kind='stable')
+    keys = frame['key'].to_numpy()
+    amt = frame['Amount'].to_numpy()
+    breaks = np.r_[True, (keys[1:] != keys[:-1]) |
+                   (amt[1:] > np.abs(amt[:-1]) * (1 + amount_tolerance) + 0.01)]
+    frame['cluster'] = np.cumsum(breaks)
+
+    frame = frame.sort_values(['cluster', 'Date'], kind='stable')
+    group = frame['cluster'].to_numpy()
+    dates = frame['Date'].to_numpy().astype('datetime64[D]').astype('int64')
+    amounts = frame['Amount'].to_numpy()
+
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    sizes = np.diff(np.r_[starts, len(group)])
+    same = group[1:] == group[:-1]
+    gaps = np.diff(dates)[same].astype(float)
+    if not len(gaps):
+        return pd.DataFrame(columns=columns)
+
+    # Series position of every gap's group, so stats line up with starts/sizes.
+    gap_series = (np.cumsum(np.r_[True, group[1:] != group[:-1]]) - 1)[1:][same]
+    quartiles = (pd.Series(gaps).groupby(gap_series).quantile([0.25, 0.5, 0.75])
+                 .unstack().rename(columns={0.25: 'q1', 0.5: 'median', 0.75: 'q3'}))
+    idx = quartiles.index.to_numpy()
+    median = quartiles['median'].to_numpy()
+    iqr = (quartiles['q3'] - quartiles['q1']).to_numpy()
+    jitter = iqr / np.maximum(median, 1)
+
+    cadence = np.full(len(idx), None, dtype=object)
+    for name, (lo, hi) in CADENCES:
+        cadence[(median >= lo) & (median <= hi)] = name
+    # A day or two of slack is normal for short cadences (weekends, billing runs).
+    regular = iqr <= np.maximum(max_jitter * median, 2)
+    keep = (sizes[idx] >= min_occurrences) & (cadence != None) & regular  # noqa: E711
+    if not keep.any():
+        return pd.DataFrame(columns=columns)
+    idx, median, jitter, cadence = idx[keep], median[keep], jitter[keep], cadence[keep]
+
+    first = starts[idx]
+    last = first + sizes[idx] - 1
+    sums = np.add.reduceat(amounts, starts)[idx]
+    # Mean of up to the last three amounts, as the next expected amount.
+    recent = [amounts[max(f, l - 2):l + 1].mean() for f, l in zip(first, last)]
+    last_dates = pd.to_datetime(dates[last], unit='D')
+    out = pd.DataFrame({
+        'Note': frame['key'].to_numpy()[first],
+        'Category': frame['Category'].to_numpy()[last],
+        'Cadence': cadence,
+        'Occurrences': sizes[idx],
+        'Amount': sums / sizes[idx],
+        'LastDate': last_dates,
+        'NextDate': last_dates + pd.to_timedelta(np.round(median), unit='D'),
+        'NextAmount': recent,
+        'Regularity': np.round(np.clip(1.0 - jitter, 0.0, 1.0), 3),
+    }, columns=columns)
+    return out.sort_values('NextDate').reset_index(drop=True)
+
+
+@profiled('view: recurring')
+def recurring_view(recurring):
+    import streamlit as st
+    st.subheader('🔁 Recurring Expenses')
+    if recurring.empty:
+        st.success('No recurring expenses found.')
+        return
+    st.dataframe(recurring, hide_index=True)
@@ -1,4 +1,216 @@
-# Exports reports to PDF/Excel
+# Exports reports to CSV/Parquet/Excel/PDF
+#
+# Row exports stream: iter_expenses() yields filtered chunks of the ledger
+# (date range and categories applied before rows are materialized) and each
+# writer appends one chunk at a time to its file, so peak memory is bounded
+# by the chunk size rather than the export size. XLSX uses openpyxl's
+# write-only workbook. PDF reports are drawn from the rollups (day x category
+# totals), never from raw rows.
+#
+# Scheduled runs: python -m modules.report_exporter csv --start 2025-07-01
 
-def export_to_pdf(df, path):
-    pass
+import os
+import sys
+
+import config
+from modules.profiler import profiled
+
+COLUMNS = ['id', 'Date', 'Category', 'Amount', 'Note']
+FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'xlsx': '.xlsx', 'pdf': '.pdf'}
+
+
+def _atomic(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path + '.tmp'
+
+
+def write_csv(chunks, path):
+    """Append each chunk to a CSV file; returns the row count."""
+    tmp = _atomic(path)
+    rows = 0
+    with open(tmp, 'w', encoding='utf-8', newline='') as fh:
+        for chunk in chunks:
+            chunk.reindex(columns=COLUMNS).to_csv(fh, index=False, header=rows == 0)
+            rows += len(chunk)
+        if rows == 0:
+            fh.write(','.join(COLUMNS) + '\n')
+    os.replace(tmp, path)
+    return rows
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([('id', pa.int64()), ('Date', pa.string()), ('Category', pa.string()),
+                      ('Amount', pa.float64()), ('Note', pa.string())])
+
+
+def write_parquet(chunks, path):
+    """Write each chunk as a Parquet row group; returns the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _arrow_schema()
+    tmp = _atomic(path)
+    rows = 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for chunk in chunks:
+            chunk = chunk.reindex(columns=COLUMNS)
+            chunk['Category'] = chunk['Category'].astype(str)
+            chunk['Note'] = chunk['Note'].fillna('').astype(str)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    os.replace(tmp, path)
+    return rows
+
+
+def write_xlsx(chunks, path):
+    """Stream rows into a write-only workbook; returns the row count."""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Expenses')
+    sheet.append(COLUMNS)
+    rows = 0
+    for chunk in chunks:
+        chunk = chunk.reindex(columns=COLUMNS)
+        for record in chunk.itertuples(index=False, name=None):
+            sheet.append(record)
+        rows += len(chunk)
+    tmp = _atomic(path)
+    with open(tmp, 'wb') as fh:
+        workbook.save(fh)
+    os.replace(tmp, path)
+    return rows
+
+
+def monthly_report(rollups, month=None):
+    """Aggregates for one month (YYYY-MM, default latest) from the rollups."""
+    monthly = rollups.monthly()
+    if month is None:
+        month = monthly['Month'].max() if len(monthly) else None
+    by_category = (monthly[monthly['Month'] == month].set_index('Category')['Amount']
+                   .sort_values(ascending=False))
+    daily = rollups.daily()
+    daily = daily[daily['Date'].dt.strftime('%Y-%m') == month]
+    return {
+        'month': month,
+        'total': float(by_category.sum()),
+        'count': int(monthly.loc[monthly['Month'] == month, 'Count'].sum()),
+        'by_category': by_category,
+        'daily': daily.groupby('Date')['Amount'].sum(),
+        'trend': rollups.monthly_totals().tail(12),
+    }
+
+
+def write_pdf(rollups, path, month=None):
+    """Render a one-page monthly report from the rollups; returns the month."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    report = monthly_report(rollups, month)
+    tmp = _atomic(path)
+    with PdfPages(tmp) as pdf:
+        fig = plt.figure(figsize=(8.27, 11.69))  # A4 portrait
+        fig.suptitle(f"Expense report — {report['month'] or 'no data'}", fontsize=16)
+        fig.text(0.08, 0.92, f"Total ₹{report['total']:,.2f} across {report['count']} transactions")
+
+        ax = fig.add_axes([0.12, 0.62, 0.8, 0.25])
+        if len(report['by_category']):
+            report['by_category'].iloc[::-1].plot.barh(ax=ax, color='#4c78a8')
+        ax.set_title('By category')
+        ax.set_xlabel('₹')
+
+        ax = fig.add_axes([0.12, 0.34, 0.8, 0.2])
+        if len(report['daily']):
+            ax.plot(report['daily'].index, report['daily'].to_numpy(), marker='.')
+        ax.set_title('Daily spend')
+        ax.tick_params(axis='x', labelrotation=45)
+
+        ax = fig.add_axes([0.12, 0.07, 0.8, 0.18])
+        if len(report['trend']):
+            report['trend'].plot.bar(ax=ax, color='#72b7b2')
+        ax.set_title('Last 12 months')
+        ax.set_xlabel('')
+        pdf.savefig(fig)
+        plt.close(fig)
+    os.replace(tmp, path)
+    return report['month']
+
+
+def export_to_pdf(df, path, month=None):
+    """PDF report for an in-memory frame (builds throwaway rollups)."""
+    from modules.rollups import Rollups
+    return write_pdf(Rollups().rebuild(df), path, month)
+
+
+@profiled('export', rows=lambda result: result[1] if isinstance(result[1], int) else None)
+def export(fmt, path=None, start=None, end=None, categories=None, month=None, chunksize=None):
+    """Export the ledger in fmt to path (default: a dated file in REPORTS_DIR).
+
+    Returns (path, rows) for row formats and (path, month) for pdf.
+    """
+    from modules.data_loader import get_rollups, iter_expenses
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}; expected one of {", ".join(FORMATS)}')
+    if path is None:
+        if fmt == 'pdf':
+            stem = f'report_{month}' if month else 'report'
+        else:
+            stem = '_'.join(['expenses'] + [str(p) for p in (start, end) if p])
+        path = os.path.join(config.REPORTS_DIR, stem + FORMATS[fmt])
+    if fmt == 'pdf':
+        return path, write_pdf(get_rollups(), path, month)
+    writer = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}[fmt]
+    return path, writer(iter_expenses(start, end, categories, chunksize), path)
+
+
+@profiled('view: export')
+def export_view():
+    import streamlit as st
+    from modules.data_loader import get_rollups
+
+    st.subheader('📤 Export')
+    rollups = get_rollups()
+    months = sorted(rollups.monthly()['Month'].unique(), reverse=True)
+    with st.form('export_form'):
+        fmt = st.selectbox('Format', list(FORMATS), format_func=str.upper)
+        col1, col2 = st.columns(2)
+        start = col1.date_input('From', value=None)
+        end = col2.date_input('To', value=None)
+        categories = st.multiselect('Categories', list(rollups.category_totals().index))
+        month = st.selectbox('Month (PDF report)', months) if months else None
+        submitted = st.form_submit_button('Export')
+    if not submitted:
+        return
+    try:
+        with st.spinner('Exporting...'):
+            path, result = export(fmt, start=start, end=end, categories=categories or None, month=month)
+    except ImportError as exc:
+        st.error(f'{fmt.upper()} export needs an optional package: {exc.name}')
+        return
+    st.success(f'Wrote {os.path.basename(path)}'
+               + (f' ({result:,} rows)' if fmt != 'pdf' else ''))
+    # Hand the file itself to Streamlit rather than building the bytes in memory here.
+    with open(path, 'rb') as fh:
+        st.download_button('Download', fh, file_name=os.path.basename(path))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export the expense ledger or a monthly PDF report.')
+    parser.add_argument('format', choices=list(FORMATS))
+    parser.add_argument('--out', help=f'output file (default: under {config.REPORTS_DIR})')
+    parser.add_argument('--start', help='first date, YYYY-MM-DD')
+    parser.add_argument('--end', help='last date, YYYY-MM-DD')
+    parser.add_argument('--category', action='append', dest='categories')
+    parser.add_argument('--month', help='report month for pdf, YYYY-MM (default: latest)')
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args(argv)
+    path, result = export(args.format, args.out, args.start, args.end, args.categories,
+                          args.month, args.chunksize)
+    print(f'{path}: {result}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Incrementally maintained spend rollups
+#
+# Keeps day x category, month x category and grand totals for the ledger so
+# dashboards cost O(days x categories) instead of a groupby over every row.
+# rebuild() computes everything from a frame; insert/update/delete apply
+# deltas for a single expense.
+
+import threading
+
+from utils.data_cleaner import as_datetime
+
+
+def _day_key(value):
+    import pandas as pd
+    ts = pd.to_datetime(value, errors='coerce')
+    return None if pd.isna(ts) else ts.strftime('%Y-%m-%d')
+
+
+def _add(table, key, amount, count):
+    cell = table.get(key)
+    if cell is None:
+        table[key] = [amount, count]
+        return
+    cell[0] += amount
+    cell[1] += count
+    if cell[1] <= 0:
+        del table[key]
+
+
+class Rollups:
+    """Spend totals by day, month and category, updated by deltas."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.listeners = []  # called with (day, category, signed amount) per delta
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}       # id -> (day, category, amount)
+        self._day = {}        # (day, category) -> [amount, count]
+        self._month = {}      # (month, category) -> [amount, count]
+        self._category = {}   # category -> [amount, count]
+        self._days = {}       # day -> count, for active-day metrics
+        self.total = 0.0
+        self.count = 0
+
+    def rebuild(self, df):
+        """Recompute every rollup from a frame with id, Date, Category, Amount."""
+        import pandas as pd
+        with self._lock:
+            self._reset()
+            if df is None or df.empty:
+                return self
+            # Format each distinct day once rather than once per row.
+            codes, uniques = pd.factorize(as_datetime(df['Date']).dt.normalize())
+            days = pd.Series(pd.Index(uniques).strftime('%Y-%m-%d'), dtype=object).reindex(codes)
+            days = pd.Series(days.to_numpy(), index=df.index)
+            amounts = df['Amount'].astype(float)
+            category = df['Category']
+            if not isinstance(category.dtype, pd.CategoricalDtype):
+                category = category.astype(str)
+            frame = pd.DataFrame({'day': days, 'Category': category, 'Amount': amounts})
+            ids = df['id'] if 'id' in df.columns else pd.RangeIndex(len(df))
+            self._rows = {int(i): (d if isinstance(d, str) else None, c, a)
+                          for i, d, c, a in zip(ids, frame['day'], frame['Category'], frame['Amount'])}
+
+            dated = frame.dropna(subset=['day'])
+            by_day = dated.groupby(['day', 'Category'], sort=False, observed=True)['Amount'].agg(['sum', 'count'])
+            self._day = {k: [s, int(n)] for k, s, n in zip(by_day.index, by_day['sum'], by_day['count'])}
+            dated = dated.assign(month=dated['day'].str[:7])
+            by_month = dated.groupby(['month', 'Category'], sort=False, observed=True)['Amount'].agg(['sum', 'count'])
+            self._month = {k: [s, int(n)] for k, s, n in zip(by_month.index, by_month['sum'], by_month['count'])}
+            self._days = dated['day'].value_counts().to_dict()
+            by_cat = frame.groupby('Category', sort=False, observed=True)['Amount'].agg(['sum', 'count'])
+            self._category = {k: [s, int(n)] for k, s, n in zip(by_cat.index, by_cat['sum'], by_cat['count'])}
+            self.total = float(amounts.sum())
+            self.count = len(frame)
+            return self
+
+    # -- deltas ----------------------------------------------------------
+
+    def _apply(self, day, category, amount, sign):
+        amount = sign * amount
+        if day is not None:
+            _add(self._day, (day, category), amount, sign)
+            _add(self._month, (day[:7], category), amount, sign)
+            self._days[day] = self._days.get(day, 0) + sign
+            if self._days[day] <= 0:
+                del self._days[day]
+        _add(self._category, category, amount, sign)
+        self.total += amount
+        self.count += sign
+        for listener in self.listeners:
+            listener(day, category, amount)
+
+    def insert(self, expense_id, date, category, amount):
+        with self._lock:
+            row = (_day_key(date), str(category), float(amount))
+            self._rows[int(expense_id)] = row
+            self._apply(*row, 1)
+
+    def delete(self, expense_id):
+        with self._lock:
+            row = self._rows.pop(int(expense_id), None)
+            if row is not None:
+                self._apply(*row, -1)
+
+    def update(self, expense_id, date, category, amount):
+        with self._lock:
+            self.delete(expense_id)
+            self.insert(expense_id, date, category, amount)
+
+    # -- views -----------------------------------------------------------
+
+    def daily(self):
+        """Date, Category, Amount, Count per day and category."""
+        import pandas as pd
+        with self._lock:
+            rows = [(d, c, v[0], v[1]) for (d, c), v in self._day.items()]
+        df = pd.DataFrame(rows, columns=['Date', 'Category', 'Amount', 'Count'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df.sort_values(['Date', 'Category']).reset_index(drop=True)
+
+    def daily_totals(self):
+        """Total spend per day as a date-indexed Series."""
+        df = self.daily()
+        return df.groupby('Date')['Amount'].sum()
+
+    def monthly(self):
+        """Month (YYYY-MM), Category, Amount, Count per month and category."""
+        import pandas as pd
+        with self._lock:
+            rows = [(m, c, v[0], v[1]) for (m, c), v in self._month.items()]
+        df = pd.DataFrame(rows, columns=['Month', 'Category', 'Amount', 'Count'])
+        return df.sort_values(['Month', 'Category']).reset_index(drop=True)
+
+    def monthly_totals(self):
+        return self.monthly().groupby('Month')['Amount'].sum()
+
+    def category_totals(self):
+        """Lifetime spend per category, largest first."""
+        import pandas as pd
+        with self._lock:
+            totals = {c: v[0] for c, v in self._category.items()}
+        return pd.Series(totals, dtype='float64', name='Amount').sort_values(ascending=False)
+
+    def summary(self):
+        with self._lock:
+            return {
+                'total': self.total,
+                'count': self.count,
+                'average': self.total / self.count if self.count else 0.0,
+                'active_days': len(self._days),
+            }
@@ -0,0 +1,351 @@
+# Inverted token index over expense notes and categories
+#
+# Every expense is indexed under the lowercase word tokens of its Category
+# and Note. rebuild() works on the distinct (category, note) pairs, which
+# are few next to the rows, and lays the posting lists out as one array of
+# row positions sliced per token (in id order within each slice). Writes
+# after that are kept as small deltas: ids added under each token, and a
+# mask of base rows deleted or updated since; lookups merge the two, and the
+# deltas are folded back into fresh arrays once they grow past MERGE_AFTER.
+# Terms match exactly, by prefix (bisect over the sorted vocabulary) or,
+# failing both, within one edit. Spend per note token is kept alongside for
+# merchant-level totals. A lookup never scans the ledger.
+
+import bisect
+import re
+import threading
+
+from modules.profiler import profiled
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+MIN_PREFIX = 2  # shorter terms only match whole tokens
+MIN_FUZZY = 4   # shorter terms are not corrected
+MERGE_AFTER = 50_000  # delta rows before they are folded into the arrays
+STOPWORDS = frozenset({'a', 'an', 'and', 'at', 'by', 'for', 'from', 'in', 'of', 'on', 'the', 'to', 'with'})
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+_COLUMNS = ['id', 'Date', 'Category', 'Note', 'Amount']
+_UNDATED = 2 ** 31  # day number that sorts rows without a date last
+
+
+def tokenize(text):
+    """Lowercase word tokens of text (letters and digits)."""
+    return _TOKEN.findall(str(text or '').lower())
+
+
+def _merchant_tokens(note):
+    return {t for t in tokenize(note) if t not in STOPWORDS and not t.isdigit()}
+
+
+def _edits1(word):
+    """Strings one deletion, transposition, replacement or insertion away from word."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    deletes = [a + b[1:] for a, b in splits if b]
+    transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
+    replaces = [a + c + b[1:] for a, b in splits if b for c in _ALPHABET]
+    inserts = [a + c + b for a, b in splits for c in _ALPHABET]
+    return set(deletes + transposes + replaces + inserts)
+
+
+def _add(table, key, amount, count):
+    cell = table.get(key)
+    if cell is None:
+        table[key] = [amount, count]
+        return
+    cell[0] += amount
+    cell[1] += count
+    if cell[1] <= 0:
+        del table[key]
+
+
+class TextIndex:
+    """Token -> expense ids over Category and Note, with prefix and fuzzy term lookup."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        import numpy as np
+        self._ids = np.zeros(0, dtype=np.int64)   # base rows, sorted by id
+        self._days = np.zeros(0, dtype='datetime64[D]')
+        self._amounts = np.zeros(0)
+        self._docs = np.zeros(0, dtype=np.int64)  # base row -> (category, note) pair
+        self._doc_category, self._doc_note = [], []
+        self._slots = {}                          # token -> (start, stop) in _postings
+        self._postings = np.zeros(0, dtype=np.int64)  # base positions, id order per token
+        self._added = {}      # token -> ids indexed since rebuild
+        self._extra = {}      # id -> (day, category, note, amount) for those rows
+        self._live = np.zeros(0, dtype=bool)  # base rows not deleted or updated since
+        self._dead = 0
+        self._vocabulary = []  # sorted tokens, for prefix lookup
+        self._merchants = {}   # note token -> [amount, count]
+
+    # -- building --------------------------------------------------------
+
+    def rebuild(self, df):
+        """Index a frame with id, Date, Category, Amount and Note columns."""
+        import numpy as np
+        import pandas as pd
+        from utils.data_cleaner import as_datetime
+        with self._lock:
+            self._reset()
+            if not len(df):
+                return self
+            order = np.argsort(df['id'].to_numpy(dtype=np.int64), kind='stable')
+            ids = df['id'].to_numpy(dtype=np.int64)[order]
+            amounts = df['Amount'].fillna(0).to_numpy(dtype=float)[order]
+            days = as_datetime(df['Date']).to_numpy()[order].astype('datetime64[D]')
+            notes = (df['Note'].astype(object).fillna('').astype(str).to_numpy()[order] if 'Note' in df
+                     else np.full(len(ids), '', dtype=object))
+            categories = df['Category'].astype(str).to_numpy()[order]
+            docs, uniques = pd.MultiIndex.from_arrays([categories, notes]).factorize()
+            self._ids, self._days, self._amounts = ids, days, amounts
+            self._docs = docs.astype(np.int64)
+            self._doc_category = [str(c) for c, _ in uniques]
+            self._doc_note = [str(n) for _, n in uniques]
+
+            # (doc, token) pairs over the distinct documents, then their rows.
+            pair_doc, pair_token = [], []
+            vocabulary = {}
+            merchant = set()
+            for doc, (category, note) in enumerate(uniques):
+                note_tokens = _merchant_tokens(note)
+                for token in set(tokenize(category)) | set(tokenize(note)):
+                    code = vocabulary.setdefault(token, len(vocabulary))
+                    pair_doc.append(doc)
+                    pair_token.append(code)
+                    if token in note_tokens:
+                        merchant.add((doc, code))
+            pair_doc = np.asarray(pair_doc, dtype=np.int64)
+            pair_token = np.asarray(pair_token, dtype=np.int64)
+            by_doc = np.argsort(self._docs, kind='stable')  # rows grouped by doc, ids ascending
+            sizes = np.bincount(self._docs, minlength=len(uniques))
+            starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            counts = sizes[pair_doc]
+            offsets = np.repeat(starts[pair_doc] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+            rows = by_doc[offsets + np.arange(counts.sum())]
+            tokens = np.repeat(pair_token, counts)
+            sort = np.lexsort((rows, tokens))
+            rows, tokens = rows[sort], tokens[sort]
+            self._postings = rows
+            self._live = np.ones(len(ids), dtype=bool)
+            bounds = np.searchsorted(tokens, np.arange(len(vocabulary) + 1))
+            names = sorted(vocabulary, key=vocabulary.get)
+            self._slots = {t: (int(bounds[i]), int(bounds[i + 1])) for i, t in enumerate(names)}
+            self._vocabulary = sorted(vocabulary)
+
+            doc_amounts = np.bincount(self._docs, weights=amounts, minlength=len(uniques))
+            for doc, code in merchant:
+                _add(self._merchants, names[code], float(doc_amounts[doc]), int(sizes[doc]))
+        return self
+
+    def _compact(self):
+        """Fold the deltas back into the base arrays."""
+        import pandas as pd
+        frame = self.rows(self._all_ids(), newest_first=False)
+        self.rebuild(frame.assign(Date=pd.to_datetime(frame['Date'])))
+
+    def _all_ids(self):
+        import numpy as np
+        extra = np.fromiter(self._extra, dtype=np.int64, count=len(self._extra))
+        return np.union1d(self._ids[self._live], extra)
+
+    # -- deltas ----------------------------------------------------------
+
+    def _base_position(self, expense_id):
+        import numpy as np
+        i = int(np.searchsorted(self._ids, expense_id))
+        return i if i < len(self._ids) and self._ids[i] == expense_id else None
+
+    def insert(self, expense_id, date, category, amount, note=''):
+        from modules.rollups import _day_key
+        with self._lock:
+            expense_id = int(expense_id)
+            self.delete(expense_id)  # idempotent: a repeated insert replaces the row
+            row = (_day_key(date), str(category), str(note or ''), float(amount))
+            self._extra[expense_id] = row
+            for token in set(tokenize(category)) | set(tokenize(note)):
+                if token not in self._slots and token not in self._added:
+                    bisect.insort(self._vocabulary, token)
+                self._added.setdefault(token, set()).add(expense_id)
+            for token in _merchant_tokens(note):
+                _add(self._merchants, token, row[3], 1)
+            if len(self._extra) + self._dead > MERGE_AFTER:
+                self._compact()
+
+    def delete(self, expense_id):
+        with self._lock:
+            expense_id = int(expense_id)
+            row = self._extra.pop(expense_id, None)
+            if row is not None:
+                _, category, note, amount = row
+                for token in set(tokenize(category)) | set(tokenize(note)):
+                    self._added[token].discard(expense_id)
+            else:
+                i = self._base_position(expense_id)
+                if i is None or not self._live[i]:
+                    return
+                self._live[i] = False
+                self._dead += 1
+                note, amount = self._doc_note[self._docs[i]], float(self._amounts[i])
+            for token in _merchant_tokens(note):
+                _add(self._merchants, token, -amount, -1)
+
+    def update(self, expense_id, date, category, amount, note=''):
+        self.insert(expense_id, date, category, amount, note)
+
+    # -- lookup ----------------------------------------------------------
+
+    def terms(self, term, prefix=True, fuzzy=True):
+        """Indexed tokens a query term stands for: itself, tokens it prefixes, or near misses."""
+        term = term.lower()
+        with self._lock:
+            found = [term] if term in self._slots or term in self._added else []
+            if prefix and len(term) >= MIN_PREFIX:
+                i = bisect.bisect_right(self._vocabulary, term)
+                while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+                    found.append(self._vocabulary[i])
+                    i += 1
+            if not found and fuzzy and len(term) >= MIN_FUZZY:
+                found = sorted(t for t in _edits1(term) if t in self._slots or t in self._added)
+        return found
+
+    def _match(self, term, prefix, fuzzy):
+        """(live base positions, ids added since rebuild) of rows matching one term."""
+        import numpy as np
+        slices, extra = [], set()
+        for token in self.terms(term, prefix, fuzzy):
+            slot = self._slots.get(token)
+            if slot is not None:
+                slices.append(self._postings[slot[0]:slot[1]])
+            extra |= self._added.get(token, set())
+        if len(slices) > 1:
+            positions = np.unique(np.concatenate(slices))
+        else:
+            positions = slices[0] if slices else np.zeros(0, dtype=np.int64)
+        if self._dead:
+            positions = positions[self._live[positions]]
+        return positions, extra
+
+    def _locate(self, ids):
+        """Split ids into positions of live base rows and ids of rows added since rebuild."""
+        import numpy as np
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self._ids, ids)
+        found = positions < len(self._ids)
+        found[found] = self._ids[positions[found]] == ids[found]
+        found[found] = self._live[positions[found]]
+        return positions[found], [i for i in ids[~found].tolist() if i in self._extra]
+
+    def _lookup(self, query, prefix, fuzzy):
+        """(live base positions, added ids) of rows matching every term of query."""
+        import numpy as np
+        terms = [t for t in tokenize(query) if t not in STOPWORDS] or tokenize(query)
+        if not terms:
+            return np.zeros(0, dtype=np.int64), set()
+        positions, extra = self._match(terms[0], prefix, fuzzy)
+        for term in terms[1:]:
+            if not len(positions) and not extra:
+                break
+            more, added = self._match(term, prefix, fuzzy)
+            positions = np.intersect1d(positions, more, assume_unique=True)
+            extra = extra & added
+        return positions, extra
+
+    def search(self, query, prefix=True, fuzzy=True):
+        """Sorted ids of expenses matching every term of query (each term may expand)."""
+        import numpy as np
+        with self._lock:
+            positions, extra = self._lookup(query, prefix, fuzzy)
+            ids = self._ids[positions]  # positions are in id order
+        if extra:
+            ids = np.union1d(ids, np.fromiter(extra, dtype=np.int64, count=len(extra)))
+        return ids
+
+    def matches(self, query, limit=None, prefix=True, fuzzy=True):
+        """(rows newest first, total amount, count) of expenses matching query."""
+        with self._lock:
+            positions, extra = self._lookup(query, prefix, fuzzy)
+            total, count = self._total(positions, extra)
+            return self._frame(positions, list(extra), limit, True), total, count
+
+    def total(self, ids):
+        """(total amount, count) of the given ids."""
+        with self._lock:
+            return self._total(*self._locate(ids))
+
+    def rows(self, ids, limit=None, newest_first=True):
+        """Frame of id, Date, Category, Note, Amount for ids, newest first."""
+        with self._lock:
+            return self._frame(*self._locate(ids), limit, newest_first)
+
+    def _total(self, positions, extra):
+        total = float(self._amounts[positions].sum()) + sum(self._extra[i][3] for i in extra)
+        return total, len(positions) + len(extra)
+
+    def _frame(self, positions, extra, limit, newest_first):
+        import numpy as np
+        import pandas as pd
+        if limit is not None and len(positions) > limit:
+            # Pick the page before materializing any strings: order by day,
+            # then id (positions are in id order), partitioning in O(n).
+            days = self._days[positions]
+            day = np.where(np.isnat(days), -_UNDATED if newest_first else _UNDATED, days.astype(np.int64))
+            key = day * len(positions) + np.arange(len(positions))
+            if newest_first:
+                key = -key
+            keep = np.argpartition(key, limit - 1)[:limit]
+            positions = positions[keep]
+        docs = self._docs[positions]
+        frame = pd.DataFrame({
+            'id': self._ids[positions],
+            'Date': self._days[positions],
+            'Category': [self._doc_category[d] for d in docs],
+            'Note': [self._doc_note[d] for d in docs],
+            'Amount': self._amounts[positions],
+        })
+        if extra:
+            added = pd.DataFrame([(i, *self._extra[i]) for i in extra], columns=_COLUMNS)
+            added['Date'] = pd.to_datetime(added['Date']).to_numpy().astype('datetime64[D]')
+            frame = pd.concat([frame, added], ignore_index=True)
+        frame = frame.sort_values(['Date', 'id'], ascending=not newest_first, kind='stable')
+        if limit is not None:
+            frame = frame.head(limit)
+        return frame.assign(Date=frame['Date'].dt.strftime('%Y-%m-%d')).reset_index(drop=True)
+
+    def term_total(self, query):
+        """(total amount, count) of expenses matching query."""
+        with self._lock:
+            return self._total(*self._lookup(query, True, True))
+
+    def merchant_totals(self, limit=10):
+        """Spend by note token (merchant words), largest first."""
+        import pandas as pd
+        with self._lock:
+            items = [(t, cell[1], cell[0]) for t, cell in self._merchants.items()]
+        frame = pd.DataFrame(items, columns=['Term', 'Count', 'Total'])
+        return frame.sort_values('Total', ascending=False, kind='stable').head(limit).reset_index(drop=True)
+
+    def __len__(self):
+        return len(self._ids) - self._dead + len(self._extra)
+
+
+@profiled('view: search')
+def search_view(index, limit=200):
+    """Search box over notes and categories, with matching totals and top merchants."""
+    import streamlit as st
+
+    st.subheader('🔍 Search Expenses')
+    query = st.text_input('Search notes and categories', placeholder='e.g. swiggy, uber, rent')
+    if query.strip():
+        rows, total, count = index.matches(query, limit=limit)
+        if not count:
+            st.info(f'No expenses match “{query}”.')
+        else:
+            st.caption(f'{count:,} expense(s), ₹{total:,.2f} in total'
+                       + (f'; showing the latest {limit}' if count > limit else ''))
+            st.dataframe(rows, hide_index=True)
+    merchants = index.merchant_totals()
+    if not merchants.empty:
+        st.subheader('🏪 Top Merchants')
+        st.dataframe(merchants, hide_index=True)
@@ -1,5 +1,310 @@
-# Converts speech to text
+# Converts speech to text, off the Streamlit script thread
+#
+# VoiceWorker runs two daemon threads per session: a capture thread that
+# records utterances from the recognizer's microphone into a queue, and a
+# transcription thread that takes whatever audio has queued up (a batch of
+# up to batch_size utterances), transcribes it, parses each transcript with
+# extract_expense_data and saves the parsed expenses in one batched write
+# through modules.data_loader. The UI only calls start/stop and poll(), none
+# of which block. Recognizers are pluggable: GoogleRecognizer wraps
+# speech_recognition; OfflineRecognizer replays scripted "audio" (text) so
+# the pipeline runs without a microphone or network.
 
-def speech_to_text():
-    import speech_recognition as sr
-    # Example
+import queue
+import re
+import threading
+import time
+from datetime import date as _date
+
+from modules.profiler import profiled
+
+_AMOUNT = re.compile(r'\d+(?:\.\d+)?')
+_CATEGORY = re.compile(r'for (\w+)')
+_DATE = re.compile(r'on (\w+ \d+)')
+_YEAR = re.compile(r'\b\d{4}\b')
+
+
+class TranscriptionError(Exception):
+    """The recognizer could not turn an utterance into text."""
+
+
+def spoken_date(value, today=None):
+    """Normalize a spoken or stored date ('Today', 'July 5') to an ISO date string."""
+    import pandas as pd
+    today = today or _date.today()
+    text = str(value or '').strip()
+    if not text or text.lower() == 'today':
+        return today.isoformat()
+    # 'July 5' has no year; left to itself the parser would pick year 1.
+    if not _YEAR.search(text):
+        text = f'{text} {today.year}'
+    parsed = pd.to_datetime(text, errors='coerce')
+    return str(value).strip() if pd.isna(parsed) else parsed.date().isoformat()
+
+
+def extract_expense_data(text):
+    """Return (amount, category, date) spoken as e.g. 'spent 250 for food on July 5'."""
+    amount_match = _AMOUNT.search(text)
+    category_match = _CATEGORY.search(text)
+    date_match = _DATE.search(text)
+
+    amount = float(amount_match.group()) if amount_match else None
+    # Title case, like imported statements, so 'food' lands in the existing 'Food'.
+    category = category_match.group(1).title() if category_match else 'Unknown'
+    date = date_match.group(1) if date_match else 'Today'
+    return amount, category, date
+
+
+class GoogleRecognizer:
+    """Microphone capture and Google Web Speech transcription via speech_recognition."""
+
+    def __init__(self, phrase_time_limit=10):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        self.phrase_time_limit = phrase_time_limit
+        self._microphone = None
+
+    def capture(self, timeout):
+        """Record one utterance, or return None if nobody spoke within timeout seconds."""
+        if self._microphone is None:
+            self._microphone = self._sr.Microphone()
+            with self._microphone as source:
+                self._recognizer.adjust_for_ambient_noise(source)
+        with self._microphone as source:
+            try:
+                return self._recognizer.listen(source, timeout=timeout,
+                                               phrase_time_limit=self.phrase_time_limit)
+            except self._sr.WaitTimeoutError:
+                return None
+
+    def transcribe(self, audio):
+        try:
+            return self._recognizer.recognize_google(audio)
+        except self._sr.UnknownValueError:
+            raise TranscriptionError('Could not understand audio.') from None
+        except self._sr.RequestError as exc:
+            raise TranscriptionError(f'Could not reach speech recognition service: {exc}') from None
+
+
+class OfflineRecognizer:
+    """Stand-in recognizer: "audio" is the transcript itself (str or UTF-8 bytes).
+
+    capture() replays script (one utterance per call, then silence);
+    transcribe() waits latency seconds and returns the text. Empty audio
+    fails like an unintelligible utterance.
+    """
+
+    def __init__(self, script=(), latency=0.0):
+        self._script = queue.Queue()
+        for utterance in script:
+            self._script.put(utterance)
+        self.latency = latency
+        self.transcribed = 0
+
+    def say(self, utterance):
+        self._script.put(utterance)
+
+    def capture(self, timeout):
+        try:
+            return self._script.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def transcribe(self, audio):
+        if self.latency:
+            time.sleep(self.latency)
+        self.transcribed += 1
+        text = audio.decode('utf-8') if isinstance(audio, bytes) else str(audio or '')
+        if not text.strip():
+            raise TranscriptionError('Could not understand audio.')
+        return text
+
+
+def _save_expenses(rows):
+    from modules.data_loader import save_expenses
+    return save_expenses(rows)
+
+
+class VoiceWorker:
+    """Background capture and batched transcription of spoken expenses."""
+
+    def __init__(self, recognizer, save=_save_expenses, batch_size=8, capture_timeout=1.0):
+        self.recognizer = recognizer
+        self.save = save  # callable taking [(date, category, amount, note)], returning ids; None to skip
+        self.batch_size = batch_size
+        self.capture_timeout = capture_timeout
+        self.audio = queue.Queue()
+        self.results = queue.Queue()
+        self.captured = 0
+        self.batches = 0
+        self._processing = 0
+        self._listening = threading.Event()
+        self._stop = threading.Event()
+        self._capture_thread = None
+        self._transcribe_thread = None
+        self._lock = threading.Lock()
+
+    # -- control ---------------------------------------------------------
+
+    def start(self):
+        """Start the transcription thread (idempotent)."""
+        with self._lock:
+            if self._transcribe_thread is None or not self._transcribe_thread.is_alive():
+                self._stop.clear()
+                self._transcribe_thread = threading.Thread(target=self._transcribe_loop,
+                                                           name='voice-transcribe', daemon=True)
+                self._transcribe_thread.start()
+        return self
+
+    def start_listening(self):
+        """Begin recording utterances until stop_listening()."""
+        self.start()
+        with self._lock:
+            self._listening.set()
+            if self._capture_thread is None or not self._capture_thread.is_alive():
+                self._capture_thread = threading.Thread(target=self._capture_loop,
+                                                        name='voice-capture', daemon=True)
+                self._capture_thread.start()
+
+    def stop_listening(self):
+        self._listening.clear()
+
+    @property
+    def listening(self):
+        return self._listening.is_set()
+
+    def submit(self, audio):
+        """Queue already-recorded audio (an upload, or text for OfflineRecognizer)."""
+        self.start()
+        self.audio.put(audio)
+
+    def stop(self, timeout=None):
+        self._listening.clear()
+        self._stop.set()
+        self.audio.put(None)  # wake the transcriber
+        for thread in (self._capture_thread, self._transcribe_thread):
+            if thread is not None:
+                thread.join(timeout)
+
+    def pending(self):
+        """Utterances queued or being transcribed."""
+        return self.audio.qsize() + self._processing
+
+    def poll(self):
+        """Results finished since the last poll, oldest first; never blocks."""
+        out = []
+        while True:
+            try:
+                out.append(self.results.get_nowait())
+            except queue.Empty:
+                return out
+
+    # -- threads ---------------------------------------------------------
+
+    def _capture_loop(self):
+        while self._listening.is_set() and not self._stop.is_set():
+            try:
+                audio = self.recognizer.capture(self.capture_timeout)
+            except Exception as exc:
+                self._listening.clear()
+                self.results.put({'text': None, 'error': f'Microphone error: {exc}'})
+                return
+            if audio is not None:
+                self.captured += 1
+                self.audio.put(audio)
+
+    def _transcribe_loop(self):
+        while not self._stop.is_set():
+            batch = [self.audio.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.audio.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [audio for audio in batch if audio is not None]
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch):
+        self._processing = len(batch)
+        results = []
+        for audio in batch:
+            try:
+                text = self.recognizer.transcribe(audio)
+            except TranscriptionError as exc:
+                results.append({'text': None, 'error': str(exc)})
+                continue
+            except Exception as exc:
+                results.append({'text': None, 'error': f'Transcription failed: {exc}'})
+                continue
+            amount, category, spoken = extract_expense_data(text)
+            result = {'text': text, 'amount': amount, 'category': category,
+                      'date': spoken_date(spoken), 'id': None, 'error': None}
+            if amount is None:
+                result['error'] = 'No amount detected.'
+            results.append(result)
+        parsed = [r for r in results if r['error'] is None]
+        if parsed and self.save is not None:
+            try:
+                ids = self.save([(r['date'], r['category'], r['amount'], f"Voice: {r['text']}")
+                                 for r in parsed])
+                for r, expense_id in zip(parsed, ids):
+                    r['id'] = expense_id
+            except Exception as exc:
+                for r in parsed:
+                    r['error'] = f'Could not save: {exc}'
+        self.batches += 1
+        for r in results:
+            self.results.put(r)
+        self._processing = 0
+
+
+def speech_to_text(recognizer=None, timeout=5):
+    """Blocking one-shot capture and transcription (scripts and the CLI, not the app)."""
+    recognizer = recognizer or GoogleRecognizer()
+    audio = recognizer.capture(timeout)
+    if audio is None:
+        raise TranscriptionError('No speech detected.')
+    return recognizer.transcribe(audio)
+
+
+@profiled('view: voice input')
+def voice_input_view():
+    """Start/stop voice capture; polls the session's worker without blocking the script."""
+    import streamlit as st
+
+    st.subheader('🎤 Voice Input')
+    worker = st.session_state.get('voice_worker')
+    if worker is None:
+        try:
+            recognizer = GoogleRecognizer()
+        except ImportError:
+            st.info("Voice input needs the 'SpeechRecognition' and 'PyAudio' packages.")
+            return
+        worker = st.session_state['voice_worker'] = VoiceWorker(recognizer).start()
+    log = st.session_state.setdefault('voice_log', [])
+
+    col1, col2 = st.columns(2)
+    if col1.button('Start Listening', disabled=worker.listening):
+        worker.start_listening()
+    if col2.button('Stop', disabled=not worker.listening):
+        worker.stop_listening()
+
+    def results():
+        log.extend(worker.poll())
+        if worker.listening:
+            st.caption(f'Listening… {worker.pending()} utterance(s) waiting to be transcribed.')
+        for r in reversed(log[-10:]):
+            if r.get('id') is not None:
+                st.success(f"Saved ₹{r['amount']:,.2f} for {r['category']} on {r['date']}: “{r['text']}”")
+            elif r.get('text'):
+                st.warning(f"“{r['text']}”: {r['error']}")
+            else:
+                st.error(r['error'])
+
+    fragment = getattr(st, 'fragment', None)
+    if fragment is not None and (worker.listening or worker.pending()):
+        fragment(run_every=1.0)(results)()
+    else:
+        results()
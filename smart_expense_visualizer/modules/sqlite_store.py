@@ -0,0 +1,291 @@
+# SQLite expense backend with stable ids
+#
+# Same interface as ExpenseStore, backed by a single WAL-mode connection per
+# database file per process. Dates are stored as ISO YYYY-MM-DD text so range
+# filters compare them correctly. Date and category are indexed, so lookups by
+# id, edits, deletes and date-range scans run at index speed. Concurrent
+# writes from this process are group-committed into one transaction; other
+# processes are serialized by SQLite itself (BEGIN IMMEDIATE + busy timeout).
+
+import os
+import sqlite3
+import threading
+import warnings
+
+from modules.concurrency import GroupCommit
+from modules.expense_store import prepare_op
+from modules.frame_cache import fingerprint
+from utils.data_cleaner import iso_date, iso_dates
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category, date);
+CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY);
+'''
+
+_SELECT = 'SELECT id, date AS Date, category AS Category, amount AS Amount, note AS Note FROM expenses'
+
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+
+def get_connection(path):
+    """Return the process-wide connection for path, creating it on first use."""
+    path = os.path.abspath(path)
+    with _POOL_LOCK:
+        conn = _POOL.get(path)
+        if conn is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=10000')  # wait for writers in other processes
+            conn.executescript(_SCHEMA)
+            _POOL[path] = conn
+        return conn
+
+
+def close_all():
+    with _POOL_LOCK:
+        for conn in _POOL.values():
+            conn.close()
+        _POOL.clear()
+
+
+class SqliteExpenseStore:
+    """Expense ledger stored in an indexed SQLite table."""
+
+    def __init__(self, path, group_window=0.005):
+        self.path = path
+        self._conn = get_connection(path)
+        self._lock = threading.RLock()
+        self._group = GroupCommit(self._commit, group_window, prepare=prepare_op)
+        self.stamp = None  # file fingerprint as of our last write
+        self.foreign_writes = 0  # commits by other connections noticed before our writes
+        self._data_version = None
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # -- reading ---------------------------------------------------------
+
+    def load(self):
+        import pandas as pd
+        with self._lock:
+            return pd.read_sql_query(_SELECT + ' ORDER BY id', self._conn)
+
+    def query_range(self, start=None, end=None, category=None):
+        """Return expenses with start <= date <= end (ISO strings), optionally for one category."""
+        import pandas as pd
+        clauses, params = [], []
+        if category is not None:
+            clauses.append('category = ?')
+            params.append(category)
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(iso_date(start))
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(iso_date(end))
+        sql = _SELECT + (' WHERE ' + ' AND '.join(clauses) if clauses else '') + ' ORDER BY date, id'
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def iter_range(self, start=None, end=None, categories=None, chunksize=50_000):
+        """Yield frames of query_range() rows, chunksize at a time, filtered in SQL."""
+        import pandas as pd
+        where, params = _where(start, end, categories)
+        sql = _SELECT + where + ' ORDER BY date, id'
+        # A dedicated cursor so a slow consumer does not hold the shared lock.
+        conn = sqlite3.connect(os.path.abspath(self.path), check_same_thread=False)
+        try:
+            yield from pd.read_sql_query(sql, conn, params=params, chunksize=chunksize)
+        finally:
+            conn.close()
+
+    def page(self, start=None, end=None, categories=None, min_amount=None, max_amount=None,
+             text=None, offset=0, limit=50):
+        """One page of matching rows, newest first, and the total number of matches."""
+        import pandas as pd
+        where, params = _where(start, end, categories, min_amount, max_amount, text)
+        with self._lock:
+            total = self._conn.execute('SELECT COUNT(*) FROM expenses' + where, params).fetchone()[0]
+            rows = pd.read_sql_query(_SELECT + where + ' ORDER BY date DESC, id DESC LIMIT ? OFFSET ?',
+                                     self._conn, params=params + [int(limit), int(offset)])
+        return rows, total
+
+    def get(self, expense_id):
+        row = self._execute(_SELECT + ' WHERE id = ?', (int(expense_id),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(['id', 'Date', 'Category', 'Amount', 'Note'], row))
+
+    def __len__(self):
+        return self._execute('SELECT COUNT(*) FROM expenses').fetchone()[0]
+
+    def __contains__(self, expense_id):
+        return self._execute('SELECT 1 FROM expenses WHERE id = ?', (int(expense_id),)).fetchone() is not None
+
+    # -- writing ---------------------------------------------------------
+
+    def _files(self):
+        return [self.path, self.path + '-wal']
+
+    def _commit(self, ops):
+        """Apply a batch of ('insert'|'update'|'delete', args) ops in one transaction."""
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if self._data_version is not None and version != self._data_version:
+                    self.foreign_writes += 1
+                results = []
+                for kind, args in ops:
+                    if kind == 'insert':
+                        conn.executemany(
+                            'INSERT INTO expenses (date, category, amount, note) VALUES (?, ?, ?, ?)', args)
+                        end = conn.execute(
+                            "SELECT seq FROM sqlite_sequence WHERE name = 'expenses'").fetchone()[0]
+                        results.append(list(range(end - len(args) + 1, end + 1)))
+                    elif kind == 'update':
+                        expense_id, date, category, amount, note = args
+                        cur = conn.execute(
+                            'UPDATE expenses SET date = ?, category = ?, amount = ?, note = ? WHERE id = ?',
+                            (date, category, amount, note, expense_id))
+                        results.append(cur.rowcount > 0)
+                    else:
+                        cur = conn.execute('DELETE FROM expenses WHERE id = ?', args)
+                        results.append(cur.rowcount > 0)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            # Our own commits do not move data_version on this connection.
+            self._data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            self.stamp = fingerprint(self._files())
+            return results
+
+    def insert(self, date, category, amount, note=''):
+        return self.insert_many([(date, category, amount, note)])[0]
+
+    def insert_many(self, rows):
+        rows = list(rows)
+        if not rows:
+            return []
+        return self._group.submit(('insert', rows))
+
+    def update(self, expense_id, date, category, amount, note=''):
+        return self._group.submit(('update', (expense_id, date, category, amount, note)))
+
+    def delete(self, expense_id):
+        return self._group.submit(('delete', (expense_id,)))
+
+    def import_frame(self, df):
+        df = df.reindex(columns=['Date', 'Category', 'Amount', 'Note'])
+        rows = zip(iso_dates(df['Date']), df['Category'], df['Amount'].astype(float),
+                   df['Note'].fillna('').astype(str))
+        return len(self.insert_many(rows))
+
+    def compact(self):
+        """Checkpoint the WAL into the main database file."""
+        self._execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return True
+
+    # -- migration -------------------------------------------------------
+
+    def migrated(self, name):
+        return self._execute('SELECT 1 FROM migrations WHERE name = ?', (name,)).fetchone() is not None
+
+    def mark_migrated(self, name):
+        self._execute('INSERT OR IGNORE INTO migrations (name) VALUES (?)', (name,))
+
+    def normalize_dates(self):
+        """Rewrite dates stored before they were kept as ISO strings; return the count."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, date FROM expenses WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+            ).fetchall()
+            fixed = [(iso_date(d), i) for i, d in rows if iso_date(d) != d]
+            if fixed:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self._conn.executemany('UPDATE expenses SET date = ? WHERE id = ?', fixed)
+                    self._conn.execute('COMMIT')
+                except BaseException:
+                    self._conn.execute('ROLLBACK')
+                    raise
+            return len(fixed)
+
+
+def _where(start=None, end=None, categories=None, min_amount=None, max_amount=None, text=None):
+    """SQL WHERE clause and parameters for the ledger filters (dates are inclusive ISO strings)."""
+    clauses, params = [], []
+    if categories:
+        clauses.append('category IN (%s)' % ','.join('?' * len(categories)))
+        params.extend(categories)
+    if start is not None:
+        clauses.append('date >= ?')
+        params.append(iso_date(start))
+    if end is not None:
+        clauses.append('date <= ?')
+        params.append(iso_date(end))
+    if min_amount is not None:
+        clauses.append('amount >= ?')
+        params.append(float(min_amount))
+    if max_amount is not None:
+        clauses.append('amount <= ?')
+        params.append(float(max_amount))
+    if text:
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append("note LIKE ? ESCAPE '\\'")
+        params.append(f'%{escaped}%')
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def migrate(store, csv_paths=(), voice_db_path=None):
+    """Import legacy CSV files and the voice-input table into store, once each.
+
+    Returns the number of rows imported.
+    """
+    import pandas as pd
+    from modules.speech_input import spoken_date
+    if not store.migrated('iso-dates'):
+        store.normalize_dates()
+        store.mark_migrated('iso-dates')
+    imported = 0
+    for path in csv_paths:
+        name = 'csv:' + os.path.abspath(path)
+        if store.migrated(name) or not os.path.exists(path):
+            continue
+        df = pd.read_csv(path)
+        if 'Note' not in df.columns:
+            df['Note'] = df['Description'] if 'Description' in df.columns else ''
+        imported += store.import_frame(df)
+        store.mark_migrated(name)
+
+    if voice_db_path and not os.path.exists(voice_db_path):
+        warnings.warn(f'Voice input database {voice_db_path!r} not found; voice expenses were not imported '
+                      '(set EXPENSE_VOICE_DB_PATH to its location).', stacklevel=2)
+    elif voice_db_path:
+        name = 'voice:' + os.path.abspath(voice_db_path)
+        if not store.migrated(name):
+            src = sqlite3.connect(voice_db_path)
+            try:
+                rows = src.execute('SELECT amount, category, date FROM expenses').fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+            finally:
+                src.close()
+            imported += len(store.insert_many(
+                (spoken_date(d), c or 'Unknown', a or 0, 'Voice input') for a, c, d in rows))
+            store.mark_migrated(name)
+    return imported
@@ -0,0 +1,218 @@
+# Bulk import of bank statements
+#
+# Statements are read in chunks, normalized with clean_data, and each row is
+# fingerprinted as a 64-bit hash of (date, category, amount in paise, note,
+# occurrence). The occurrence counter keeps two genuine identical
+# transactions in one statement apart while still recognising both on
+# re-import; between chunks it only remembers the transactions of the day
+# the last chunk ended on, so memory stays bounded for date-ordered files.
+# Hashes of everything imported so far live in a sorted uint64 array
+# persisted to disk, so membership checks are vectorized binary searches
+# and only new rows are appended, one batched write per chunk.
+
+import os
+import sys
+
+from modules.profiler import profiled
+from utils.data_cleaner import clean_data
+
+
+class HashIndex:
+    """Persistent set of 64-bit row hashes."""
+
+    def __init__(self, path=None):
+        import numpy as np
+        self.path = path
+        if path and os.path.exists(path):
+            self._hashes = np.unique(np.fromfile(path, dtype='<u8'))
+        else:
+            self._hashes = np.zeros(0, dtype='<u8')
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def contains(self, hashes):
+        """Boolean mask of which hashes are already indexed."""
+        import numpy as np
+        if not len(self._hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self._hashes, hashes)
+        pos[pos == len(self._hashes)] = 0
+        return self._hashes[pos] == hashes
+
+    def add(self, hashes):
+        import numpy as np
+        hashes = np.asarray(hashes, dtype='<u8')
+        if not len(hashes):
+            return
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'ab') as fh:
+                hashes.tofile(fh)
+                fh.flush()
+                os.fsync(fh.fileno())
+        self._hashes = np.union1d(self._hashes, hashes)
+
+
+class Occurrences:
+    """Occurrence counts carried between chunks, only for transactions that can still repeat.
+
+    A transaction's key includes its date, so in a date-ordered statement
+    (either direction) only keys dated on the last day read can recur in
+    the next chunk; everything older is dropped and the state stays the
+    size of one day. Once a statement is seen to be out of date order,
+    every count from then on is kept (exact, but growing with the file);
+    repeats of days pruned before that point can only be numbered from 0.
+    """
+
+    def __init__(self):
+        import numpy as np
+        self.hashes = np.zeros(0, dtype='<u8')  # sorted
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.days = np.zeros(0, dtype=np.int64)
+        self.direction = 0  # +1 ascending, -1 descending, None once out of order
+        self.last_day = None
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def prior(self, base):
+        """How many times each hash was seen in earlier chunks."""
+        import numpy as np
+        if not len(self.hashes):
+            return np.zeros(len(base), dtype=np.int64)
+        pos = np.searchsorted(self.hashes, base)
+        pos[pos == len(self.hashes)] = 0
+        return np.where(self.hashes[pos] == base, self.counts[pos], 0)
+
+    def _track_order(self, days):
+        import numpy as np
+        if self.direction is None or not len(days):
+            return
+        if self.last_day is not None:
+            days = np.concatenate([[self.last_day], days])
+        steps = np.sign(np.diff(days))
+        steps = steps[steps != 0]
+        if len(steps):
+            if self.direction == 0:
+                self.direction = int(steps[0])
+            if (steps != self.direction).any():
+                self.direction = None
+
+    def add(self, base, days):
+        import numpy as np
+        self._track_order(days)
+        uniq, first, counts = np.unique(base, return_index=True, return_counts=True)
+        hashes = np.concatenate([self.hashes, uniq])
+        order = np.argsort(hashes, kind='stable')
+        hashes = hashes[order]
+        counts = np.concatenate([self.counts, counts])[order]
+        day_of = np.concatenate([self.days, days[first]])[order]
+        keep = np.concatenate([[True], hashes[1:] != hashes[:-1]])
+        starts = np.flatnonzero(keep)
+        self.hashes, self.counts, self.days = hashes[keep], np.add.reduceat(counts, starts), day_of[keep]
+        if len(days):
+            self.last_day = int(days[-1])
+        if self.direction is not None and self.last_day is not None:
+            boundary = self.days == self.last_day
+            self.hashes, self.counts, self.days = (self.hashes[boundary], self.counts[boundary],
+                                                   self.days[boundary])
+
+
+def row_hashes(df, seen):
+    """Hash each cleaned row, numbering repeats of the same transaction.
+
+    seen (an Occurrences) carries the occurrence counts across chunks.
+    """
+    import numpy as np
+    import pandas as pd
+    key = pd.DataFrame({
+        'Date': df['Date'].dt.strftime('%Y-%m-%d'),
+        'Category': df['Category'].str.lower(),
+        'Paise': (df['Amount'] * 100).round().astype('int64'),
+        'Note': df['Note'].str.lower(),
+    })
+    base = pd.util.hash_pandas_object(key, index=False).to_numpy()
+    occurrence = pd.Series(base).groupby(base).cumcount().to_numpy() + seen.prior(base)
+    seen.add(base, df['Date'].to_numpy().astype('datetime64[D]').astype(np.int64))
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'base': base, 'occurrence': occurrence}), index=False).to_numpy()
+
+
+def import_statement(source, insert_many, index, chunksize=100_000, column_map=None,
+                     dayfirst=False, progress=None, categorize=None):
+    """Stream a CSV statement into insert_many, skipping rows already in index.
+
+    insert_many receives a list of (date, category, amount, note) tuples per
+    chunk. Rows without a category are labelled with categorize(notes) when
+    given. Returns counts of rows read, imported and skipped as duplicates.
+    """
+    import pandas as pd
+    stats = {'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0}
+    seen = Occurrences()
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False,
+                             na_values=['']):
+        stats['read'] += len(chunk)
+        cleaned = clean_data(chunk, column_map=column_map, dayfirst=dayfirst)
+        stats['invalid'] += len(chunk) - len(cleaned)
+        if cleaned.empty:
+            continue
+        hashes = row_hashes(cleaned, seen)
+        fresh = ~index.contains(hashes)
+        new = cleaned[fresh]
+        stats['duplicates'] += int((~fresh).sum())
+        if len(new) and categorize is not None:
+            unlabelled = new['Category'] == 'Uncategorized'
+            if unlabelled.any():
+                new = new.copy()
+                new.loc[unlabelled, 'Category'] = categorize(new.loc[unlabelled, 'Note']).to_numpy()
+        if len(new):
+            insert_many(list(zip(new['Date'].dt.strftime('%Y-%m-%d'), new['Category'],
+                                 new['Amount'].astype(float), new['Note'])))
+            index.add(hashes[fresh])
+            stats['imported'] += len(new)
+        if progress is not None:
+            progress(stats)
+    return stats
+
+
+@profiled('view: statement import')
+def statement_import_view():
+    import streamlit as st
+    from modules.data_loader import import_statement_file
+
+    st.subheader('🏦 Import Bank Statement')
+    upload = st.file_uploader('Statement CSV', type=['csv'], key='statement_upload')
+    dayfirst = st.checkbox('Dates are day-first (DD/MM/YYYY)', value=True)
+    if upload is None or not st.button('Import'):
+        return
+    status = st.empty()
+
+    def progress(stats):
+        status.caption(f"Read {stats['read']:,} rows, imported {stats['imported']:,}, "
+                       f"skipped {stats['duplicates']:,} duplicates…")
+
+    stats = import_statement_file(upload, dayfirst=dayfirst, progress=progress)
+    status.empty()
+    st.success(f"Imported {stats['imported']:,} new expenses "
+               f"({stats['duplicates']:,} duplicates, {stats['invalid']:,} unusable rows skipped).")
+
+
+def main(argv=None):
+    import argparse
+    from modules.data_loader import import_statement_file
+
+    parser = argparse.ArgumentParser(description='Import a bank statement CSV into the expense ledger.')
+    parser.add_argument('path')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--dayfirst', action='store_true')
+    args = parser.parse_args(argv)
+    stats = import_statement_file(args.path, chunksize=args.chunksize, dayfirst=args.dayfirst,
+                                  progress=lambda s: print(f"\r{s['read']:,} rows read", end='',
+                                                           file=sys.stderr))
+    print(file=sys.stderr)
+    print(stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,24 @@
 # Smart recommendations
+#
+# Tips are read off SpendAnalytics (modules.expense_analyzer): categories on
+# track to finish the month well above their usual spend, and the most
+# unusual large expense of the last few weeks. Nothing here touches the ledger.
 
-def suggest(df):
-    return 'Try reducing food orders'
+OVERSPEND = 0.2  # forecast this far above the typical month triggers a tip
+
+
+def suggest(analytics, limit=3):
+    """Return up to limit short, actionable tips, most significant first."""
+    tips = []
+    forecast = analytics.forecast()
+    if not forecast.empty:
+        over = forecast[forecast['Change'].fillna(0) > OVERSPEND].sort_values('Change', ascending=False)
+        for row in over.itertuples(index=False):
+            tips.append(f'{row.Category} is on track for ₹{row.Forecast:,.0f} this month, '
+                        f'{row.Change:.0%} above the usual ₹{row.Typical:,.0f}. '
+                        f'Spending ₹{max(row.Typical - row.Spent, 0):,.0f} more would keep it on par.')
+    row = analytics.top_anomaly()
+    if row is not None:
+        tips.append(f"₹{row['Amount']:,.0f} on {row['Category']} ({row['Date']}) is well above the "
+                    f"usual ₹{row['Typical']:,.0f} for that category; worth a second look.")
+    return tips[:limit] or ['Spending is in line with your usual pattern this month.']
@@ -1,5 +1,151 @@
 # Creates graphs and visualizations
+#
+# Charts never ship raw rows to the browser. Time series start from the
+# daily rollups, are binned at the finest resolution (day, week, month) that
+# stays within a few times the point budget, and are then thinned to the
+# budget with Largest-Triangle-Three-Buckets, which keeps the peaks and dips
+# a plain resample would average away. Series and rendered figures are
+# cached by a fingerprint of the data they were drawn from plus the chart
+# parameters, so reruns and repeated clicks reuse them.
+
+import threading
+from collections import OrderedDict
+
+import config
+from modules.profiler import cache_event, profiled
+
+RESOLUTIONS = [('D', 1), ('W', 7), ('MS', 30)]  # pandas frequency, approximate days per bin
+RESOLUTION_LABELS = {'D': 'Daily', 'W': 'Weekly', 'MS': 'Monthly'}
+BIN_SLACK = 4  # bin at most this many times the budget before LTTB thins it out
+
+_CACHE = OrderedDict()  # (kind, fingerprint, params) -> series or figure
+_CACHE_LOCK = threading.Lock()
+
+
+def _cached(key, build):
+    with _CACHE_LOCK:
+        value = _CACHE.get(key)
+        if value is not None:
+            _CACHE.move_to_end(key)
+    cache_event('chart cache', hits=value is not None, misses=value is None)
+    if value is None:
+        value = build()
+        with _CACHE_LOCK:
+            _CACHE[key] = value
+            while len(_CACHE) > config.CHART_CACHE_SIZE:
+                _CACHE.popitem(last=False)
+    return value
+
+
+def clear_cache():
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def data_fingerprint(series):
+    """Content hash of a (small, aggregated) series, for cache keys."""
+    import pandas as pd
+    return int(pd.util.hash_pandas_object(series, index=True).sum())
+
+
+def choose_resolution(days, budget):
+    """Finest pandas frequency whose bin count over `days` stays within BIN_SLACK x budget."""
+    for freq, width in RESOLUTIONS:
+        if days / width <= BIN_SLACK * budget:
+            return freq
+    return RESOLUTIONS[-1][0]
+
+
+def lttb(x, y, threshold):
+    """Indices of the Largest-Triangle-Three-Buckets downsample of (x, y) to threshold points.
+
+    The first and last points are always kept; each bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the mean of the next bucket. One vectorized step per output point.
+    """
+    import numpy as np
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, max(edges[i + 2], hi + 1))
+        avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax()) if hi > lo else a
+        keep[i + 1] = a
+    return np.unique(keep)
+
+
+def downsample(series, budget):
+    """Bin a daily, date-indexed series adaptively and thin it to at most budget points.
+
+    Returns (series, freq), freq being the pandas frequency of the bins the
+    points now sum over.
+    """
+    import numpy as np
+    if len(series) <= budget:
+        return series, 'D'
+    span = (series.index[-1] - series.index[0]).days + 1
+    freq = choose_resolution(span, budget)
+    if freq != 'D':
+        series = series.resample(freq).sum()
+    if len(series) > budget:
+        x = series.index.to_numpy().astype('datetime64[D]').astype(np.int64)
+        series = series.iloc[lttb(x, series.to_numpy(), budget)]
+    return series, freq
+
+
+@profiled('chart: spend_series', rows=True)
+def spend_series(rollups, fingerprint, category=None, budget=None):
+    """Spend over time (optionally for one category) downsampled to the point budget.
+
+    The series is named after the bins it was summed into ('Daily spend',
+    'Weekly spend', ...), for chart titles. fingerprint identifies the
+    ledger version the rollups reflect.
+    """
+    budget = budget or config.CHART_POINT_BUDGET
+
+    def build():
+        import pandas as pd
+        daily = rollups.daily()
+        if category is not None:
+            daily = daily[daily['Category'] == category]
+        totals = daily.groupby('Date')['Amount'].sum()
+        if totals.empty:
+            return totals.rename('Daily spend')
+        totals = totals.reindex(pd.date_range(totals.index[0], totals.index[-1], freq='D'),
+                                fill_value=0.0)
+        series, freq = downsample(totals, budget)
+        return series.rename(f'{RESOLUTION_LABELS[freq]} spend')
+
+    return _cached(('spend', fingerprint, category, budget), build)
+
+
+@profiled('chart: category figure')
+def category_figure(totals, title='Spending by Category'):
+    """Matplotlib pie of category totals, cached by their content."""
+    def build():
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(6, 6))
+        ax.pie(totals.to_numpy(), labels=[str(c) for c in totals.index], autopct='%1.1f%%', startangle=90)
+        ax.set_title(title)
+        ax.axis('equal')
+        plt.close(fig)  # kept by the cache, not pyplot's figure registry
+        return fig
+
+    return _cached(('category pie', data_fingerprint(totals), title), build)
+
 
 def create_pie_chart(df):
-    import matplotlib.pyplot as plt
-    # Example plot
+    """Category pie for a Date/Category/Amount frame."""
+    return category_figure(df.groupby('Category', observed=True)['Amount'].sum().sort_values(ascending=False))
@@ -0,0 +1,139 @@
+# Normalizes raw expense and bank-statement frames
+#
+# typed_frame() is the canonical in-memory ledger schema: Date as
+# datetime64, Category as a categorical over one shared dictionary, Amount as
+# float rupees rounded to whole paise and Note as an Arrow-backed string when
+# pyarrow is installed. The loading layer builds it once per ledger version;
+# views take it as given instead of re-parsing columns.
+
+import re
+
+COLUMN_ALIASES = {
+    'Date': ['date', 'transaction date', 'txn date', 'value date', 'posting date'],
+    'Amount': ['amount', 'debit', 'debit amount', 'withdrawal', 'withdrawal amt', 'withdrawal amount'],
+    'Category': ['category', 'expense category', 'expense type'],
+    'Note': ['note', 'description', 'narration', 'particulars', 'remarks', 'details'],
+}
+
+
+LEDGER_COLUMNS = ['id', 'Date', 'Category', 'Amount', 'Note']
+
+_ISO_DATE = r'\d{4}-\d{2}-\d{2}'
+_CURRENCY = r'[₹,\s]|(?i:rs\.?|inr)'
+_CREDIT = r'^\(.*\)$|^-|(?i:cr\.?)$'  # (200), -200, 200 CR
+
+
+def as_datetime(values, dayfirst=False):
+    """values as datetime64, parsing only if they are not dates already."""
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors='coerce', dayfirst=dayfirst)
+
+
+def iso_date(value):
+    """value as a YYYY-MM-DD string, which is how both stores keep dates.
+
+    Anything pandas cannot parse is kept as given rather than dropped.
+    """
+    text = str(value)
+    if re.fullmatch(_ISO_DATE, text):
+        return text
+    import pandas as pd
+    ts = pd.to_datetime(value, errors='coerce')
+    return text if pd.isna(ts) else ts.strftime('%Y-%m-%d')
+
+
+def iso_dates(values):
+    """iso_date() over a Series, parsing only the values that are not ISO already."""
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d').fillna(values.astype(str))
+    text = values.astype(str)
+    other = ~text.str.fullmatch(_ISO_DATE)
+    if other.any():
+        parsed = pd.to_datetime(text[other], errors='coerce', format='mixed').dt.strftime('%Y-%m-%d')
+        text = text.mask(other, parsed.fillna(text[other]))
+    return text
+
+
+def text_dtype():
+    """Arrow-backed string dtype when pyarrow is available, else pandas' default."""
+    import pandas as pd
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'str' if int(pd.__version__.split('.')[0]) >= 3 else object
+    return pd.StringDtype('pyarrow')
+
+
+def typed_frame(df):
+    """Convert a ledger frame to the canonical compact schema (see module notes)."""
+    import numpy as np
+    import pandas as pd
+    columns = [c for c in LEDGER_COLUMNS if c in df.columns]
+    out = {}
+    if 'id' in df.columns:
+        out['id'] = df['id'].astype('int64')
+    if 'Date' in df.columns:
+        out['Date'] = as_datetime(df['Date'])
+    if 'Category' in df.columns:
+        category = df['Category']
+        if not isinstance(category.dtype, pd.CategoricalDtype):
+            category = category.fillna('').astype(str).astype('category')
+        out['Category'] = category
+    if 'Amount' in df.columns:
+        paise = np.round(pd.to_numeric(df['Amount'], errors='coerce').to_numpy(dtype=float) * 100)
+        out['Amount'] = pd.Series(paise / 100, index=df.index)
+    if 'Note' in df.columns:
+        out['Note'] = df['Note'].fillna('').astype(text_dtype())
+    return pd.DataFrame(out, index=df.index, columns=columns)
+
+
+def normalize_columns(df, column_map=None):
+    """Rename known statement headers to Date/Category/Amount/Note."""
+    rename = dict(column_map or {})
+    lowered = {str(c).strip().lower(): c for c in df.columns}
+    for target, aliases in COLUMN_ALIASES.items():
+        if target in df.columns or target in rename.values():
+            continue
+        for alias in aliases:
+            if alias in lowered:
+                rename[lowered[alias]] = target
+                break
+    return df.rename(columns=rename)
+
+
+def clean_data(df, column_map=None, dayfirst=False, default_category='Uncategorized'):
+    """Return a Date/Category/Amount/Note frame with unusable rows dropped.
+
+    Amounts may carry currency marks and thousands separators ('₹ 1,234.50').
+    Credits (negative, parenthesised or marked CR) are dropped, not imported
+    as expenses.
+    """
+    import pandas as pd
+    df = normalize_columns(df, column_map)
+    if 'Category' not in df.columns:
+        df = df.assign(Category=default_category)
+    if 'Note' not in df.columns:
+        df = df.assign(Note='')
+    df = df.reindex(columns=['Date', 'Category', 'Amount', 'Note'])
+
+    amount = df['Amount']
+    if pd.api.types.is_string_dtype(amount) or pd.api.types.is_object_dtype(amount):
+        text = amount.astype(str).str.replace(_CURRENCY, '', regex=True)
+        credit = text.str.contains(_CREDIT, regex=True, na=False)
+        amount = pd.to_numeric(text.str.replace(r'[()-]|(?i:[cd]r\.?)$', '', regex=True), errors='coerce')
+        amount = amount.where(~credit, -amount)
+    else:
+        amount = pd.to_numeric(amount, errors='coerce')
+    # Credits and refunds are not expenses.
+    amount = amount.where(~(amount < 0))
+    category = df['Category'].fillna(default_category).astype(str).str.strip().str.title()
+    df = pd.DataFrame({
+        'Date': as_datetime(df['Date'], dayfirst=dayfirst),
+        'Category': category.replace('', default_category),
+        'Amount': amount,
+        'Note': df['Note'].fillna('').astype(str).str.strip(),
+    })
+    return df.dropna(subset=['Date', 'Amount']).reset_index(drop=True)